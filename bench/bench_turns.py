@@ -0,0 +1,185 @@
+"""End-to-end turn benchmark.
+
+Plays N games concurrently through the FastAPI app, alternating
+``POST /games/{id}/turn`` with ``POST /games/{id}/player-roll`` whenever the DM
+asks for a roll, and reports request latency percentiles, throughput and the
+server's per-phase timings from ``GET /metrics``.
+
+By default the LLM is the in-process fake from :mod:`bench.fake_ollama`; pass
+``--ollama-url`` to benchmark against a real server instead::
+
+    python -m bench.bench_turns --games 20 --turns 10 --tps 40 --ttft 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from server.app import engine_service, timing
+from server.app.llm.ollama_client import create_client
+from server.app.llm.router import BackendPool
+from server.app.llm.scheduler import llm_scheduler
+from server.app.main import app
+
+from .fake_ollama import FakeOllamaConfig, create_app
+
+SAMPLE_WORLD = Path(__file__).resolve().parents[1] / "worlds" / "sample_world.md"
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        f"p{int(f * 100)}": timing.percentile(ordered, f) for f in (0.50, 0.95, 0.99)
+    }
+
+
+def _backends(args: argparse.Namespace) -> BackendPool:
+    if args.ollama_url:
+        return BackendPool([args.ollama_url])
+    fake = create_app(
+        FakeOllamaConfig(tokens_per_second=args.tps, time_to_first_token=args.ttft)
+    )
+    return BackendPool(
+        ["http://fake-ollama"],
+        client_factory=lambda url: create_client(
+            url, transport=httpx.ASGITransport(app=fake)
+        ),
+    )
+
+
+async def _play(
+    client: httpx.AsyncClient,
+    game_id: int,
+    turns: int,
+    model: str,
+    latencies: dict[str, list[float]],
+) -> None:
+    for _ in range(turns):
+        start = time.perf_counter()
+        resp = await client.post(
+            f"/games/{game_id}/turn", json={"message": "I look around.", "model": model}
+        )
+        resp.raise_for_status()
+        latencies["turn"].append(time.perf_counter() - start)
+        body = resp.json()
+        if body["awaiting_player_roll"]:
+            start = time.perf_counter()
+            resp = await client.post(
+                f"/games/{game_id}/player-roll",
+                json={
+                    "request_id": body["roll_request"]["id"],
+                    "value": random.randint(1, 20),
+                },
+            )
+            resp.raise_for_status()
+            latencies["roll"].append(time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the benchmark described by ``args`` and return the report."""
+
+    engine_service.SAVE_DIR = Path(tempfile.mkdtemp(prefix="bench-saves-"))
+    llm_scheduler.max_concurrency = args.concurrency
+    latencies: dict[str, list[float]] = {"turn": [], "roll": []}
+
+    async with app.router.lifespan_context(app):
+        await app.state.llm_backends.aclose()
+        app.state.llm_backends = _backends(args)
+        timing.reset()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            resp = await client.post(
+                "/worlds/import", json={"content": SAMPLE_WORLD.read_text()}
+            )
+            resp.raise_for_status()
+            world_id = resp.json()["id"]
+            game_ids = []
+            for _ in range(args.games):
+                resp = await client.post("/games", json={"world_id": world_id})
+                game_ids.append(resp.json()["id"])
+
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    _play(client, gid, args.turns, args.model, latencies)
+                    for gid in game_ids
+                )
+            )
+            elapsed = time.perf_counter() - start
+            metrics = (await client.get("/metrics")).json()
+
+    requests = len(latencies["turn"]) + len(latencies["roll"])
+    return {
+        "games": args.games,
+        "turns": len(latencies["turn"]),
+        "rolls": len(latencies["roll"]),
+        "elapsed_seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "turn_latency": _percentiles(latencies["turn"]),
+        "roll_latency": _percentiles(latencies["roll"]),
+        "phases": metrics["turn_phases"],
+        "scheduler": metrics["llm_scheduler"],
+    }
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    print(
+        f"games={report['games']} turns={report['turns']} rolls={report['rolls']} "
+        f"elapsed={report['elapsed_seconds']:.2f}s "
+        f"throughput={report['requests_per_second']:.1f} req/s"
+    )
+    for kind in ("turn", "roll"):
+        p = report[f"{kind}_latency"]
+        print(
+            f"{kind:<5} latency  p50={p['p50'] * 1000:8.1f}ms  "
+            f"p95={p['p95'] * 1000:8.1f}ms  p99={p['p99'] * 1000:8.1f}ms"
+        )
+    print(f"{'phase':<14}{'count':>7}{'mean ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in report["phases"].items():
+        print(
+            f"{name:<14}{stats['count']:>7}"
+            f"{stats['mean_seconds'] * 1000:>10.2f}"
+            f"{stats['p95_seconds'] * 1000:>10.2f}"
+            f"{stats['p99_seconds'] * 1000:>10.2f}"
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10, help="concurrent games")
+    parser.add_argument("--turns", type=int, default=5, help="turns per game")
+    parser.add_argument("--tps", type=float, default=50.0, help="fake tokens/sec")
+    parser.add_argument(
+        "--ttft", type=float, default=0.1, help="fake time to first token"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="concurrent LLM requests"
+    )
+    parser.add_argument("--model", default="llama3")
+    parser.add_argument("--ollama-url", help="benchmark a real Ollama server")
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:  # pragma: no cover - CLI
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
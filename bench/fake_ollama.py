@@ -0,0 +1,132 @@
+"""Local stand-in for the Ollama HTTP API.
+
+Serves ``/api/generate``, ``/api/tags`` and ``/api/ps`` with canned DM
+narrations at a configurable token rate, so the engine's own overhead can be
+measured without a model in the loop.  The narrations cycle through plain
+scenes, numbered options, ``STATE_UPDATE:`` lines and roll requests.
+
+Run standalone with::
+
+    python -m bench.fake_ollama --port 11434 --tps 30 --ttft 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import re
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+NARRATIONS = [
+    "The torches gutter as you step into the hall. A guard eyes you warily.\n"
+    "1. Greet the guard\n2. Slip past him\n3. Return to the square",
+    "You search the alcove and find a small glass vial.\n"
+    'STATE_UPDATE: {"flags": {"found_vial": true}}\n'
+    "1. Drink it\n2. Pocket it\n3. Keep searching",
+    "The lock is old but sturdy. Roll a d20 for Sleight Of Hand (DC 12). "
+    "The tumblers click one by one as you work the pick deeper.",
+    "The guard shrugs and waves you through towards the dungeon stairs.\n"
+    'STATE_UPDATE: {"current_location": 1}\n'
+    "1. Descend\n2. Wait for nightfall\n3. Ask about the dragon",
+    "Your blade finds its mark. Roll 1d8 damage. The beast staggers back.",
+]
+
+_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass
+class FakeOllamaConfig:
+    """Timing and content of the fake server."""
+
+    tokens_per_second: float = 50.0
+    time_to_first_token: float = 0.1
+    models: list[str] = field(default_factory=lambda: ["llama3"])
+    narrations: list[str] = field(default_factory=lambda: list(NARRATIONS))
+
+
+def _tokenize(text: str) -> list[str]:
+    """Split ``text`` into word-sized tokens that join back losslessly."""
+
+    return _TOKEN_RE.findall(text)
+
+
+def _apply_stop(text: str, stop: list[str]) -> str:
+    cut = min((i for i in (text.find(s) for s in stop) if i != -1), default=-1)
+    return text if cut == -1 else text[:cut]
+
+
+def create_app(config: FakeOllamaConfig | None = None) -> FastAPI:
+    """Return an ASGI app imitating an Ollama server."""
+
+    config = config or FakeOllamaConfig()
+    app = FastAPI()
+    counter = itertools.count()
+    delay = 1.0 / config.tokens_per_second
+
+    def final_chunk(model: str, prompt: str, tokens: list[str]) -> dict[str, Any]:
+        return {
+            "model": model,
+            "response": "",
+            "done": True,
+            "prompt_eval_count": len(prompt) // 4,
+            "eval_count": len(tokens),
+        }
+
+    @app.get("/api/tags")
+    def tags() -> dict[str, Any]:
+        return {"models": [{"name": f"{m}:latest"} for m in config.models]}
+
+    @app.get("/api/ps")
+    def ps() -> dict[str, Any]:
+        return {"models": [{"name": f"{m}:latest"} for m in config.models]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request) -> Any:
+        body = await request.json()
+        model = body.get("model", "")
+        prompt = body.get("prompt", "")
+        text = config.narrations[next(counter) % len(config.narrations)]
+        text = _apply_stop(text, (body.get("options") or {}).get("stop") or [])
+        tokens = _tokenize(text)
+
+        if not body.get("stream", True):
+            await asyncio.sleep(config.time_to_first_token + len(tokens) * delay)
+            return {**final_chunk(model, prompt, tokens), "response": text}
+
+        async def lines() -> AsyncIterator[str]:
+            await asyncio.sleep(config.time_to_first_token)
+            for token in tokens:
+                yield json.dumps({"model": model, "response": token, "done": False})
+                yield "\n"
+                await asyncio.sleep(delay)
+            yield json.dumps(final_chunk(model, prompt, tokens)) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main() -> None:  # pragma: no cover - manual entry point
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tps", type=float, default=50.0, help="tokens per second")
+    parser.add_argument(
+        "--ttft", type=float, default=0.1, help="seconds to first token"
+    )
+    args = parser.parse_args()
+    config = FakeOllamaConfig(tokens_per_second=args.tps, time_to_first_token=args.ttft)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
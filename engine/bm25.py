@@ -0,0 +1,95 @@
+"""Okapi BM25 keyword index over transcript entries.
+
+Documents are numbered in the order they are added, which for a transcript
+is the entry number.  Only term counts are kept, in postings lists, so the
+index can be grown one entry at a time and restored from stored term counts
+without the entry texts.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+_WORD_RE = re.compile(r"[a-z0-9']{2,}")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do for from has have he her his i in is it "
+    "its me my no not of on or our she so that the their them then there "
+    "they this to was we were what when where which who will with you your "
+    "dm player system".split()
+)
+
+
+def term_counts(text: str) -> Dict[str, int]:
+    """Return how often each indexed word occurs in ``text``."""
+
+    return dict(
+        Counter(w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS)
+    )
+
+
+class BM25Index:
+    """Incrementally built BM25 index.
+
+    Parameters
+    ----------
+    k1:
+        Term frequency saturation.
+    b:
+        Strength of document length normalisation.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, counts: Dict[str, int]) -> int:
+        """Add a document given its term counts and return its number."""
+
+        number = len(self._lengths)
+        for term, count in counts.items():
+            self._postings.setdefault(term, []).append((number, count))
+        length = sum(counts.values())
+        self._lengths.append(length)
+        self._total_length += length
+        return number
+
+    def extend(self, documents: Iterable[Dict[str, int]]) -> None:
+        for counts in documents:
+            self.add(counts)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """Return up to ``k`` ``(number, score)`` pairs best matching ``query``.
+
+        Only documents sharing a term with ``query`` are scored; ties favour
+        later documents.
+        """
+
+        total = len(self._lengths)
+        if not total:
+            return []
+        average = self._total_length / total or 1.0
+        scores: Dict[int, float] = {}
+        for term in term_counts(query):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1.0 + (total - df + 0.5) / (df + 0.5))
+            for number, count in postings:
+                norm = self.k1 * (
+                    1.0 - self.b + self.b * self._lengths[number] / average
+                )
+                gain = idf * count * (self.k1 + 1.0) / (count + norm)
+                scores[number] = scores.get(number, 0.0) + gain
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
@@ -0,0 +1,142 @@
+"""Detection of memories that restate an earlier one.
+
+Memories are compared by the Jaccard similarity of their word shingles,
+estimated from MinHash signatures.  Signatures are split into bands and
+memories sharing a band are the only candidates compared, so finding the
+near-duplicates of a new memory does not scan the whole list.
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .memory import MemoryIndex, MemoryRecord
+
+# Words per shingle.
+SHINGLE_SIZE = 2
+
+# Signature length, as ``BANDS`` bands of ``ROWS`` values.  Memories with a
+# similarity of 0.7 share a band with a probability of about 99%.
+BANDS = 16
+ROWS = 4
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _hash_params(count: int) -> List[Tuple[int, int]]:
+    params = []
+    for n in range(count):
+        a = zlib.crc32(f"a{n}".encode()) | 1
+        b = zlib.crc32(f"b{n}".encode())
+        params.append((a, b))
+    return params
+
+
+_PARAMS = _hash_params(BANDS * ROWS)
+
+
+def shingles(text: str) -> set[str]:
+    """Return the word shingles of ``text``, or its single word if shorter."""
+
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text: str) -> Optional[Tuple[int, ...]]:
+    """Return the MinHash signature of ``text``, or ``None`` if it has no words.
+
+    Shingles are hashed with CRC-32 so signatures are stable across
+    processes.
+    """
+
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)]
+    if not hashes:
+        return None
+    return tuple(
+        min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in _PARAMS
+    )
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Return the Jaccard similarity estimated from two signatures."""
+
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class NearDuplicateIndex(MemoryIndex):
+    """MinHash signatures of a memory list, bucketed by band."""
+
+    def _clear(self) -> None:
+        self._signatures: List[Optional[Tuple[int, ...]]] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+    def _add(self, position: int, memory: MemoryRecord) -> None:
+        sig = signature(memory.content)
+        self._signatures.append(sig)
+        if sig is not None:
+            for band in range(BANDS):
+                key = (band, sig[band * ROWS : (band + 1) * ROWS])
+                self._buckets.setdefault(key, []).append(position)
+
+    def find(
+        self, memories: List[MemoryRecord], text: str, threshold: float
+    ) -> Optional[int]:
+        """Return the position of the memory most similar to ``text``.
+
+        Only memories whose estimated similarity is at least ``threshold``
+        are considered; the most recent wins a tie.  Returns ``None`` when
+        there is none.
+        """
+
+        self.sync(memories)
+        sig = signature(text)
+        if sig is None:
+            return None
+        candidates: set[int] = set()
+        for band in range(BANDS):
+            key = (band, sig[band * ROWS : (band + 1) * ROWS])
+            candidates.update(self._buckets.get(key, ()))
+        best: Optional[Tuple[float, int]] = None
+        for position in candidates:
+            other = self._signatures[position]
+            score = similarity(sig, other) if other is not None else 0.0
+            if score >= threshold and (best is None or (score, position) > best):
+                best = (score, position)
+        return best[1] if best is not None else None
+
+
+def consolidate(
+    memories: List[MemoryRecord],
+    content: str,
+    index: NearDuplicateIndex,
+    threshold: float = 0.7,
+    importance: float = 1.0,
+    timestamp: float = 0.0,
+    boost: float = 0.5,
+) -> Optional[int]:
+    """Fold ``content`` into a memory it nearly duplicates, if there is one.
+
+    The matching memory keeps its text and tags; its importance becomes its
+    importance at ``timestamp`` plus ``boost`` times ``importance``, it is
+    restamped at ``timestamp`` and its merge count grows by one.  Returns
+    the position of the memory merged into, or ``None`` when ``content``
+    should be remembered as a new memory.
+    """
+
+    position = index.find(memories, content, threshold)
+    if position is None:
+        return None
+    memory = memories[position]
+    memory.importance = memory.importance_at(timestamp) + boost * importance
+    memory.timestamp = timestamp
+    memory.merges += 1
+    return position
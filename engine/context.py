@@ -2,17 +2,116 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import Iterable, List
 
-from .memory import recall
+from .memory import MemoryRecord, recall
+from .retrieval import recall_relevant
 from .world_loader import SectionEntry, World
 
+# Prefixes of the tags scoping a memory to a location or an NPC.
+LOCATION_TAG = "location:"
+NPC_TAG = "npc:"
+
+# Longest excerpt of a past transcript entry quoted in a prompt.
+HISTORY_CHARS = 300
+
+_ACTORS = {"player": "Player", "dm": "DM", "system": "System"}
+
 
 def _format_entries(entries: List[SectionEntry]) -> str:
     return ", ".join(entry.name for entry in entries) if entries else "none"
 
 
-def build_prompt(world: World, state: object, k: int = 5) -> str:
+def scope_tags(world: World, location: int, text: str) -> List[str]:
+    """Return the tags scoping a memory of ``text`` made at ``location``.
+
+    The memory is tagged with the location and with every NPC it names.
+    """
+
+    tags: List[str] = []
+    if 0 <= location < len(world.locations):
+        tags.append(LOCATION_TAG + world.locations[location].name)
+    lowered = text.lower()
+    tags.extend(
+        NPC_TAG + npc.name
+        for npc in world.npcs
+        if npc.name and npc.name.lower() in lowered
+    )
+    return tags
+
+
+def _format_memories(memories: Iterable[MemoryRecord]) -> str:
+    formatted = []
+    for m in memories:
+        tags = [t for t in m.tags if not t.startswith((LOCATION_TAG, NPC_TAG))]
+        if tags:
+            formatted.append(f"{m.content} [{', '.join(tags)}]")
+        else:
+            formatted.append(m.content)
+    return "; ".join(formatted)
+
+
+def _format_history(entries: Iterable[dict]) -> str:
+    formatted = []
+    for entry in entries:
+        text = entry["text"]
+        if len(text) > HISTORY_CHARS:
+            text = text[: HISTORY_CHARS - 3].rstrip() + "..."
+        actor = _ACTORS.get(entry["actor"], entry["actor"])
+        formatted.append(f"{actor}: {text}")
+    return "; ".join(formatted)
+
+
+def _memory_scopes(world: World, state: object) -> List[tuple[str, str]]:
+    """Return ``(label, tag)`` for the current location and NPCs in play.
+
+    NPCs are in play when the latest memory names them.
+    """
+
+    scopes: List[tuple[str, str]] = []
+    location = getattr(state, "current_location", None)
+    if isinstance(location, int) and 0 <= location < len(world.locations):
+        scopes.append(("Memories here", LOCATION_TAG + world.locations[location].name))
+    memories = getattr(state, "memory", [])
+    if memories:
+        scopes.extend(
+            (f"Memories of {tag[len(NPC_TAG):]}", tag)
+            for tag in memories[-1].tags
+            if tag.startswith(NPC_TAG)
+        )
+    return scopes
+
+
+def build_world_context(world: World) -> str:
+    """Build the static, world-level part of the prompt.
+
+    The result depends only on ``world`` so it is byte-identical from turn to
+    turn, which lets the model server reuse its cached prefix.
+    """
+
+    parts: List[str] = [f"World: {world.title}"]
+    if world.lore:
+        parts.append(f"Lore: {world.lore}")
+    if world.locations:
+        places = "; ".join(f"{e.name} - {e.description}" for e in world.locations)
+        parts.append(f"Locations: {places}")
+    parts.append(f"NPCs: {_format_entries(world.npcs)}")
+    if world.rules_notes:
+        parts.append(f"Rules: {world.rules_notes}")
+    return "\n".join(parts)
+
+
+def build_prompt(
+    world: World,
+    state: object,
+    k: int = 5,
+    include_world: bool = True,
+    scoped_k: int = 3,
+    query: str | None = None,
+    history_query: str | None = None,
+    history_k: int = 3,
+    chapters_k: int = 2,
+) -> str:
     """Build a textual prompt for the LLM based on the game state.
 
     Parameters
@@ -21,9 +120,30 @@ def build_prompt(world: World, state: object, k: int = 5) -> str:
         The current world definition.
     state:
         An object with ``current_location``, ``party``, ``memory`` and
-        ``pending_roll`` attributes.
+        ``pending_roll`` attributes.  Memories decay to its ``turn_count``
+        when it has one, its ``memory_index`` speeds up scoped recall and its
+        ``memory_vectors`` speed up retrieval by ``query``.  Its
+        ``transcript_history``, if any, recalls past transcript entries
+        through a ``recall(query, k, exclude)`` method.
     k:
         Number of memories to include.
+    scoped_k:
+        Number of further memories to include about the current location
+        and about each NPC named in the latest memory.
+    query:
+        Text such as the player's message; when given, the ``k`` memories
+        are chosen by relevance to it rather than by importance alone.
+    history_query:
+        Text such as the player's message whose keywords select past
+        transcript entries to quote.
+    history_k:
+        Number of past transcript entries to quote.
+    chapters_k:
+        Number of the latest chapter summaries in the state's ``timeline``
+        to include.
+    include_world:
+        Include world-level details such as NPCs and rules notes.  Disable
+        when they are already supplied by :func:`build_world_context`.
     """
 
     parts: List[str] = []
@@ -36,8 +156,9 @@ def build_prompt(world: World, state: object, k: int = 5) -> str:
         parts.append("Location: unknown")
 
     # NPCs
-    npcs = _format_entries(world.npcs)
-    parts.append(f"NPCs here: {npcs}")
+    if include_world:
+        npcs = _format_entries(world.npcs)
+        parts.append(f"NPCs here: {npcs}")
 
     # Party roster with personas and inventory
     roster: list[str] = []
@@ -53,20 +174,43 @@ def build_prompt(world: World, state: object, k: int = 5) -> str:
         roster.append(desc)
     parts.append(f"Party: {', '.join(roster) or 'none'}")
 
+    # Story so far
+    timeline = getattr(state, "timeline", [])
+    if chapters_k and timeline:
+        parts.append("Story so far: " + " ".join(timeline[-chapters_k:]))
+
     # Memories
     memories = getattr(state, "memory", [])
-    top = recall(memories, k)
+    now = getattr(state, "turn_count", None)
+    if query:
+        vectors = getattr(state, "memory_vectors", None)
+        top = recall_relevant(memories, query, k, now=now, index=vectors)
+    else:
+        top = recall(memories, k, now=now)
     if top:
-        formatted = []
-        for m in top:
-            if m.tags:
-                formatted.append(f"{m.content} [{', '.join(m.tags)}]")
-            else:
-                formatted.append(m.content)
-        parts.append("Memories: " + "; ".join(formatted))
+        parts.append("Memories: " + _format_memories(top))
+    shown = {id(m) for m in top}
+    if scoped_k and memories:
+        index = getattr(state, "memory_index", None)
+        for label, tag in _memory_scopes(world, state):
+            candidates = recall(
+                memories, scoped_k + len(shown), [tag], now=now, index=index
+            )
+            scoped = [m for m in candidates if id(m) not in shown][:scoped_k]
+            if scoped:
+                shown.update(id(m) for m in scoped)
+                parts.append(f"{label}: {_format_memories(scoped)}")
+
+    # Past exchanges mentioning what the player brings up
+    history = getattr(state, "transcript_history", None)
+    if history_query and history_k and history is not None:
+        quoted = {m.content for m in memories if id(m) in shown}
+        entries = history.recall(history_query, history_k, exclude=quoted)
+        if entries:
+            parts.append("Earlier: " + _format_history(entries))
 
     # Rules highlights
-    if world.rules_notes:
+    if include_world and world.rules_notes:
         parts.append(f"Rules: {world.rules_notes}")
 
     # Pending roll guard
@@ -54,3 +54,27 @@ def detect_roll_request(dm_text: str) -> Optional[RollRequest]:
     dc = int(dc_str) if dc_str is not None else None
 
     return RollRequest(skill=skill, sides=sides, dc=dc)
+
+
+def roll_request_end(dm_text: str) -> Optional[int]:
+    """Return the index just past a complete roll request in ``dm_text``.
+
+    Text streamed from the model is inspected before it is finished, so a
+    bare ``"roll a d20"`` is not yet treated as final.  A request counts as
+    complete once its DC has been given or the line it starts on has ended.
+
+    Returns
+    -------
+    Optional[int]
+        End offset of the request, or ``None`` if no complete request exists.
+    """
+
+    match = _ROLL_RE.search(dm_text)
+    if not match:
+        return None
+    if match.group("dc") is not None:
+        return match.end()
+    newline = dm_text.find("\n", match.start())
+    if newline != -1:
+        return newline
+    return None
@@ -1,48 +1,310 @@
-"""Simple long-term memory system for game state."""
+"""Simple long-term memory system for game state.
+
+Games hold their memories as :class:`MemoryRecord` objects: slotted records
+whose tags are interned and shared between records carrying the same tags.
+They are saved in bulk as positional rows with :func:`dump_memories` and
+restored with :func:`load_memories`, without per-item validation.
+:class:`MemoryItem` is the validated form exchanged through the API.
+"""
 
 from __future__ import annotations
 
-from typing import Iterable, List, Optional
+import heapq
+import sys
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from pydantic import BaseModel, Field
 
 
 class MemoryItem(BaseModel):
-    """Represents a single memory with an importance score and tags."""
+    """Represents a single memory with an importance score and tags.
+
+    ``importance`` is the score at ``timestamp``, a point on the game clock
+    (such as the turn number).  It decays by a factor of ``decay_rate`` per
+    clock unit, computed only when needed by :meth:`importance_at`, so
+    decay costs nothing however many memories are held.  ``merges`` counts
+    the near-duplicates folded into the memory.
+    """
 
     content: str
     importance: float = 1.0
     tags: List[str] = Field(default_factory=list)
+    timestamp: float = 0.0
+    decay_rate: float = 1.0
+    merges: int = 0
+
+    def importance_at(self, now: Optional[float] = None) -> float:
+        """Return the decayed importance at clock ``now``.
+
+        Without ``now`` the stored importance is returned.
+        """
+
+        if now is None or self.decay_rate == 1.0 or now <= self.timestamp:
+            return self.importance
+        return self.importance * self.decay_rate ** (now - self.timestamp)
+
+
+# Tag tuples shared by every record carrying the same tags.
+_TAG_SETS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _intern_tags(tags: Iterable[str]) -> Tuple[str, ...]:
+    key = tuple(tags)
+    shared = _TAG_SETS.get(key)
+    if shared is None:
+        shared = _TAG_SETS[key] = tuple(sys.intern(str(tag)) for tag in key)
+    return shared
+
+
+class MemoryRecord:
+    """Compact in-game form of a :class:`MemoryItem`, with the same fields.
+
+    ``tags`` is a tuple shared with other records carrying the same tags.
+    """
+
+    __slots__ = ("content", "importance", "tags", "timestamp", "decay_rate", "merges")
+
+    def __init__(
+        self,
+        content: str,
+        importance: float = 1.0,
+        tags: Iterable[str] = (),
+        timestamp: float = 0.0,
+        decay_rate: float = 1.0,
+        merges: int = 0,
+    ) -> None:
+        self.content = content
+        self.importance = importance
+        self.tags = _intern_tags(tags)
+        self.timestamp = timestamp
+        self.decay_rate = decay_rate
+        self.merges = merges
+
+    importance_at = MemoryItem.importance_at
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MemoryRecord):
+            return NotImplemented
+        return self.to_row() == other.to_row()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"MemoryRecord({self.content!r}, importance={self.importance!r})"
+
+    @classmethod
+    def from_item(cls, item: MemoryItem) -> MemoryRecord:
+        return cls(
+            item.content,
+            item.importance,
+            item.tags,
+            item.timestamp,
+            item.decay_rate,
+            item.merges,
+        )
+
+    def to_item(self) -> MemoryItem:
+        return MemoryItem(
+            content=self.content,
+            importance=self.importance,
+            tags=list(self.tags),
+            timestamp=self.timestamp,
+            decay_rate=self.decay_rate,
+            merges=self.merges,
+        )
+
+    def to_row(self) -> List[Any]:
+        return [
+            self.content,
+            self.importance,
+            list(self.tags),
+            self.timestamp,
+            self.decay_rate,
+            self.merges,
+        ]
+
+
+def dump_memories(memories: Iterable[MemoryRecord]) -> List[List[Any]]:
+    """Return ``memories`` as JSON-ready rows of their fields in order."""
+
+    return [
+        [m.content, m.importance, list(m.tags), m.timestamp, m.decay_rate, m.merges]
+        for m in memories
+    ]
+
+
+def load_memories(rows: Iterable[Sequence[Any] | Dict[str, Any]]) -> List[MemoryRecord]:
+    """Return the records saved as ``rows`` by :func:`dump_memories`.
+
+    Rows may also be :class:`MemoryItem` mappings, as exported through the
+    API or saved by earlier versions; those are validated.
+    """
+
+    return [
+        (
+            MemoryRecord.from_item(MemoryItem.model_validate(row))
+            if isinstance(row, dict)
+            else MemoryRecord(*row)
+        )
+        for row in rows
+    ]
+
+
+class MemoryIndex(ABC):
+    """Base for indexes derived from a list of memories.
+
+    The list is expected to only be appended to or trimmed with
+    :func:`forget`: appended memories are indexed on the next :meth:`sync`,
+    and a trimmed or replaced list is indexed from scratch, detected by the
+    last indexed memory having moved.  Memories are identified by their
+    position in the list, which only changes when it is re-indexed.
+    """
+
+    def __init__(self) -> None:
+        self._memories: Optional[List[MemoryRecord]] = None
+        self._size = 0
+        self._last: Optional[MemoryRecord] = None
+        self._clear()
+
+    def sync(self, memories: List[MemoryRecord]) -> None:
+        """Bring the index up to date with ``memories``."""
+
+        if (
+            memories is not self._memories
+            or len(memories) < self._size
+            or (self._size and memories[self._size - 1] is not self._last)
+        ):
+            self._memories = memories
+            self._size = 0
+            self._clear()
+        for position in range(self._size, len(memories)):
+            self._add(position, memories[position])
+        self._size = len(memories)
+        self._last = memories[-1] if memories else None
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Drop everything indexed so far."""
+
+    @abstractmethod
+    def _add(self, position: int, memory: MemoryRecord) -> None:
+        """Index ``memory``, found at ``position`` in the list."""
+
+
+class TagIndex(MemoryIndex):
+    """Inverted index from each tag to the memories carrying it.
+
+    Tagged lookups only touch the matching memories.
+    """
+
+    def _clear(self) -> None:
+        self._by_tag: Dict[str, List[int]] = {}
+
+    def _add(self, position: int, memory: MemoryRecord) -> None:
+        for tag in dict.fromkeys(memory.tags):
+            self._by_tag.setdefault(tag, []).append(position)
+
+    def lookup(
+        self, memories: List[MemoryRecord], tags: Iterable[str]
+    ) -> List[MemoryRecord]:
+        """Return the memories carrying any of ``tags``, oldest first."""
+
+        self.sync(memories)
+        found: set[int] = set()
+        for tag in tags:
+            found.update(self._by_tag.get(tag, ()))
+        return [memories[position] for position in sorted(found)]
 
 
 def remember(
-    memories: List[MemoryItem],
+    memories: List[MemoryRecord],
     content: str,
     importance: float = 1.0,
     tags: Optional[Iterable[str]] = None,
-) -> None:
-    """Add a memory to the list with optional ``tags``."""
+    capacity: Optional[int] = None,
+    slack: int = 0,
+    timestamp: float = 0.0,
+    decay_rate: float = 1.0,
+    index: Optional[TagIndex] = None,
+) -> List[MemoryRecord]:
+    """Add a memory to the list with optional ``tags``.
+
+    ``importance`` applies at clock ``timestamp`` and decays by
+    ``decay_rate`` per clock unit after it.  With a ``capacity``, once the
+    list holds more than ``capacity + slack`` memories it is trimmed back to
+    ``capacity`` with :func:`forget`; a ``slack`` lets many additions share
+    one trim.  A tag ``index`` of the list is kept up to date.  Returns the
+    memories forgotten by the trim, which may leave the list as long as it
+    was before the addition.
+    """
 
     memories.append(
-        MemoryItem(content=content, importance=importance, tags=list(tags or []))
+        MemoryRecord(content, importance, tags or (), timestamp, decay_rate)
     )
+    forgotten: List[MemoryRecord] = []
+    if capacity is not None and len(memories) > capacity + slack:
+        forgotten = forget(memories, capacity, now=timestamp)
+    if index is not None:
+        index.sync(memories)
+    return forgotten
+
+
+def forget(
+    memories: List[MemoryRecord], capacity: int, now: Optional[float] = None
+) -> List[MemoryRecord]:
+    """Trim ``memories`` in place to at most ``capacity`` items.
+
+    The memories least important at clock ``now`` are forgotten first and,
+    among equally important ones, the oldest.  The remaining memories keep
+    their order.  Returns the forgotten memories.
+    """
+
+    excess = len(memories) - max(capacity, 0)
+    if excess <= 0:
+        return []
+    drop = set(
+        heapq.nsmallest(
+            excess,
+            range(len(memories)),
+            key=lambda i: (memories[i].importance_at(now), i),
+        )
+    )
+    forgotten = [m for i, m in enumerate(memories) if i in drop]
+    memories[:] = [m for i, m in enumerate(memories) if i not in drop]
+    return forgotten
 
 
 def recall(
-    memories: List[MemoryItem],
+    memories: List[MemoryRecord],
     k: int = 5,
     tags: Optional[Iterable[str]] = None,
-) -> List[MemoryItem]:
-    """Return the top-K memories filtered by ``tags`` and sorted by importance."""
+    now: Optional[float] = None,
+    index: Optional[TagIndex] = None,
+) -> List[MemoryRecord]:
+    """Return the top-K memories filtered by ``tags`` and sorted by importance.
 
-    items = memories
-    if tags:
+    Importance is taken as decayed to clock ``now``.  Selection uses a heap
+    of size ``k``, so it costs O(n log k) rather than a full sort; equally
+    important memories keep their order.  With a tag ``index`` of
+    ``memories`` only the memories carrying ``tags`` are examined.
+    """
+
+    items: Iterable[MemoryRecord] = memories
+    if tags and index is not None:
+        items = index.lookup(memories, tags)
+    elif tags:
         tag_set = set(tags)
-        items = [m for m in memories if tag_set.intersection(m.tags)]
-    return sorted(items, key=lambda m: m.importance, reverse=True)[:k]
+        items = (m for m in memories if tag_set.intersection(m.tags))
+    return heapq.nlargest(k, items, key=lambda m: m.importance_at(now))
+
+
+def decay(memories: List[MemoryRecord], rate: float = 0.9) -> None:
+    """Decay the importance of all memories by ``rate`` right away.
 
+    This rewrites every memory; memories given a ``decay_rate`` and ranked
+    with ``now`` decay continuously instead, at no cost.
+    """
 
-def decay(memories: List[MemoryItem], rate: float = 0.9) -> None:
-    """Decay the importance of all memories by ``rate``."""
     for memory in memories:
         memory.importance *= rate
@@ -116,7 +116,9 @@ class GameState(Base):
     __tablename__ = "game_states"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    world_id: Mapped[int] = mapped_column(ForeignKey("world_meta.id"), nullable=False)
+    world_id: Mapped[int] = mapped_column(
+        ForeignKey("world_meta.id"), nullable=False, index=True
+    )
     current_location: Mapped[int] = mapped_column(
         ForeignKey("locations.id"), nullable=False
     )
@@ -127,6 +129,11 @@ class GameState(Base):
     pending_roll: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
     elapsed_time: Mapped[float] = mapped_column(default=0.0)
     last_needs_update: Mapped[float] = mapped_column(default=0.0)
+    last_options: Mapped[List[str]] = mapped_column(JSON, default=list)
+    turn_count: Mapped[int] = mapped_column(default=0)
+    journal_seq: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[float] = mapped_column(default=0.0)
+    size: Mapped[int] = mapped_column(default=0)
 
     def add_companion(self, companion: Dict[str, Any]) -> None:
         """Add a companion to the party enforcing a limit of three."""
@@ -145,3 +152,15 @@ class GameState(Base):
             raise ValueError("party already has maximum pets")
         data = {"type": "pet", **pet}
         self.party.append(data)
+
+
+class GameJournalEntry(Base):
+    """State delta recorded for a game since its last snapshot."""
+
+    __tablename__ = "game_journal"
+
+    game_id: Mapped[int] = mapped_column(
+        ForeignKey("game_states.id"), primary_key=True
+    )
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    entry: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
@@ -0,0 +1,137 @@
+"""Local retrieval of memories relevant to what the player just said.
+
+Memories are represented as hashed TF-IDF vectors: words are hashed into a
+fixed number of buckets and weighted by sublinear term frequency, with
+inverse document frequencies taken from the memories indexed so far.  The
+vectors are kept as postings lists, so adding a memory only touches its own
+words and scoring a query only touches memories sharing a word with it.
+Everything runs on the CPU without models or extra dependencies.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .memory import MemoryIndex, MemoryRecord, recall
+
+# Number of hash buckets words are folded into.
+HASH_BUCKETS = 2**18
+
+# Words found in more than this share of the memories (once there are
+# ``COMMON_MIN_MEMORIES`` of them) carry little meaning and are skipped when
+# scoring, so queries never walk postings covering most memories.
+COMMON_WORD_SHARE = 0.5
+COMMON_MIN_MEMORIES = 20
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def features(text: str) -> Dict[int, float]:
+    """Return the hashed term weights of ``text``.
+
+    Hashing uses CRC-32 so vectors are stable across processes.
+    """
+
+    counts = Counter(
+        zlib.crc32(word.encode("utf-8")) % HASH_BUCKETS
+        for word in _WORD_RE.findall(text.lower())
+    )
+    return {bucket: 1.0 + math.log(count) for bucket, count in counts.items()}
+
+
+class SemanticIndex(MemoryIndex):
+    """Hashed TF-IDF vectors of a memory list, inserted incrementally."""
+
+    def _clear(self) -> None:
+        self._postings: Dict[int, List[tuple[int, float]]] = {}
+        self._norms: List[float] = []
+
+    def _add(self, position: int, memory: MemoryRecord) -> None:
+        weights = features(memory.content)
+        for bucket, weight in weights.items():
+            self._postings.setdefault(bucket, []).append((position, weight))
+        self._norms.append(math.sqrt(sum(w * w for w in weights.values())) or 1.0)
+
+    def similarities(self, memories: List[MemoryRecord], text: str) -> Dict[int, float]:
+        """Return the similarity of ``text`` to each memory sharing a word.
+
+        Keys are positions in ``memories``; the best match scores ``1.0``.
+        """
+
+        self.sync(memories)
+        scores: Dict[int, float] = {}
+        for bucket, weight in features(text).items():
+            postings = self._postings.get(bucket)
+            if not postings or (
+                self._size >= COMMON_MIN_MEMORIES
+                and len(postings) > COMMON_WORD_SHARE * self._size
+            ):
+                continue
+            idf = math.log((self._size + 1) / (len(postings) + 1)) + 1.0
+            weight *= idf * idf
+            for position, doc_weight in postings:
+                scores[position] = scores.get(position, 0.0) + weight * doc_weight
+        if not scores:
+            return {}
+        for position in scores:
+            scores[position] /= self._norms[position]
+        best = max(scores.values())
+        return {position: score / best for position, score in scores.items()}
+
+
+def recall_relevant(
+    memories: List[MemoryRecord],
+    query: str,
+    k: int = 5,
+    now: Optional[float] = None,
+    index: Optional[SemanticIndex] = None,
+    similarity_weight: float = 1.0,
+    importance_weight: float = 0.25,
+    recency_weight: float = 0.25,
+    half_life: float = 20.0,
+) -> List[MemoryRecord]:
+    """Return the ``k`` memories most relevant to ``query``.
+
+    Memories sharing words with ``query`` are ranked by a weighted sum of
+    their similarity, their importance at clock ``now`` and their recency,
+    which halves every ``half_life`` clock units.  Remaining slots are
+    filled with the most important memories, as :func:`recall` picks them.
+
+    Parameters
+    ----------
+    memories:
+        Memories to choose from.
+    query:
+        Text the memories should be relevant to, such as the player's message.
+    k:
+        Number of memories to return.
+    now:
+        Current game clock, for decay and recency.
+    index:
+        Semantic index kept for ``memories``; without one a temporary index
+        is built.
+    """
+
+    index = index if index is not None else SemanticIndex()
+    similarities = index.similarities(memories, query)
+
+    def score(position: int) -> float:
+        memory = memories[position]
+        age = max(now - memory.timestamp, 0.0) if now is not None else 0.0
+        return (
+            similarity_weight * similarities[position]
+            + importance_weight * memory.importance_at(now)
+            + recency_weight * 0.5 ** (age / half_life)
+        )
+
+    ranked = heapq.nlargest(k, similarities, key=lambda p: (score(p), p))
+    chosen = [memories[position] for position in ranked]
+    if len(chosen) < k:
+        taken = {id(m) for m in chosen}
+        chosen.extend(m for m in recall(memories, k, now=now) if id(m) not in taken)
+    return chosen[:k]
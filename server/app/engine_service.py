@@ -2,15 +2,36 @@
 
 from __future__ import annotations
 
+import asyncio
+import itertools
 import json
+import logging
+import os
 import re
+import threading
+import time
 import uuid
-from dataclasses import dataclass, field
+from collections.abc import AsyncIterator
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from functools import partial
 from pathlib import Path
 from typing import Any, Dict
 
-from engine.context import build_prompt
-from engine.memory import MemoryItem, remember
+import httpx
+
+from engine.consolidation import NearDuplicateIndex, consolidate
+from engine.context import build_prompt, build_world_context, scope_tags
+from engine.mechanics import roll_request_end
+from engine.memory import (
+    MemoryItem,
+    MemoryRecord,
+    TagIndex,
+    dump_memories,
+    load_memories,
+    remember,
+)
+from engine.retrieval import SemanticIndex
 from engine.world_loader import (
     World,
     SectionEntry,
@@ -19,8 +40,24 @@ from engine.world_loader import (
 )
 from engine.rules import get_ruleset
 
-from .llm.ollama_client import generate
+from . import timing, transcripts
+from .game_locks import game_locks
+from .llm import prompt_cache
+from .llm.cache import ResponseCache, cache_from_env
+from .llm.ollama_client import KEEP_ALIVE, generate, stream
+from .llm.router import BackendPool
+from .llm.scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_ROLL,
+    PRIORITY_TURN,
+    llm_scheduler,
+)
+from .residency import GameCache
+from .save_writer import save_writer
+from .summarizer import memory_summarizer
+from .storage import FileGameRepository, GameRepository, repository_from_env
 
+logger = logging.getLogger(__name__)
 
 _OPTION_RE = re.compile(r"^\s*(\d+)[.)]\s*(.+)")
 
@@ -45,11 +82,24 @@ WORLD_DIR.mkdir(parents=True, exist_ok=True)
 _WORLD_FILES: dict[Path, int] = {}
 
 
-# In-memory storage used as a temporary stand‑in for a database.  The
-# surrounding application will eventually replace this with proper
-# persistence but for now it allows ``run_turn`` to function in tests and
-# examples without additional infrastructure.
-_GAME_STATES: dict[int, "GameState"] = {}
+# Games kept in memory at once; the least recently used game is written out
+# and dropped beyond this, and read back when it is next needed.  ``0`` keeps
+# every game resident.
+MAX_RESIDENT_GAMES = int(os.environ.get("TOY_MAX_RESIDENT_GAMES", "256"))
+
+# Worker processes serving games when sharded by ``server.app.sharding``, and
+# the index of this one.  Each worker owns the games whose id modulo the
+# worker count equals its index.
+WORKER_COUNT = int(os.environ.get("TOY_WORKERS", "1"))
+WORKER_INDEX = int(os.environ.get("TOY_WORKER_INDEX", "0"))
+
+# In-memory game states, loaded from the saves on first access.
+_GAME_STATES: GameCache["GameState"] = GameCache(
+    MAX_RESIDENT_GAMES,
+    load=lambda game_id: _hydrate_game(game_id),
+    evict=lambda game_id, state: _evict_game(game_id, state),
+    pinned=lambda game_id: game_locks.locked(game_id),
+)
 _WORLDS: dict[int, World] = {}
 
 MAX_HUNGER = 10
@@ -59,6 +109,47 @@ THIRST_DECAY_SECONDS = 1800
 NEEDS_DAMAGE = 1
 TURN_TIME_SECONDS = 60
 
+# Long-term memories kept per game; the least important are forgotten once
+# ``MEMORY_SLACK`` more have accumulated, so trimming (which forces a full
+# snapshot rather than a journal entry) happens once per that many turns.
+# ``0`` keeps every memory.
+MEMORY_CAPACITY = int(os.environ.get("TOY_MEMORY_CAPACITY", "1000"))
+MEMORY_SLACK = int(os.environ.get("TOY_MEMORY_SLACK", "50"))
+
+# Factor by which a memory's importance decays per turn; computed lazily
+# when memories are ranked, from the turn each memory was stored at.
+MEMORY_DECAY_RATE = float(os.environ.get("TOY_MEMORY_DECAY", "1.0"))
+
+# How the memories in a turn's prompt are chosen: ``"importance"`` takes the
+# most important ones, ``"relevance"`` those most related to the player's
+# message, weighed with importance and recency.
+MEMORY_RETRIEVAL_MODES = ("importance", "relevance")
+MEMORY_RETRIEVAL = os.environ.get("TOY_MEMORY_RETRIEVAL", "importance")
+if MEMORY_RETRIEVAL not in MEMORY_RETRIEVAL_MODES:
+    raise ValueError(f"Unknown memory retrieval mode: {MEMORY_RETRIEVAL}")
+
+# Estimated similarity from which a new memory is folded into an earlier
+# one it restates, boosting that memory instead of adding another.  ``0``
+# keeps every memory.
+MEMORY_MERGE_THRESHOLD = float(os.environ.get("TOY_MEMORY_MERGE_THRESHOLD", "0.7"))
+
+# Old memories are condensed by the LLM into chapter summaries appended to
+# the timeline, ``SUMMARY_BATCH`` of the oldest at a time, once a game holds
+# more than ``SUMMARY_THRESHOLD`` memories or has been idle for
+# ``SUMMARY_IDLE_SECONDS``.  The ``SUMMARY_KEEP`` newest memories are never
+# summarised.  Summaries only run while the summariser is started with the
+# app; a threshold of ``0`` disables them.
+SUMMARY_THRESHOLD = int(os.environ.get("TOY_SUMMARY_THRESHOLD", "200"))
+SUMMARY_BATCH = int(os.environ.get("TOY_SUMMARY_BATCH", "20"))
+SUMMARY_KEEP = int(os.environ.get("TOY_SUMMARY_KEEP", "20"))
+SUMMARY_IDLE_SECONDS = float(os.environ.get("TOY_SUMMARY_IDLE", "600"))
+SUMMARY_MODEL = os.environ.get("TOY_SUMMARY_MODEL", "llama3")
+
+# Past transcript entries matching the player's message that are added to a
+# turn's prompt, found through a keyword index of the transcript.  ``0``
+# disables the lookup.
+TRANSCRIPT_RECALL = int(os.environ.get("TOY_TRANSCRIPT_RECALL", "3"))
+
 
 def _validate_stats(world: World, stats: Dict[str, Any]) -> None:
     """Ensure stats conform to world configuration and ruleset limits."""
@@ -83,11 +174,33 @@ class GameState:
     party: list[dict[str, Any]] = field(default_factory=list)
     flags: dict[str, Any] = field(default_factory=dict)
     timeline: list[str] = field(default_factory=list)
-    memory: list[MemoryItem] = field(default_factory=list)
+    memory: list[MemoryRecord] = field(default_factory=list)
     pending_roll: Dict[str, Any] | None = None
     elapsed_time: float = 0.0
     last_needs_update: float = 0.0
     last_options: list[str] = field(default_factory=list)
+    turn_count: int = 0
+    # Derived from ``memory`` and never saved.
+    memory_index: TagIndex = field(default_factory=TagIndex, repr=False, compare=False)
+    memory_vectors: SemanticIndex = field(
+        default_factory=SemanticIndex, repr=False, compare=False
+    )
+    memory_duplicates: NearDuplicateIndex = field(
+        default_factory=NearDuplicateIndex, repr=False, compare=False
+    )
+    # Positions of memories changed in place since the last save.
+    memory_changed: set[int] = field(default_factory=set, repr=False, compare=False)
+    # Whether memories were forgotten since the last save, which only a
+    # snapshot can record.
+    memory_forgotten: bool = field(default=False, repr=False, compare=False)
+    # Monotonic time of the last turn, or of loading the game.
+    last_active: float = field(
+        default_factory=time.monotonic, repr=False, compare=False
+    )
+    # Keyword index of the transcript, persisted with it rather than here.
+    transcript_history: transcripts.TranscriptHistory | None = field(
+        default=None, repr=False, compare=False
+    )
 
     def add_companion(self, companion: dict[str, Any]) -> None:
         """Add a companion to the party enforcing a maximum of three."""
@@ -108,6 +221,43 @@ class GameState:
         self.party.append(data)
 
 
+# Near-duplicate memories folded into earlier ones since startup.
+_MEMORY_STATS = {"merges": 0}
+
+
+def _remember(state: GameState, content: str) -> None:
+    """Store ``content`` in long-term memory, tagged with its scope.
+
+    Content restating an earlier memory reinforces that memory instead.
+    """
+
+    if MEMORY_MERGE_THRESHOLD > 0:
+        position = consolidate(
+            state.memory,
+            content,
+            state.memory_duplicates,
+            MEMORY_MERGE_THRESHOLD,
+            timestamp=state.turn_count,
+        )
+        if position is not None:
+            state.memory_changed.add(position)
+            _MEMORY_STATS["merges"] += 1
+            return
+    world = _WORLDS.get(state.world_id)
+    forgotten = remember(
+        state.memory,
+        content,
+        tags=scope_tags(world, state.current_location, content) if world else None,
+        capacity=MEMORY_CAPACITY or None,
+        slack=MEMORY_SLACK,
+        timestamp=state.turn_count,
+        decay_rate=MEMORY_DECAY_RATE,
+        index=state.memory_index,
+    )
+    if forgotten:
+        state.memory_forgotten = True
+
+
 def _update_survival_needs(state: GameState, now: float | None = None) -> None:
     """Update hunger and thirst based on elapsed in-game time."""
 
@@ -156,10 +306,14 @@ def advance_time(game_id: int, seconds: float) -> None:
     _advance_time(state, seconds)
 
 
-def _load_world_files() -> None:
-    """Load world definitions from markdown files into memory."""
+def load_world_files() -> None:
+    """Load world definitions from markdown files not loaded yet.
+
+    Files are read in name order, so workers that load them at startup and
+    rescan them in the same order as world imports number worlds alike.
+    """
 
-    for path in WORLD_DIR.glob("*.md"):
+    for path in sorted(WORLD_DIR.glob("*.md")):
         if path in _WORLD_FILES:
             continue
         try:
@@ -174,7 +328,7 @@ def _load_world_files() -> None:
 def list_worlds() -> list[dict[str, Any]]:
     """Return a minimal listing of available worlds."""
 
-    _load_world_files()
+    load_world_files()
     return [
         {"id": wid, "title": w.title, "ruleset": w.ruleset}
         for wid, w in _WORLDS.items()
@@ -205,12 +359,34 @@ def get_world(world_id: int) -> World:
     return world
 
 
+def owns_game(game_id: int) -> bool:
+    """Return whether this worker process serves ``game_id``."""
+
+    return game_id % WORKER_COUNT == WORKER_INDEX
+
+
+def _next_game_id() -> int:
+    new_id = _GAME_STATES.next_id()
+    return new_id + (WORKER_INDEX - new_id) % WORKER_COUNT
+
+
+def reserve_saved_ids() -> None:
+    """Allocate new game ids above every saved game.
+
+    Called at startup, so games created by this process never overwrite a
+    save, including one written by another worker.
+    """
+
+    _, games = _repository().list_games()
+    _GAME_STATES.max_id = max([_GAME_STATES.max_id, *(g["id"] for g in games)])
+
+
 def create_game(world_id: int) -> int:
     """Create a new game state for the given world."""
 
     if world_id not in _WORLDS:
         raise KeyError(f"Unknown world id: {world_id}")
-    new_id = max(_GAME_STATES.keys(), default=0) + 1
+    new_id = _next_game_id()
     _GAME_STATES[new_id] = GameState(world_id=world_id, current_location=0)
     return new_id
 
@@ -354,7 +530,9 @@ def update_game_state(game_id: int, updates: Dict[str, Any]) -> None:
     if "flags" in updates:
         state.flags.update(updates["flags"])
     if "memory" in updates:
-        state.memory = [MemoryItem(**m) for m in updates["memory"]]
+        state.memory = [
+            MemoryRecord.from_item(MemoryItem(**m)) for m in updates["memory"]
+        ]
 
 
 STATE_UPDATE_PREFIX = "STATE_UPDATE:"
@@ -391,6 +569,19 @@ def _apply_state_updates(state: GameState, updates: Dict[str, Any]) -> None:
         state.current_location = int(updates["current_location"])
 
 
+def _parse_state_update(line: str) -> Dict[str, Any] | None:
+    """Return the updates carried by a ``STATE_UPDATE:`` line, if any."""
+
+    if not line.startswith(STATE_UPDATE_PREFIX):
+        return None
+    json_part = line[len(STATE_UPDATE_PREFIX) :].strip()
+    try:
+        updates = json.loads(json_part)
+    except json.JSONDecodeError:  # pragma: no cover - invalid update format
+        return None
+    return updates if isinstance(updates, dict) else None
+
+
 def _extract_state_updates(state: GameState, narration: str) -> str:
     """Strip state update markers from narration and apply them."""
 
@@ -398,10 +589,10 @@ def _extract_state_updates(state: GameState, narration: str) -> str:
     kept: list[str] = []
     for line in lines:
         if line.startswith(STATE_UPDATE_PREFIX):
-            json_part = line[len(STATE_UPDATE_PREFIX) :].strip()
+            updates = _parse_state_update(line)
             try:
-                updates = json.loads(json_part)
-                _apply_state_updates(state, updates)
+                if updates is not None:
+                    _apply_state_updates(state, updates)
             except Exception:  # pragma: no cover - invalid update format
                 pass
         else:
@@ -413,83 +604,368 @@ def _transcript_path(game_id: int) -> Path:
     return SAVE_DIR / f"game_{game_id}.jsonl"
 
 
-def _autosave_path(game_id: int) -> Path:
-    return SAVE_DIR / f"game_{game_id}.json"
+# Database storage selected with ``TOY_STORAGE``; ``None`` keeps game state in
+# files under ``SAVE_DIR``.
+_DB_REPOSITORY = repository_from_env(SAVE_DIR)
+
+
+def _repository() -> GameRepository:
+    return _DB_REPOSITORY or FileGameRepository(SAVE_DIR)
+
+
+def close_storage() -> None:
+    """Release the database connections of the game repository."""
+
+    if _DB_REPOSITORY is not None:
+        _DB_REPOSITORY.close()
+
+
+def _transcript_history(
+    game_id: int, state: GameState
+) -> transcripts.TranscriptHistory:
+    if state.transcript_history is None:
+        state.transcript_history = transcripts.TranscriptHistory(
+            _transcript_path(game_id)
+        )
+    return state.transcript_history
+
+
+async def _load_transcript_history(game_id: int, state: GameState) -> None:
+    """Load the keyword index of the transcript in a worker thread.
+
+    Called on every turn before anything is appended, since appending to an
+    index that is not loaded yet loads it on the event loop.
+    """
+
+    if TRANSCRIPT_RECALL <= 0:
+        return
+    history = _transcript_history(game_id, state)
+    if not history.loaded:
+        await asyncio.to_thread(history.load)
 
 
 def append_transcript(game_id: int, actor: str, text: str) -> None:
     entry = {"actor": actor, "text": text}
     path = _transcript_path(game_id)
-    with path.open("a", encoding="utf-8") as fh:
-        fh.write(json.dumps(entry) + "\n")
+    if TRANSCRIPT_RECALL > 0 and _GAME_STATES.resident(game_id):
+        _transcript_history(game_id, _GAME_STATES[game_id]).add(text)
+    save_writer.append(
+        path, json.dumps(entry) + "\n", partial(transcripts.append_entries, path)
+    )
 
 
-def read_transcript(game_id: int) -> list[dict[str, str]]:
+def read_transcript(
+    game_id: int,
+    limit: int | None = None,
+    before: int | None = None,
+    after: int | None = None,
+) -> list[dict[str, str]]:
     """Return the stored transcript for a game.
 
     Each entry contains the ``actor`` and their ``text``. If no transcript
-    exists yet for the given ``game_id``, an empty list is returned.
+    exists yet for the given ``game_id``, an empty list is returned.  See
+    :func:`read_transcript_page` for ``limit``, ``before`` and ``after``.
     """
 
-    path = _transcript_path(game_id)
-    if not path.exists():
-        return []
+    return read_transcript_page(game_id, limit, before, after)[2]
 
-    entries: list[dict[str, str]] = []
-    with path.open("r", encoding="utf-8") as fh:
-        for line in fh:
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            if (
-                isinstance(entry, dict)
-                and {
-                    "actor",
-                    "text",
-                }
-                <= entry.keys()
-            ):
-                entries.append(
-                    {
-                        "actor": str(entry["actor"]),
-                        "text": str(entry["text"]),
-                    }
-                )
-    return entries
+
+def read_transcript_page(
+    game_id: int,
+    limit: int | None = None,
+    before: int | None = None,
+    after: int | None = None,
+) -> tuple[int, int, list[dict[str, str]]]:
+    """Return one page of a game's transcript.
+
+    Entries are numbered from zero.  ``after`` selects the first ``limit``
+    entries numbered above it, otherwise the last ``limit`` entries below
+    ``before`` (or the latest entries) are returned.  The result holds the
+    number of the first returned entry, the total entry count and the
+    entries.  Pages are located through the transcript's offset index, so
+    reading the latest page does not depend on the transcript length.
+    """
+
+    return transcripts.read_page(_transcript_path(game_id), limit, before, after)
+
+
+# A compacted snapshot replaces the journal after this many entries.
+SNAPSHOT_INTERVAL = int(os.environ.get("TOY_SNAPSHOT_INTERVAL", "50"))
+
+# Fields small enough to be journaled whole whenever they change.
+_JOURNAL_FIELDS = (
+    "world_id",
+    "current_location",
+    "party",
+    "flags",
+    "pending_roll",
+    "elapsed_time",
+    "last_needs_update",
+    "last_options",
+    "turn_count",
+)
+
+
+@dataclass
+class _JournalMark:
+    """What the journal of a game already covers.
+
+    ``memory`` and ``timeline`` are the lists journaled so far, so replacing
+    either list (rather than appending to it) forces a snapshot.
+    """
+
+    seq: int
+    entries: int
+    state: GameState
+    memory: list[MemoryRecord]
+    memory_len: int
+    timeline: list[str]
+    timeline_len: int
+    fields: dict[str, str]
+
+
+_JOURNALS: dict[int, _JournalMark] = {}
+
+
+def _encoded_fields(state: GameState) -> dict[str, str]:
+    return {name: json.dumps(getattr(state, name)) for name in _JOURNAL_FIELDS}
+
+
+def _mark(state: GameState, seq: int, entries: int = 0) -> _JournalMark:
+    return _JournalMark(
+        seq=seq,
+        entries=entries,
+        state=state,
+        memory=state.memory,
+        memory_len=len(state.memory),
+        timeline=state.timeline,
+        timeline_len=len(state.timeline),
+        fields=_encoded_fields(state),
+    )
+
+
+def _manifest_info(state: GameState) -> Dict[str, Any]:
+    return {
+        "world_id": state.world_id,
+        "updated_at": time.time(),
+        "turns": state.turn_count,
+    }
+
+
+def _serialize_game_state(
+    game_id: int, state: GameState | None = None
+) -> tuple[str, Dict[str, Any], int]:
+    """Return the snapshot document, manifest info and snapshot version."""
+
+    if state is None:
+        state = _GAME_STATES[game_id]
+    data = _export_state(game_id, state, compact=True)
+    mark = _JOURNALS.get(game_id)
+    data["journal_seq"] = mark.seq if mark is not None else 0
+    return json.dumps(data), _manifest_info(state), next(_SNAPSHOT_VERSIONS)
+
+
+# Snapshots of evicted games that may not be written yet, so that a game
+# read back before its snapshot reaches the store is not loaded stale.  Each
+# holds the version of the snapshot, the document and the transcript index,
+# whose latest entries may not be written yet either.
+_EVICTED: dict[int, tuple[int, str, transcripts.TranscriptHistory | None]] = {}
+_EVICTED_LOCK = threading.Lock()
+_SNAPSHOT_VERSIONS = itertools.count(1)
+
+
+def _write_snapshot(
+    repository: GameRepository, game_id: int, payload: tuple[str, Dict[str, Any], int]
+) -> None:
+    document, info, version = payload
+    repository.write_snapshot(game_id, document, info)
+    with _EVICTED_LOCK:
+        pending = _EVICTED.get(game_id)
+        if pending is not None and pending[0] <= version:
+            del _EVICTED[game_id]
 
 
 def autosave_game_state(game_id: int) -> None:
-    data = export_game_state(game_id)
-    path = _autosave_path(game_id)
-    with path.open("w", encoding="utf-8") as fh:
-        json.dump(data, fh)
+    """Write a compacted snapshot of ``game_id`` and empty its journal."""
+
+    state = _GAME_STATES.get(game_id)
+    if state is None:
+        raise KeyError(f"Unknown game id: {game_id}")
+    previous = _JOURNALS.get(game_id)
+    _JOURNALS[game_id] = _mark(state, previous.seq if previous else 0)
+    state.memory_changed.clear()
+    state.memory_forgotten = False
+    save_writer.save(
+        ("snapshot", game_id),
+        lambda: _serialize_game_state(game_id),
+        partial(_write_snapshot, _repository(), game_id),
+    )
+
+
+def _evict_game(game_id: int, state: GameState) -> None:
+    """Queue a snapshot of ``state`` before it is dropped from memory.
+
+    The snapshot is serialised immediately since the state is gone by the
+    time the save writer runs; it replaces any snapshot already queued.
+    """
+
+    payload = _serialize_game_state(game_id, state)
+    with _EVICTED_LOCK:
+        _EVICTED[game_id] = (payload[2], payload[0], state.transcript_history)
+    _JOURNALS.pop(game_id, None)
+    save_writer.save(
+        ("snapshot", game_id),
+        lambda: payload,
+        partial(_write_snapshot, _repository(), game_id),
+    )
+
+
+def _hydrate_game(game_id: int) -> GameState | None:
+    """Load a game that is not resident, or return ``None`` if unknown."""
+
+    if not owns_game(game_id):
+        # Another worker serves it; loading a second copy would fork it.
+        return None
+    with _EVICTED_LOCK:
+        pending = _EVICTED.pop(game_id, None)
+    if pending is not None:
+        # Without a journal mark the next save is a snapshot, which replaces
+        # the queued eviction snapshot rather than racing it with appends.
+        state = _deserialize_game_state(json.loads(pending[1]))
+        state.transcript_history = pending[2]
+        return state
+    loaded = _repository().load(game_id)
+    if loaded is None:
+        return None
+    data, replayed = loaded
+    state = _deserialize_game_state(data)
+    # Keep numbering after the replayed entries; the next save snapshots
+    # if the journal has grown long.
+    _JOURNALS[game_id] = _mark(state, int(data["journal_seq"]), replayed)
+    return state
+
+
+async def ensure_resident(game_id: int) -> None:
+    """Load ``game_id`` into memory in a worker thread if it is not there.
+
+    Game lookups otherwise load missing games themselves, blocking the event
+    loop while the snapshot is read and the journal replayed.  Unknown games
+    are left for the lookup that follows to report.
+    """
+
+    await _GAME_STATES.fetch(game_id)
+
+
+def memory_stats() -> Dict[str, Any]:
+    """Return counters of long-term memory consolidation and summaries."""
+
+    return {**_MEMORY_STATS, "summaries": memory_summarizer.stats()}
+
+
+def game_cache_stats() -> Dict[str, Any]:
+    """Return residency counters of the in-memory game states."""
+
+    return {**_GAME_STATES.stats(), "pending_evictions": len(_EVICTED)}
+
+
+def schedule_autosave(game_id: int) -> None:
+    """Persist the changes made to ``game_id`` since its last save.
+
+    Appended memories and timeline entries plus any changed small fields are
+    written as one journal line, so the cost follows the size of the turn
+    rather than the game.  Every :data:`SNAPSHOT_INTERVAL` entries, or when a
+    change cannot be expressed as an append, such as forgotten memories, a
+    full snapshot is written instead.
+    """
+
+    state = _GAME_STATES.get(game_id)
+    if state is None:
+        raise KeyError(f"Unknown game id: {game_id}")
+    mark = _JOURNALS.get(game_id)
+    if (
+        mark is None
+        or mark.entries >= SNAPSHOT_INTERVAL
+        or mark.state is not state
+        or mark.memory is not state.memory
+        or mark.timeline is not state.timeline
+        or state.memory_forgotten
+        or len(state.memory) < mark.memory_len
+        or len(state.timeline) < mark.timeline_len
+    ):
+        autosave_game_state(game_id)
+        return
+
+    fields = _encoded_fields(state)
+    entry: Dict[str, Any] = {"seq": mark.seq + 1}
+    changed = {
+        name: getattr(state, name)
+        for name, encoded in fields.items()
+        if mark.fields[name] != encoded
+    }
+    if changed:
+        entry["state"] = changed
+    if len(state.memory) > mark.memory_len:
+        entry["memory"] = dump_memories(state.memory[mark.memory_len :])
+    updated = sorted(p for p in state.memory_changed if p < mark.memory_len)
+    if updated:
+        rows = dump_memories(state.memory[p] for p in updated)
+        entry["memory_updates"] = {str(p): row for p, row in zip(updated, rows)}
+    state.memory_changed.clear()
+    if len(state.timeline) > mark.timeline_len:
+        entry["timeline"] = state.timeline[mark.timeline_len :]
+
+    mark.seq += 1
+    mark.entries += 1
+    mark.memory_len = len(state.memory)
+    mark.timeline_len = len(state.timeline)
+    mark.fields = fields
+    save_writer.append(
+        ("journal", game_id),
+        json.dumps(entry) + "\n",
+        partial(_repository().append_journal, game_id, info=_manifest_info(state)),
+    )
 
 
 def load_autosave(game_id: int) -> None:
-    path = _autosave_path(game_id)
-    if not path.exists():
+    """Replace the in-memory state of ``game_id`` with its latest save."""
+
+    state = _hydrate_game(game_id)
+    if state is None:
         raise FileNotFoundError(f"No autosave for game {game_id}")
-    data = json.loads(path.read_text(encoding="utf-8"))
-    _GAME_STATES[game_id] = _deserialize_game_state(data)
+    if _GAME_STATES.resident(game_id):
+        # Loading does not roll the transcript back, so its index still holds.
+        state.transcript_history = _GAME_STATES[game_id].transcript_history
+    _GAME_STATES[game_id] = state
 
 
 def list_saved_games() -> list[dict[str, int]]:
-    """Return identifiers for saved games on disk."""
-    games: list[dict[str, int]] = []
-    for path in SAVE_DIR.glob("game_*.json"):
-        try:
-            game_id = int(path.stem.split("_")[1])
-            data = json.loads(path.read_text(encoding="utf-8"))
-            world_id = int(data["world_id"])
-        except (IndexError, KeyError, ValueError, json.JSONDecodeError):
-            continue
-        games.append({"id": game_id, "world_id": world_id})
-    return games
+    """Return identifiers for saved games."""
+    _, games = query_saved_games()
+    return [{"id": g["id"], "world_id": g["world_id"]} for g in games]
+
+
+def query_saved_games(
+    world_id: int | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> tuple[int, list[Dict[str, Any]]]:
+    """Return the number of matching saved games and one page of them.
+
+    Entries come from the save manifest and hold ``id``, ``world_id``,
+    ``updated_at``, ``turns`` and ``size`` in bytes, ordered by id.
+    """
+
+    return _repository().list_games(world_id, limit, offset)
+
+
+def rebuild_save_manifest() -> int:
+    """Recreate the save manifest from the saves and return the game count."""
+
+    return _repository().rebuild_manifest()
 
 
 def _deserialize_game_state(data: Dict[str, Any]) -> GameState:
-    memory = [MemoryItem(**m) for m in data.get("memory", [])]
+    memory = load_memories(data.get("memory", []))
     return GameState(
         world_id=int(data["world_id"]),
         current_location=int(data.get("current_location", 0)),
@@ -501,6 +977,7 @@ def _deserialize_game_state(data: Dict[str, Any]) -> GameState:
         elapsed_time=float(data.get("elapsed_time", 0.0)),
         last_needs_update=float(data.get("last_needs_update", 0.0)),
         last_options=list(data.get("last_options", [])),
+        turn_count=int(data.get("turn_count", 0)),
     )
 
 
@@ -510,6 +987,22 @@ def export_game_state(game_id: int) -> Dict[str, Any]:
     state = _GAME_STATES.get(game_id)
     if state is None:
         raise KeyError(f"Unknown game id: {game_id}")
+    return _export_state(game_id, state)
+
+
+def _export_state(
+    game_id: int, state: GameState, compact: bool = False
+) -> Dict[str, Any]:
+    """Return ``state`` as a JSON-ready document.
+
+    Memories are :class:`MemoryItem` mappings, or with ``compact`` the rows
+    of :func:`dump_memories` used by saves.
+    """
+
+    if compact:
+        memory: list[Any] = dump_memories(state.memory)
+    else:
+        memory = [m.to_item().model_dump() for m in state.memory]
     return {
         "id": game_id,
         "world_id": state.world_id,
@@ -517,20 +1010,26 @@ def export_game_state(game_id: int) -> Dict[str, Any]:
         "party": state.party,
         "flags": state.flags,
         "timeline": state.timeline,
-        "memory": [m.model_dump() for m in state.memory],
+        "memory": memory,
         "pending_roll": state.pending_roll,
         "elapsed_time": state.elapsed_time,
         "last_needs_update": state.last_needs_update,
         "last_options": state.last_options,
+        "turn_count": state.turn_count,
     }
 
 
 def import_game_state(data: Dict[str, Any]) -> int:
-    """Create a new game from a previously exported state."""
+    """Create a new game from a previously exported state.
+
+    A ``transcript`` included in the export is restored as well.
+    """
 
     state = _deserialize_game_state(data)
-    new_id = max(_GAME_STATES.keys(), default=0) + 1
+    new_id = _next_game_id()
     _GAME_STATES[new_id] = state
+    for entry in data.get("transcript", []):
+        append_transcript(new_id, entry["actor"], entry["text"])
     return new_id
 
 
@@ -558,22 +1057,88 @@ SYSTEM_INSTRUCTIONS = (
 )
 
 
-async def run_turn(
-    game_id: int, player_message: str, *, model: str = "llama3"
-) -> DMResponse:
-    """Run a single game turn and return the DM's response.
+def _detect_roll(narration: str) -> tuple[str, Dict[str, Any] | None]:
+    """Truncate ``narration`` after a roll request and describe the request."""
 
-    Parameters
-    ----------
-    game_id:
-        Identifier of the game state to operate on.
-    player_message:
-        The latest message supplied by the player.
-    model:
-        Ollama model tag to use for generation.
+    # Attempt to detect roll requests.  This module is introduced in a
+    # later phase of development, so we fail gracefully if it is missing.
+    try:  # pragma: no cover - simple optional dependency shim
+        from engine import mechanics
+    except Exception:  # pragma: no cover - executed only when module absent
+
+        class _MechanicsFallback:
+            @staticmethod
+            def detect_roll_request(_: str) -> Dict[str, Any] | None:
+                return None
+
+            _ROLL_RE = None
+
+        mechanics = _MechanicsFallback()
+
+    roll_request_obj = mechanics.detect_roll_request(narration)
+    if not roll_request_obj:
+        return narration, None
+    roll_re = getattr(mechanics, "_ROLL_RE", None)
+    if roll_re:
+        match = roll_re.search(narration)
+        if match:
+            end = match.end()
+            while end < len(narration) and narration[end] in ".!? ":
+                end += 1
+            narration = narration[:end].rstrip()
+    roll_request = roll_request_obj.model_dump()
+    roll_request["id"] = str(uuid.uuid4())
+    return narration, roll_request
+
+
+def _build_prompts(
+    world: World, state: GameState, tail: str, query: str | None = None
+) -> tuple[str | None, str]:
+    """Return the system text and prompt for a generation ending in ``tail``.
+
+    ``query`` is the player's message, used to recall past transcript
+    entries and, when :data:`MEMORY_RETRIEVAL` is ``"relevance"``, to pick
+    relevant memories.
+
+    With :data:`STABLE_PROMPT_PREFIX` enabled, the instructions and world
+    details form a separate system text that is identical on every turn of a
+    game; otherwise everything is folded into a single prompt and the system
+    text is ``None``.
     """
 
-    state = _GAME_STATES.get(game_id)
+    rules = get_ruleset(world.ruleset)
+    options = {
+        "query": query if MEMORY_RETRIEVAL == "relevance" else None,
+        "history_query": query,
+        "history_k": TRANSCRIPT_RECALL,
+    }
+    if STABLE_PROMPT_PREFIX:
+        system = (
+            f"{SYSTEM_INSTRUCTIONS}\n{rules.system_instructions}\n"
+            f"{build_world_context(world)}"
+        )
+        prompt_context = build_prompt(world, state, include_world=False, **options)
+        return system, f"{prompt_context}\n{tail}"
+    prompt_context = build_prompt(world, state, **options)
+    prompt = (
+        f"{SYSTEM_INSTRUCTIONS}\n{rules.system_instructions}\n{prompt_context}\n"
+        f"{tail}"
+    )
+    return None, prompt
+
+
+async def _prepare_turn(
+    game_id: int, player_message: str
+) -> tuple[GameState, str, str | None, str]:
+    """Advance the game clock and build the prompt for a player turn.
+
+    The prompt is built in a worker thread, as recalling past exchanges
+    reads the transcript.  Returns the game state, the player message after
+    resolving numeric option selections, and the system text and prompt to
+    send to the LLM.
+    """
+
+    state = await _GAME_STATES.fetch(game_id)
     if state is None:
         raise KeyError(f"Unknown game id: {game_id}")
     _advance_time(state, TURN_TIME_SECONDS)
@@ -590,155 +1155,569 @@ async def run_turn(
         raise KeyError(f"Unknown world id: {state.world_id}")
 
     # Assemble the prompt for the LLM.
-    rules = get_ruleset(world.ruleset)
-    prompt_context = build_prompt(world, state)
-    prompt = (
-        f"{SYSTEM_INSTRUCTIONS}\n{rules.system_instructions}\n{prompt_context}\n"
-        f"Player: {player_message}\nDM:"
+    await _load_transcript_history(game_id, state)
+    system, prompt = await asyncio.to_thread(
+        _build_prompts,
+        world,
+        state,
+        f"Player: {player_message}\nDM:",
+        query=player_message,
     )
+    return state, player_message, system, prompt
 
-    narration = await generate(model=model, prompt=prompt)
-    narration = _extract_state_updates(state, narration)
 
-    # Attempt to detect roll requests.  This module is introduced in a
-    # later phase of development, so we fail gracefully if it is missing.
-    try:  # pragma: no cover - simple optional dependency shim
-        from engine import mechanics
-    except Exception:  # pragma: no cover - executed only when module absent
-
-        class _MechanicsFallback:
-            @staticmethod
-            def detect_roll_request(_: str) -> Dict[str, Any] | None:
-                return None
-
-            _ROLL_RE = None
+def _finish_turn(
+    game_id: int,
+    state: GameState,
+    narration: str,
+    entries: list[tuple[str, str]],
+) -> DMResponse:
+    """Commit DM ``narration`` to the game and persist the turn.
 
-        mechanics = _MechanicsFallback()
+    ``entries`` are the transcript lines preceding the DM's reply.
+    """
 
-    roll_request_obj = mechanics.detect_roll_request(narration)
-    if roll_request_obj:
-        roll_re = getattr(mechanics, "_ROLL_RE", None)
-        if roll_re:
-            match = roll_re.search(narration)
-            if match:
-                end = match.end()
-                while end < len(narration) and narration[end] in ".!? ":
-                    end += 1
-                narration = narration[:end].rstrip()
-        roll_request = roll_request_obj.model_dump()
-        roll_request["id"] = str(uuid.uuid4())
-        awaiting_player_roll = True
-    else:
-        roll_request = None
-        awaiting_player_roll = False
-    state.pending_roll = roll_request
+    with timing.phase("commit"):
+        narration, roll_request = _detect_roll(narration)
+        state.pending_roll = roll_request
 
-    # Track any numbered options for the next turn.
-    state.last_options = _extract_numbered_options(narration)
+        # Track any numbered options for the next turn.
+        state.last_options = _extract_numbered_options(narration)
+        state.turn_count += 1
+        state.last_active = time.monotonic()
 
-    # Store narration in long‑term memory.
-    remember(state.memory, narration)
+        # Store narration in long‑term memory.
+        _remember(state, narration)
 
-    # Persist the updated state.
-    _GAME_STATES[game_id] = state
+        # Persist the updated state.
+        _GAME_STATES[game_id] = state
 
-    append_transcript(game_id, "player", player_message)
-    append_transcript(game_id, "dm", narration)
-    autosave_game_state(game_id)
+        for actor, text in entries:
+            append_transcript(game_id, actor, text)
+        append_transcript(game_id, "dm", narration)
+        schedule_autosave(game_id)
+        if SUMMARY_THRESHOLD and len(state.memory) > SUMMARY_THRESHOLD:
+            memory_summarizer.wake()
 
     return DMResponse(
         message=narration,
-        awaiting_player_roll=awaiting_player_roll,
+        awaiting_player_roll=roll_request is not None,
         roll_request=roll_request,
     )
 
 
-async def submit_player_roll(
+# Generation is cut short at these markers, which the model would otherwise
+# use to start writing the player's next move itself.
+TURN_STOP_SEQUENCES = ["\nPlayer:", "\nSystem:"]
+
+# Stop generating once a roll request has been followed by a complete line
+# of further narration, since anything narrated after the request is
+# discarded anyway.  ``STATE_UPDATE:`` lines written right after the request
+# are still read and applied; updates after further narration describe an
+# outcome the roll has not decided yet and are lost with it.
+EARLY_STOP_ON_ROLL = True
+
+
+# Send the world and instructions as a byte-identical system prefix per game
+# so Ollama can reuse its prompt cache instead of re-evaluating it each turn.
+STABLE_PROMPT_PREFIX = os.environ.get("TOY_STABLE_PREFIX", "0") == "1"
+
+
+def _narrated_past(text: str, end: int) -> bool:
+    """Return whether a complete narration line follows the line holding ``end``.
+
+    ``STATE_UPDATE:`` lines do not count, so updates written after a roll
+    request are still received.
+    """
+
+    lines = text[end:].split("\n")[1:-1]
+    return any(
+        line.strip() and not line.startswith(STATE_UPDATE_PREFIX) for line in lines
+    )
+
+
+def _roll_requested(text: str) -> bool:
+    """Return whether ``text`` holds a roll request followed by more narration."""
+
+    end = roll_request_end(text)
+    return end is not None and _narrated_past(text, end)
+
+
+def _record_prefix(
+    game_id: int, system: str | None, prompt: str, stats: Dict[str, Any]
+) -> None:
+    if system is None:
+        return
+    entry = prompt_cache.record_turn(game_id, system, prompt, stats)
+    logger.debug(
+        "game %s prefix stable %s/%s turns, prefill %s tokens, saved %s",
+        game_id,
+        entry.stable_turns,
+        entry.turns,
+        entry.last_prefill_tokens,
+        entry.last_tokens_saved,
+    )
+
+
+# Optional on-disk cache of raw model output, configured by ``LLM_CACHE_*``.
+_RESPONSE_CACHE: ResponseCache | None = cache_from_env()
+
+
+def _cache_key(model: str, system: str | None, prompt: str) -> str:
+    """Return the response cache key for a narration request."""
+
+    return ResponseCache.key(
+        model,
+        prompt,
+        system=system,
+        stop=TURN_STOP_SEQUENCES,
+        early_stop=EARLY_STOP_ON_ROLL,
+    )
+
+
+async def _cached_narration(model: str, system: str | None, prompt: str) -> str | None:
+    """Return cached raw narration for a request, if caching is enabled.
+
+    The cache is read in a worker thread.  Raises
+    :class:`~.llm.cache.CacheMiss` in replay mode.
+    """
+
+    if _RESPONSE_CACHE is None:
+        return None
+    key = _cache_key(model, system, prompt)
+    return await asyncio.to_thread(_RESPONSE_CACHE.get, key)
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    """Return usage statistics of the LLM response cache."""
+
+    if _RESPONSE_CACHE is None:
+        return {"mode": "off"}
+    return _RESPONSE_CACHE.stats()
+
+
+async def _store_narration(
+    model: str, system: str | None, prompt: str, text: str
+) -> None:
+    if _RESPONSE_CACHE is not None:
+        key = _cache_key(model, system, prompt)
+        await asyncio.to_thread(_RESPONSE_CACHE.put, key, text)
+
+
+@asynccontextmanager
+async def _routed_client(
+    model: str,
     game_id: int,
-    request_id: str,
-    value: int,
-    mod: int = 0,
+    client: httpx.AsyncClient | None,
+    backends: BackendPool | None,
+) -> AsyncIterator[httpx.AsyncClient | None]:
+    """Yield ``client``, or a backend client chosen by ``backends``."""
+
+    if client is not None or backends is None:
+        yield client
+    else:
+        async with backends.route(model, game_id=game_id) as routed:
+            yield routed
+
+
+async def _generate_narration(
+    game_id: int,
+    model: str,
+    system: str | None,
+    prompt: str,
+    client: httpx.AsyncClient | None,
+    backends: BackendPool | None,
+    priority: int = PRIORITY_TURN,
+) -> str:
+    """Generate the DM's narration for ``prompt``.
+
+    Cached output is returned without generating.  Otherwise the request
+    waits for a slot in :data:`llm_scheduler`, which raises
+    :class:`~.llm.scheduler.QueueFull` when too many requests are waiting.
+    """
+
+    cached = await _cached_narration(model, system, prompt)
+    if cached is not None:
+        return cached
+    stats: Dict[str, Any] = {}
+    queued = time.perf_counter()
+    async with (
+        llm_scheduler.slot(model, game_id=game_id, priority=priority),
+        _routed_client(model, game_id, client, backends) as routed,
+    ):
+        timing.record("llm_queue", time.perf_counter() - queued)
+        with timing.phase("llm_generate"):
+            narration = await generate(
+                model=model,
+                prompt=prompt,
+                client=routed,
+                stop=TURN_STOP_SEQUENCES,
+                stop_when=_roll_requested if EARLY_STOP_ON_ROLL else None,
+                system=system,
+                keep_alive=KEEP_ALIVE if system is not None else None,
+                stats=stats,
+            )
+    _record_prefix(game_id, system, prompt, stats)
+    await _store_narration(model, system, prompt, narration)
+    return narration
+
+
+SUMMARY_INSTRUCTIONS = (
+    "Condense these events of a tabletop adventure into one short chapter of "
+    "the story so far. Write in the past tense and keep the names, places, "
+    "items and unresolved threads."
+)
+
+
+def summary_candidates(now: float | None = None) -> list[int]:
+    """Return the resident games with memories due to be summarised.
+
+    ``now`` is the :func:`time.monotonic` time to measure idleness from.
+    """
+
+    if not SUMMARY_THRESHOLD:
+        return []
+    now = time.monotonic() if now is None else now
+    due = []
+    for game_id in _GAME_STATES:
+        state = _GAME_STATES.peek(game_id)
+        if state is None:
+            continue
+        count = len(state.memory)
+        if count < SUMMARY_KEEP + SUMMARY_BATCH:
+            continue
+        if count > SUMMARY_THRESHOLD or now - state.last_active >= SUMMARY_IDLE_SECONDS:
+            due.append(game_id)
+    return due
+
+
+async def summarize_memories(
+    game_id: int,
+    *,
+    model: str = SUMMARY_MODEL,
+    client: httpx.AsyncClient | None = None,
+    backends: BackendPool | None = None,
+) -> bool:
+    """Condense the oldest memories of ``game_id`` into a chapter summary.
+
+    The :data:`SUMMARY_BATCH` oldest memories are summarised by the LLM at
+    background priority, without holding the game's lock.  The summary is
+    appended to the timeline and replaces those memories, unless they
+    changed in the meantime.  Returns whether a chapter was written.
+    """
+
+    state = _GAME_STATES.peek(game_id)
+    if state is None:
+        return False
+    memory = state.memory
+    if len(memory) < SUMMARY_KEEP + SUMMARY_BATCH:
+        return False
+    batch = memory[:SUMMARY_BATCH]
+    events = "\n".join(f"- {m.content}" for m in batch)
+    prompt = f"{SUMMARY_INSTRUCTIONS}\nEvents:\n{events}\nChapter:"
+    async with (
+        llm_scheduler.slot(model, priority=PRIORITY_BACKGROUND),
+        _routed_client(model, game_id, client, backends) as routed,
+    ):
+        summary = (await generate(model=model, prompt=prompt, client=routed)).strip()
+    if not summary:
+        return False
+
+    async with game_locks.hold(game_id):
+        state = _GAME_STATES.peek(game_id)
+        if state is None:
+            return False
+        if len(state.memory) < len(batch) or any(
+            a is not b for a, b in zip(state.memory, batch)
+        ):
+            return False
+        state.timeline.append(f"Chapter {len(state.timeline) + 1}: {summary}")
+        del state.memory[: len(batch)]
+        schedule_autosave(game_id)
+    return True
+
+
+async def run_turn(
+    game_id: int,
+    player_message: str,
     *,
     model: str = "llama3",
+    client: httpx.AsyncClient | None = None,
+    backends: BackendPool | None = None,
 ) -> DMResponse:
-    """Resolve a player-supplied roll and return the DM's narration."""
+    """Run a single game turn and return the DM's response.
 
-    state = _GAME_STATES.get(game_id)
-    if state is None:
-        raise KeyError(f"Unknown game id: {game_id}")
-    pending = state.pending_roll
-    if not pending or pending.get("id") != request_id:
-        raise ValueError("No matching pending roll")
+    Parameters
+    ----------
+    game_id:
+        Identifier of the game state to operate on.
+    player_message:
+        The latest message supplied by the player.
+    model:
+        Ollama model tag to use for generation.
+    client:
+        Ollama client to use instead of routing through ``backends``.
+    backends:
+        Pool of Ollama backends to route the request to.  Without either a
+        temporary client for the default URL is created.
+    """
 
-    _update_survival_needs(state)
+    async with game_locks.hold(game_id):
+        with timing.phase("prepare"):
+            state, player_message, system, prompt = await _prepare_turn(
+                game_id, player_message
+            )
 
-    world = _WORLDS.get(state.world_id)
-    if world is None:
-        raise KeyError(f"Unknown world id: {state.world_id}")
+        narration = await _generate_narration(
+            game_id, model, system, prompt, client, backends
+        )
+        narration = _extract_state_updates(state, narration)
 
-    # Resolve the roll using the world's configured ruleset.
-    rules = get_ruleset(world.ruleset)
-    dc = int(pending.get("dc") or 0)
-    _success, _total = rules.resolve_player_roll(value, mod, dc)
-    explanation = rules.format_roll_explanation(value, mod, dc)
+        return _finish_turn(game_id, state, narration, [("player", player_message)])
 
-    remember(state.memory, explanation)
 
-    # Clear the pending roll before generating the next narration so that the
-    # prompt does not include the guard line.
-    state.pending_roll = None
+class _NarrationStream:
+    """Incrementally split streamed narration into visible text and updates.
 
-    prompt_context = build_prompt(world, state)
-    prompt = (
-        f"{SYSTEM_INSTRUCTIONS}\n{rules.system_instructions}\n{prompt_context}\n"
-        f"System: {explanation}\nDM:"
-    )
+    ``STATE_UPDATE:`` lines are withheld from the client and parsed as soon
+    as they are complete, and relaying stops once a complete roll request
+    has been seen.  Numbered options are left to :func:`_finish_turn`.
+    """
 
-    narration = await generate(model=model, prompt=prompt)
-    narration = _extract_state_updates(state, narration)
+    def __init__(self) -> None:
+        self.text = ""
+        self.updates: list[Dict[str, Any]] = []
+        self.roll_end: int | None = None
+        self._line = ""
+        self._sent = 0
+
+    def _complete_line(self, line: str) -> None:
+        updates = _parse_state_update(line)
+        if updates is not None:
+            self.updates.append(updates)
+            return
+        if line.startswith(STATE_UPDATE_PREFIX):
+            return
+        self.text += line + "\n"
+
+    def _relay(self, check_roll: bool) -> str:
+        pending = self.text
+        line = self._line
+        if not (
+            STATE_UPDATE_PREFIX.startswith(line) or line.startswith(STATE_UPDATE_PREFIX)
+        ):
+            pending += line
+        if self.roll_end is None and check_roll:
+            self.roll_end = roll_request_end(pending)
+        limit = len(pending) if self.roll_end is None else self.roll_end
+        chunk = pending[self._sent : limit]
+        self._sent = max(self._sent, limit)
+        return chunk
+
+    def feed(self, token: str) -> str:
+        """Consume ``token`` and return the text that may be shown."""
+
+        *complete, self._line = (self._line + token).split("\n")
+        for line in complete:
+            self._complete_line(line)
+        return self._relay(check_roll=bool(complete) or ")" in token)
+
+    def close(self) -> str:
+        """Flush the final partial line and return any remaining text."""
+
+        line, self._line = self._line, ""
+        if line:
+            self._complete_line(line)
+        return self._relay(check_roll=True)
+
+    @property
+    def narration(self) -> str:
+        return self.text.strip()
+
+    @property
+    def finished(self) -> bool:
+        """Whether a complete roll request makes further text irrelevant."""
+
+        return self.roll_end is not None and _narrated_past(
+            self.text + self._line, self.roll_end
+        )
+
+
+async def start_turn_stream(
+    game_id: int,
+    player_message: str,
+    *,
+    model: str = "llama3",
+    client: httpx.AsyncClient | None = None,
+    backends: BackendPool | None = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Validate a turn and return an iterator streaming its narration.
+
+    The turn is prepared and its response cache lookup and LLM admission
+    check are done before returning, so unknown games and worlds
+    (:class:`KeyError`), replay-mode cache misses
+    (:class:`~.llm.cache.CacheMiss`) and a full LLM queue
+    (:class:`~.llm.scheduler.QueueFull`) are raised before a streaming
+    response starts.  The returned iterator holds the game's lock until it
+    is exhausted or closed, so callers must iterate or close it.  It yields
+    ``{"event": "token", "text": ...}`` dictionaries while the model is
+    generating, followed by a single ``{"event": "done", ...}`` carrying the
+    :class:`DMResponse` fields.  State, transcript and autosave are only
+    committed once generation has finished.
+    """
 
-    try:  # pragma: no cover - optional dependency shim
-        from engine import mechanics
-    except Exception:  # pragma: no cover - executed only when module absent
+    llm_scheduler.check_admission()
+    state = await _GAME_STATES.fetch(game_id)
+    if state is None:
+        raise KeyError(f"Unknown game id: {game_id}")
+    if state.world_id not in _WORLDS:
+        raise KeyError(f"Unknown world id: {state.world_id}")
+    events = _stream_turn(game_id, player_message, model, client, backends)
+    # Run up to the first yield, which follows the cache lookup.
+    await anext(events)
+    return events
 
-        class _MechanicsFallback:
-            @staticmethod
-            def detect_roll_request(_: str) -> Dict[str, Any] | None:
-                return None
 
-            _ROLL_RE = None
+async def _stream_turn(
+    game_id: int,
+    player_message: str,
+    model: str,
+    client: httpx.AsyncClient | None,
+    backends: BackendPool | None,
+) -> AsyncIterator[Dict[str, Any]]:
+    async with game_locks.hold(game_id):
+        with timing.phase("prepare"):
+            state, player_message, system, prompt = await _prepare_turn(
+                game_id, player_message
+            )
+        cached = await _cached_narration(model, system, prompt)
+        if cached is None:
+            llm_scheduler.check_admission()
+        yield {"event": "ready"}
+
+        narration = _NarrationStream()
+        if cached is not None:
+            text = narration.feed(cached)
+            if text:
+                yield {"event": "token", "text": text}
+        else:
+            async for text in _stream_generation(
+                narration, game_id, system, prompt, model, client, backends
+            ):
+                yield {"event": "token", "text": text}
+        text = narration.close()
+        if text:
+            yield {"event": "token", "text": text}
 
-        mechanics = _MechanicsFallback()
+        for updates in narration.updates:
+            try:
+                _apply_state_updates(state, updates)
+            except Exception:  # pragma: no cover - invalid update format
+                pass
+        response = _finish_turn(
+            game_id, state, narration.narration, [("player", player_message)]
+        )
+        yield {"event": "done", **asdict(response)}
 
-    roll_request_obj = mechanics.detect_roll_request(narration)
-    if roll_request_obj:
-        roll_re = getattr(mechanics, "_ROLL_RE", None)
-        if roll_re:
-            match = roll_re.search(narration)
-            if match:
-                end = match.end()
-                while end < len(narration) and narration[end] in ".!? ":
-                    end += 1
-                narration = narration[:end].rstrip()
-        roll_request = roll_request_obj.model_dump()
-        roll_request["id"] = str(uuid.uuid4())
-        awaiting_player_roll = True
-    else:
-        roll_request = None
-        awaiting_player_roll = False
 
-    state.pending_roll = roll_request
-    state.last_options = _extract_numbered_options(narration)
-    remember(state.memory, narration)
-    _GAME_STATES[game_id] = state
+async def _stream_generation(
+    narration: _NarrationStream,
+    game_id: int,
+    system: str | None,
+    prompt: str,
+    model: str,
+    client: httpx.AsyncClient | None,
+    backends: BackendPool | None,
+) -> AsyncIterator[str]:
+    """Feed generated tokens into ``narration``, yielding the visible text."""
+
+    raw: list[str] = []
+    stats: Dict[str, Any] = {}
+    queued = time.perf_counter()
+    async with (
+        llm_scheduler.slot(model, game_id=game_id, priority=PRIORITY_TURN),
+        _routed_client(model, game_id, client, backends) as routed,
+    ):
+        timing.record("llm_queue", time.perf_counter() - queued)
+        tokens = stream(
+            model=model,
+            prompt=prompt,
+            client=routed,
+            stop=TURN_STOP_SEQUENCES,
+            system=system,
+            keep_alive=KEEP_ALIVE if system is not None else None,
+            stats=stats,
+        )
+        with timing.phase("llm_generate"):
+            async with aclosing(tokens):
+                async for token in tokens:
+                    raw.append(token)
+                    text = narration.feed(token)
+                    if text:
+                        yield text
+                    if EARLY_STOP_ON_ROLL and narration.finished:
+                        break
+    _record_prefix(game_id, system, prompt, stats)
+    await _store_narration(model, system, prompt, "".join(raw))
 
-    append_transcript(game_id, "player", f"roll {value} (mod {mod})")
-    append_transcript(game_id, "system", explanation)
-    append_transcript(game_id, "dm", narration)
-    autosave_game_state(game_id)
 
-    return DMResponse(
-        message=narration,
-        awaiting_player_roll=awaiting_player_roll,
-        roll_request=roll_request,
-    )
+async def submit_player_roll(
+    game_id: int,
+    request_id: str,
+    value: int,
+    mod: int = 0,
+    *,
+    model: str = "llama3",
+    client: httpx.AsyncClient | None = None,
+    backends: BackendPool | None = None,
+) -> DMResponse:
+    """Resolve a player-supplied roll and return the DM's narration."""
+
+    async with game_locks.hold(game_id):
+        state = await _GAME_STATES.fetch(game_id)
+        if state is None:
+            raise KeyError(f"Unknown game id: {game_id}")
+        pending = state.pending_roll
+        if not pending or pending.get("id") != request_id:
+            raise ValueError("No matching pending roll")
+
+        _update_survival_needs(state)
+
+        world = _WORLDS.get(state.world_id)
+        if world is None:
+            raise KeyError(f"Unknown world id: {state.world_id}")
+
+        # Resolve the roll using the world's configured ruleset.
+        rules = get_ruleset(world.ruleset)
+        dc = int(pending.get("dc") or 0)
+        _success, _total = rules.resolve_player_roll(value, mod, dc)
+        explanation = rules.format_roll_explanation(value, mod, dc)
+
+        # Clear the pending roll before generating the next narration so that the
+        # prompt does not include the guard line.  It is restored if no
+        # narration comes back, for instance when the LLM queue is full, so
+        # the player can submit the roll again.
+        state.pending_roll = None
+        try:
+            with timing.phase("prepare"):
+                await _load_transcript_history(game_id, state)
+                system, prompt = await asyncio.to_thread(
+                    _build_prompts, world, state, f"System: {explanation}\nDM:"
+                )
+
+            narration = await _generate_narration(
+                game_id, model, system, prompt, client, backends, priority=PRIORITY_ROLL
+            )
+        except BaseException:
+            state.pending_roll = pending
+            raise
+
+        _remember(state, explanation)
+        narration = _extract_state_updates(state, narration)
+
+        return _finish_turn(
+            game_id,
+            state,
+            narration,
+            [("player", f"roll {value} (mod {mod})"), ("system", explanation)],
+        )
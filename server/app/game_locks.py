@@ -0,0 +1,75 @@
+"""Per-game locks serialising operations on one game.
+
+A turn holds its game's lock from preparing the prompt until the narration is
+committed, so a second turn, roll or edit of the same game waits instead of
+interleaving with it across the LLM call, while other games proceed in
+parallel.  Time spent waiting is recorded as the ``lock_wait`` phase of
+:mod:`timing`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from . import timing
+
+
+class GameLocks:
+    """Lazily created :class:`asyncio.Lock` per game id.
+
+    A lock is dropped once nobody holds or waits for it, so idle games cost
+    nothing.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._users: dict[int, int] = {}
+        self.acquired_total = 0
+        self.contended_total = 0
+
+    @asynccontextmanager
+    async def hold(self, game_id: int) -> AsyncIterator[None]:
+        """Hold the lock of ``game_id`` for the enclosed block."""
+
+        lock = self._locks.get(game_id)
+        if lock is None:
+            lock = self._locks[game_id] = asyncio.Lock()
+        self._users[game_id] = self._users.get(game_id, 0) + 1
+        try:
+            start = time.perf_counter()
+            if lock.locked():
+                self.contended_total += 1
+            await lock.acquire()
+            timing.record("lock_wait", time.perf_counter() - start)
+            self.acquired_total += 1
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._users[game_id] -= 1
+            if not self._users[game_id]:
+                del self._users[game_id]
+                del self._locks[game_id]
+
+    def locked(self, game_id: int) -> bool:
+        """Return whether an operation on ``game_id`` is in progress."""
+
+        lock = self._locks.get(game_id)
+        return lock is not None and lock.locked()
+
+    def stats(self) -> dict[str, Any]:
+        held = sum(lock.locked() for lock in self._locks.values())
+        return {
+            "held": held,
+            "waiting": sum(self._users.values()) - held,
+            "acquired_total": self.acquired_total,
+            "contended_total": self.contended_total,
+        }
+
+
+game_locks = GameLocks()
@@ -0,0 +1,161 @@
+"""Content-addressed on-disk cache of LLM responses.
+
+Responses are stored under the SHA-256 of the model, generation options and
+prompt, so identical requests can skip inference entirely.  The cache is
+bounded by total size with least-recently-used eviction.  In ``replay`` mode
+only cached responses are served and a miss is an error, which makes
+regression runs deterministic.
+
+The methods do blocking file I/O and are safe to call from several threads,
+so async callers should run them in a worker thread.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+CACHE_MODES = ("off", "on", "replay")
+
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "off")
+LLM_CACHE_DIR = Path(
+    os.environ.get("LLM_CACHE_DIR", Path(__file__).resolve().parents[3] / ".llm_cache")
+)
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 2**20)))
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a response is not cached."""
+
+
+class ResponseCache:
+    """LRU-bounded store of generated text keyed by request content.
+
+    Parameters
+    ----------
+    directory:
+        Where cached responses are written, one file per key.
+    max_bytes:
+        Total size above which the least recently used entries are removed.
+    mode:
+        ``"on"`` to read and write, ``"replay"`` to only read and raise
+        :class:`CacheMiss` for unknown requests.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        mode: str = "on",
+    ) -> None:
+        if mode not in CACHE_MODES[1:]:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._entries: OrderedDict[str, int] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model: str, prompt: str, **options: Any) -> str:
+        """Return the cache key for a request."""
+
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "options": options},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _index(self) -> OrderedDict[str, int]:
+        """Load the entry sizes from disk, least recently used first."""
+
+        if self._entries is None:
+            found = []
+            for path in self.directory.glob("*/*.json"):
+                stat = path.stat()
+                found.append((stat.st_mtime, path.stem, stat.st_size))
+            found.sort()
+            self._entries = OrderedDict((key, size) for _, key, size in found)
+            self._size = sum(self._entries.values())
+        return self._entries
+
+    def get(self, key: str) -> str | None:
+        """Return the cached text for ``key``, or ``None`` on a miss."""
+
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> str | None:
+        entries = self._index()
+        path = self._path(key)
+        if key in entries:
+            try:
+                text = json.loads(path.read_text(encoding="utf-8"))["response"]
+            except (OSError, ValueError, KeyError):
+                self._size -= entries.pop(key)
+            else:
+                self.hits += 1
+                entries.move_to_end(key)
+                os.utime(path)
+                return text
+        self.misses += 1
+        if self.mode == "replay":
+            raise CacheMiss(f"No cached response for {key}")
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        """Store ``text`` under ``key`` and evict old entries if needed."""
+
+        if self.mode == "replay":
+            return
+        with self._lock:
+            self._put(key, text)
+
+    def _put(self, key: str, text: str) -> None:
+        entries = self._index()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"response": text}, ensure_ascii=False).encode("utf-8")
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._size += len(data) - entries.pop(key, 0)
+        entries[key] = len(data)
+        while self._size > self.max_bytes and len(entries) > 1:
+            old_key, size = entries.popitem(last=False)
+            self._path(old_key).unlink(missing_ok=True)
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = self._index()
+        return {
+            "mode": self.mode,
+            "entries": len(entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def cache_from_env() -> ResponseCache | None:
+    """Return the cache configured by ``LLM_CACHE_*``, or ``None`` if off."""
+
+    if LLM_CACHE_MODE == "off":
+        return None
+    return ResponseCache(LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_MODE)
@@ -1,12 +1,39 @@
 from __future__ import annotations
 
 import json
-from collections.abc import AsyncGenerator
+import os
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from contextlib import aclosing
+from dataclasses import dataclass
 import re
+from typing import Any
 
 import httpx
 
-OLLAMA_API_URL = "http://localhost:11434"
+OLLAMA_API_URL = os.environ.get("OLLAMA_API_URL", "http://localhost:11434")
+
+# Connection pool and timeout defaults for the shared client.  Generation on
+# CPU-only machines can take minutes, so the read timeout is deliberately
+# generous while connecting to a dead backend should fail fast.
+MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "16"))
+KEEPALIVE_EXPIRY = float(os.environ.get("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "600"))
+POOL_TIMEOUT = float(os.environ.get("OLLAMA_POOL_TIMEOUT", "30"))
+
+# How long Ollama keeps a model (and its prompt cache) loaded after a request.
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# Timing and token counters reported by Ollama with the final response chunk.
+_STATS_KEYS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
 
 _THINK_START = "<think>"
 _THINK_END = "</think>"
@@ -21,11 +48,132 @@ def _strip_thinking_tags(text: str) -> str:
     return re.sub(pattern, "", text)
 
 
+@dataclass
+class PoolStats:
+    """Request counters for a client created by :func:`create_client`."""
+
+    requests_total: int = 0
+    errors_total: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response stream that marks its request finished once closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, stats: PoolStats) -> None:
+        self._stream = stream
+        self._stats = stats
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._stats.in_flight -= 1
+
+
+class _TrackingTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper recording request and in-flight counts."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+        self.stats = PoolStats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        stats.requests_total += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            stats.errors_total += 1
+            stats.in_flight -= 1
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, stats),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def create_client(
+    base_url: str | None = None,
+    *,
+    max_connections: int = MAX_CONNECTIONS,
+    max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = KEEPALIVE_EXPIRY,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    read_timeout: float | None = READ_TIMEOUT,
+    pool_timeout: float | None = POOL_TIMEOUT,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """Return a connection-pooled client for talking to Ollama.
+
+    The client is meant to be long-lived and shared between requests so that
+    connections are kept alive across turns.  ``transport`` replaces the
+    default HTTP transport, which is mainly useful for tests.
+    """
+
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            )
+        )
+    timeout = httpx.Timeout(
+        connect=connect_timeout,
+        read=read_timeout,
+        write=connect_timeout,
+        pool=pool_timeout,
+    )
+    return httpx.AsyncClient(
+        base_url=base_url or OLLAMA_API_URL,
+        timeout=timeout,
+        transport=_TrackingTransport(transport),
+    )
+
+
+def pool_stats(client: httpx.AsyncClient) -> dict[str, Any]:
+    """Return request and connection usage for a pooled ``client``."""
+
+    transport = client._transport
+    if not isinstance(transport, _TrackingTransport):
+        return {}
+    stats: dict[str, Any] = {
+        "requests_total": transport.stats.requests_total,
+        "errors_total": transport.stats.errors_total,
+        "in_flight": transport.stats.in_flight,
+        "max_in_flight": transport.stats.max_in_flight,
+    }
+    # ``httpx`` does not expose its connection pool publicly, so connection
+    # counts are only reported when the default HTTP transport is in use.
+    pool = getattr(transport.transport, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+    return stats
+
+
 async def list_models(client: httpx.AsyncClient | None = None) -> list[str]:
     """Return available Ollama model tags."""
     close_client = False
     if client is None:
-        client = httpx.AsyncClient(base_url=OLLAMA_API_URL, timeout=None)
+        client = create_client()
         close_client = True
     try:
         response = await client.get("/api/tags")
@@ -37,24 +185,97 @@ async def list_models(client: httpx.AsyncClient | None = None) -> list[str]:
             await client.aclose()
 
 
+def _generate_body(
+    model: str,
+    prompt: str,
+    *,
+    stream: bool,
+    stop: list[str] | None,
+    system: str | None = None,
+    keep_alive: str | int | None = None,
+) -> dict[str, Any]:
+    """Build the JSON body for an ``/api/generate`` request."""
+
+    body: dict[str, Any] = {"model": model, "prompt": prompt, "stream": stream}
+    if system is not None:
+        body["system"] = system
+    if keep_alive is not None:
+        body["keep_alive"] = keep_alive
+    if stop:
+        body["options"] = {"stop": list(stop)}
+    return body
+
+
+def _collect_stats(data: dict[str, Any], stats: dict[str, Any] | None) -> None:
+    """Copy Ollama's timing counters from ``data`` into ``stats``."""
+
+    if stats is None:
+        return
+    for key in _STATS_KEYS:
+        if key in data:
+            stats[key] = data[key]
+
+
 async def generate(
     model: str,
     prompt: str,
     *,
     client: httpx.AsyncClient | None = None,
+    stop: list[str] | None = None,
+    stop_when: Callable[[str], bool] | None = None,
+    system: str | None = None,
+    keep_alive: str | int | None = None,
+    stats: dict[str, Any] | None = None,
 ) -> str:
-    """Generate text using the specified model."""
+    """Generate text using the specified model.
+
+    ``stop`` sequences are passed through to Ollama.  When ``stop_when`` is
+    given the response is streamed instead, and the request is abandoned as
+    soon as the predicate returns true for the text produced so far; closing
+    the connection makes Ollama cancel the rest of the generation.
+
+    ``system`` is sent separately from ``prompt`` so that a stable system text
+    stays a cacheable prefix, and ``keep_alive`` keeps the model loaded in
+    between.  Ollama's token counts and timings are copied into ``stats`` when
+    the response reports them.
+    """
+    if stop_when is not None:
+        text = ""
+        tokens = stream(
+            model,
+            prompt,
+            client=client,
+            stop=stop,
+            system=system,
+            keep_alive=keep_alive,
+            stats=stats,
+        )
+        async with aclosing(tokens):
+            async for token in tokens:
+                text += token
+                if stop_when(text):
+                    break
+        return text
+
     close_client = False
     if client is None:
-        client = httpx.AsyncClient(base_url=OLLAMA_API_URL, timeout=None)
+        client = create_client()
         close_client = True
     try:
         response = await client.post(
             "/api/generate",
-            json={"model": model, "prompt": prompt, "stream": False},
+            json=_generate_body(
+                model,
+                prompt,
+                stream=False,
+                stop=stop,
+                system=system,
+                keep_alive=keep_alive,
+            ),
         )
         response.raise_for_status()
         data = response.json()
+        _collect_stats(data, stats)
         raw = data.get("response", "")
         return _strip_thinking_tags(raw)
     finally:
@@ -67,17 +288,33 @@ async def stream(
     prompt: str,
     *,
     client: httpx.AsyncClient | None = None,
+    stop: list[str] | None = None,
+    system: str | None = None,
+    keep_alive: str | int | None = None,
+    stats: dict[str, Any] | None = None,
 ) -> AsyncGenerator[str, None]:
-    """Stream generated tokens from the model."""
+    """Stream generated tokens from the model.
+
+    Closing the generator early closes the HTTP response, which stops
+    generation on the Ollama side.  See :func:`generate` for the remaining
+    parameters.
+    """
     close_client = False
     if client is None:
-        client = httpx.AsyncClient(base_url=OLLAMA_API_URL, timeout=None)
+        client = create_client()
         close_client = True
     try:
         async with client.stream(
             "POST",
             "/api/generate",
-            json={"model": model, "prompt": prompt, "stream": True},
+            json=_generate_body(
+                model,
+                prompt,
+                stream=True,
+                stop=stop,
+                system=system,
+                keep_alive=keep_alive,
+            ),
         ) as response:
             response.raise_for_status()
             buffer = ""
@@ -86,6 +323,8 @@ async def stream(
                 if not line:
                     continue
                 data = json.loads(line)
+                if data.get("done"):
+                    _collect_stats(data, stats)
                 token = data.get("response")
                 if not token:
                     continue
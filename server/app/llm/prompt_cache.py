@@ -0,0 +1,115 @@
+"""Bookkeeping for per-game prompt prefix reuse.
+
+When the system text sent with each turn is byte-identical to the previous
+turn, Ollama only has to evaluate the new tail of the prompt.  This module
+tracks how often that happens per game and estimates the prefill tokens saved.
+Only the most recently active games are tracked individually; the counters of
+older games are folded into the totals.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass
+class PrefixStats:
+    """Prefix reuse counters for a single game."""
+
+    prefix_hash: str = ""
+    turns: int = 0
+    stable_turns: int = 0
+    tokens_per_char: float = 0.0
+    last_prefill_tokens: int | None = None
+    last_tokens_saved: int = 0
+    tokens_saved: int = 0
+
+
+# Number of games whose counters are kept.
+TRACKED_GAMES = int(os.environ.get("LLM_PREFIX_STATS_GAMES", "4096"))
+
+_PREFIX_STATS: OrderedDict[int, PrefixStats] = OrderedDict()
+# Totals of the games no longer tracked.
+_RETIRED = {"games": 0, "turns": 0, "stable_turns": 0, "tokens_saved": 0}
+
+
+def _entry(game_id: int) -> PrefixStats:
+    entry = _PREFIX_STATS.get(game_id)
+    if entry is None:
+        entry = _PREFIX_STATS[game_id] = PrefixStats()
+        while len(_PREFIX_STATS) > TRACKED_GAMES:
+            _, old = _PREFIX_STATS.popitem(last=False)
+            _RETIRED["games"] += 1
+            _RETIRED["turns"] += old.turns
+            _RETIRED["stable_turns"] += old.stable_turns
+            _RETIRED["tokens_saved"] += old.tokens_saved
+    else:
+        _PREFIX_STATS.move_to_end(game_id)
+    return entry
+
+
+def record_turn(
+    game_id: int, system: str, prompt: str, stats: dict[str, Any]
+) -> PrefixStats:
+    """Record a generation for ``game_id`` and return its updated counters.
+
+    ``stats`` holds the counters reported by Ollama.  Its ``prompt_eval_count``
+    only covers tokens that were actually evaluated, so the saving is the
+    difference to a full evaluation of the prompt.  The full size is estimated
+    from the highest tokens-per-character ratio seen for the game, which comes
+    from turns where nothing was cached.
+    """
+
+    digest = hashlib.sha1(system.encode("utf-8")).hexdigest()
+    entry = _entry(game_id)
+    stable = entry.prefix_hash == digest
+    entry.prefix_hash = digest
+    entry.turns += 1
+    entry.last_tokens_saved = 0
+    if stable:
+        entry.stable_turns += 1
+
+    prefill = stats.get("prompt_eval_count")
+    if prefill is None:
+        return entry
+    chars = max(len(system) + len(prompt), 1)
+    entry.last_prefill_tokens = prefill
+    entry.tokens_per_char = max(entry.tokens_per_char, prefill / chars)
+    if stable:
+        expected = round(entry.tokens_per_char * chars)
+        entry.last_tokens_saved = max(expected - prefill, 0)
+        entry.tokens_saved += entry.last_tokens_saved
+    return entry
+
+
+def game_stats(game_id: int) -> dict[str, Any]:
+    """Return the prefix counters for ``game_id``."""
+
+    entry = _PREFIX_STATS.get(game_id)
+    return asdict(entry) if entry is not None else {}
+
+
+def summary() -> dict[str, Any]:
+    """Return prefix reuse counters aggregated over all games."""
+
+    games = _RETIRED["games"] + len(_PREFIX_STATS)
+    turns = _RETIRED["turns"] + sum(e.turns for e in _PREFIX_STATS.values())
+    stable = _RETIRED["stable_turns"] + sum(
+        e.stable_turns for e in _PREFIX_STATS.values()
+    )
+    saved = _RETIRED["tokens_saved"] + sum(
+        e.tokens_saved for e in _PREFIX_STATS.values()
+    )
+    # The first turn of a game can never reuse that game's prefix.
+    eligible = turns - games
+    return {
+        "games": games,
+        "turns": turns,
+        "stable_turns": stable,
+        "stability": stable / eligible if eligible else None,
+        "prefill_tokens_saved": saved,
+    }
@@ -0,0 +1,194 @@
+"""Routing of LLM requests across several Ollama backends.
+
+Each backend gets its own pooled client.  Requests go to the healthy backend
+with the fewest outstanding requests, preferring backends that already have
+the model loaded, and a game keeps using the same backend while it stays
+suitable so that backend's prompt cache can be reused.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from .ollama_client import OLLAMA_API_URL, create_client, pool_stats
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_API_URLS = [
+    url.strip()
+    for url in os.environ.get("OLLAMA_API_URLS", OLLAMA_API_URL).split(",")
+    if url.strip()
+]
+HEALTH_CHECK_INTERVAL = float(os.environ.get("OLLAMA_HEALTH_INTERVAL", "15"))
+# Number of games whose backend is remembered; the least recently routed
+# game is forgotten first and simply picks a backend afresh.
+STICKY_GAMES = int(os.environ.get("OLLAMA_STICKY_GAMES", "4096"))
+
+
+def _model_name(tag: str) -> str:
+    """Normalise ``"llama3:latest"`` to ``"llama3"``."""
+
+    return tag[: -len(":latest")] if tag.endswith(":latest") else tag
+
+
+@dataclass
+class Backend:
+    """A single Ollama server and what is known about it."""
+
+    url: str
+    client: httpx.AsyncClient
+    healthy: bool = True
+    outstanding: int = 0
+    requests_total: int = 0
+    failures_total: int = 0
+    models: set[str] = field(default_factory=set)
+    loaded: set[str] = field(default_factory=set)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests_total": self.requests_total,
+            "failures_total": self.failures_total,
+            "models": sorted(self.models),
+            "loaded": sorted(self.loaded),
+            "pool": pool_stats(self.client),
+        }
+
+
+class BackendPool:
+    """Least-outstanding-requests router over a set of Ollama backends.
+
+    Parameters
+    ----------
+    urls:
+        Base URLs of the Ollama servers.
+    client_factory:
+        Callable creating the client for a base URL.
+    sticky_games:
+        Number of games whose backend is remembered.
+    """
+
+    def __init__(
+        self,
+        urls: list[str] | None = None,
+        client_factory: Callable[[str], httpx.AsyncClient] = create_client,
+        sticky_games: int = STICKY_GAMES,
+    ) -> None:
+        self.backends = [
+            Backend(url=url, client=client_factory(url))
+            for url in (urls or OLLAMA_API_URLS)
+        ]
+        self.sticky_games = sticky_games
+        self._sticky: OrderedDict[int, Backend] = OrderedDict()
+        self._health_task: asyncio.Task[None] | None = None
+
+    async def _check(self, backend: Backend) -> None:
+        try:
+            tags = await backend.client.get("/api/tags")
+            tags.raise_for_status()
+            backend.models = {
+                _model_name(m["name"]) for m in tags.json().get("models", [])
+            }
+            running = await backend.client.get("/api/ps")
+            if running.is_success:
+                backend.loaded = {
+                    _model_name(m["name"]) for m in running.json().get("models", [])
+                }
+        except (httpx.HTTPError, ValueError, KeyError):
+            if backend.healthy:
+                logger.warning("Ollama backend %s is unhealthy", backend.url)
+            backend.healthy = False
+            return
+        if not backend.healthy:
+            logger.info("Ollama backend %s recovered", backend.url)
+        backend.healthy = True
+
+    async def refresh(self) -> None:
+        """Check the health and models of every backend."""
+
+        await asyncio.gather(*(self._check(b) for b in self.backends))
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float = HEALTH_CHECK_INTERVAL) -> None:
+        """Start periodic health checks in the background."""
+
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop(interval))
+
+    async def aclose(self) -> None:
+        """Stop health checks and close all backend clients."""
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._health_task
+            self._health_task = None
+        for backend in self.backends:
+            await backend.client.aclose()
+
+    def pick(self, model: str, game_id: int | None = None) -> Backend:
+        """Return the backend that should serve ``model`` for ``game_id``."""
+
+        model = _model_name(model)
+        # With every backend marked down, keep trying rather than fail outright.
+        candidates = [b for b in self.backends if b.healthy] or self.backends
+        sticky = self._sticky.get(game_id) if game_id is not None else None
+        if sticky in candidates and (not sticky.models or model in sticky.models):
+            return sticky
+        for attr in ("loaded", "models"):
+            matching = [b for b in candidates if model in getattr(b, attr)]
+            if matching:
+                candidates = matching
+                break
+        return min(candidates, key=lambda b: b.outstanding)
+
+    @asynccontextmanager
+    async def route(
+        self, model: str, *, game_id: int | None = None
+    ) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the client of the chosen backend while a request is made."""
+
+        backend = self.pick(model, game_id)
+        if game_id is not None:
+            self._sticky[game_id] = backend
+            self._sticky.move_to_end(game_id)
+            while len(self._sticky) > self.sticky_games:
+                self._sticky.popitem(last=False)
+        backend.outstanding += 1
+        backend.requests_total += 1
+        try:
+            yield backend.client
+        except httpx.TransportError:
+            backend.failures_total += 1
+            backend.healthy = False
+            raise
+        else:
+            backend.loaded.add(_model_name(model))
+        finally:
+            backend.outstanding -= 1
+
+    async def list_models(self) -> list[str]:
+        """Return the models available on any healthy backend."""
+
+        await self.refresh()
+        if not any(b.healthy for b in self.backends):
+            raise httpx.ConnectError("No Ollama backend reachable")
+        return sorted({m for b in self.backends if b.healthy for m in b.models})
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [b.stats() for b in self.backends]
@@ -0,0 +1,211 @@
+"""Admission control and fair scheduling for LLM requests.
+
+Ollama queues every request it receives, so without a limit on our side a
+burst of turns simply piles up there with no ordering guarantees.  The
+scheduler caps concurrent generations per model, keeps a bounded queue of
+waiting requests, lets each game have at most one generation in flight and
+serves roll resolutions before fresh turns.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+# Lower values are served first.
+PRIORITY_ROLL = 0
+PRIORITY_TURN = 1
+PRIORITY_BACKGROUND = 2
+
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "2"))
+MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "64"))
+
+
+def _parse_model_limits(raw: str) -> dict[str, int]:
+    """Parse ``"llama3=2,mistral=1"`` into a mapping of model limits."""
+
+    limits: dict[str, int] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+MODEL_CONCURRENCY = _parse_model_limits(os.environ.get("LLM_MODEL_CONCURRENCY", ""))
+
+
+class QueueFull(Exception):
+    """Raised when no more LLM requests can be queued."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("LLM request queue is full")
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    model: str = field(compare=False)
+    game_id: int | None = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+    enqueued: float = field(compare=False)
+
+
+class LLMScheduler:
+    """Grant generation slots per model with priorities and per-game fairness.
+
+    Parameters
+    ----------
+    max_concurrency:
+        Generations allowed in flight per model.
+    max_queue:
+        Requests allowed to wait across all models before :class:`QueueFull`
+        is raised.
+    model_limits:
+        Per-model overrides of ``max_concurrency``.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_queue: int = MAX_QUEUE,
+        model_limits: dict[str, int] | None = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.model_limits = dict(
+            MODEL_CONCURRENCY if model_limits is None else model_limits
+        )
+        self._active: dict[str, int] = {}
+        self._busy_games: set[int] = set()
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._granted = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._service_total = 0.0
+        self._completed = 0
+
+    def _limit(self, model: str) -> int:
+        return self.model_limits.get(model, self.max_concurrency)
+
+    def _can_run(self, model: str, game_id: int | None) -> bool:
+        if game_id is not None and game_id in self._busy_games:
+            return False
+        return self._active.get(model, 0) < self._limit(model)
+
+    def _grant(self, model: str, game_id: int | None) -> None:
+        self._active[model] = self._active.get(model, 0) + 1
+        if game_id is not None:
+            self._busy_games.add(game_id)
+        self._granted += 1
+
+    def _release(self, model: str, game_id: int | None) -> None:
+        self._active[model] -= 1
+        if game_id is not None:
+            self._busy_games.discard(game_id)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Wake waiting requests, highest priority first, that may now run."""
+
+        remaining: list[_Waiter] = []
+        for waiter in self._waiters:
+            if waiter.future.done():
+                continue
+            if self._can_run(waiter.model, waiter.game_id):
+                self._grant(waiter.model, waiter.game_id)
+                waiter.future.set_result(None)
+            else:
+                remaining.append(waiter)
+        self._waiters = remaining
+
+    def retry_after(self) -> float:
+        """Estimate seconds until a queued request would be served."""
+
+        average = self._service_total / self._completed if self._completed else 1.0
+        slots = max(self.max_concurrency, 1)
+        return max(1.0, average * (len(self._waiters) + 1) / slots)
+
+    def check_admission(self) -> None:
+        """Raise :class:`QueueFull` if a new request would be rejected."""
+
+        if len(self._waiters) >= self.max_queue:
+            self._rejected += 1
+            raise QueueFull(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        model: str,
+        *,
+        game_id: int | None = None,
+        priority: int = PRIORITY_TURN,
+    ) -> AsyncIterator[None]:
+        """Hold a generation slot for ``model`` while the block runs."""
+
+        start = time.perf_counter()
+        if self._can_run(model, game_id):
+            self._grant(model, game_id)
+        else:
+            self.check_admission()
+            waiter = _Waiter(
+                priority=priority,
+                seq=next(self._seq),
+                model=model,
+                game_id=game_id,
+                future=asyncio.get_running_loop().create_future(),
+                enqueued=start,
+            )
+            bisect.insort(self._waiters, waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(model, game_id)
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        waited = time.perf_counter() - start
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._service_total += time.perf_counter() - started
+            self._completed += 1
+            self._release(model, game_id)
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue depth, in-flight counts and wait times."""
+
+        now = time.perf_counter()
+        oldest = min((w.enqueued for w in self._waiters), default=None)
+        return {
+            "queue_depth": len(self._waiters),
+            "in_flight": {m: n for m, n in self._active.items() if n},
+            "granted_total": self._granted,
+            "rejected_total": self._rejected,
+            "avg_wait_seconds": (
+                self._wait_total / self._granted if self._granted else 0.0
+            ),
+            "max_wait_seconds": self._wait_max,
+            "oldest_wait_seconds": now - oldest if oldest is not None else 0.0,
+            "avg_service_seconds": (
+                self._service_total / self._completed if self._completed else 0.0
+            ),
+        }
+
+
+llm_scheduler = LLMScheduler()
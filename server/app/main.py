@@ -1,5 +1,12 @@
-from fastapi import FastAPI, HTTPException, Response
+from collections.abc import AsyncIterator
+from contextlib import aclosing, asynccontextmanager
+from functools import partial
+import json
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import httpx
 from pydantic import BaseModel
 from typing import Any, Dict
@@ -9,29 +16,74 @@ from .engine_service import (
     DMResponse,
     add_companion,
     autosave_game_state,
+    close_storage,
     create_game,
+    ensure_resident,
     export_game_state,
-    list_saved_games,
+    game_cache_stats,
+    memory_stats,
+    query_saved_games,
+    rebuild_save_manifest,
     get_game_state,
     get_world,
     import_game_state,
     import_world,
     read_transcript,
+    read_transcript_page,
+    reserve_saved_ids,
+    response_cache_stats,
     validate_world,
     list_worlds,
+    load_world_files,
     remove_companion,
     run_turn,
+    start_turn_stream,
     submit_player_roll,
+    summarize_memories,
+    summary_candidates,
     load_autosave,
     update_party_member,
     update_world,
     update_game_state,
 )
+from . import timing
+from .llm import prompt_cache
 from .llm.ollama_client import list_models
+from .llm.router import BackendPool
+from .llm.cache import CacheMiss
+from .llm.scheduler import QueueFull, llm_scheduler
+from .game_locks import game_locks
+from .save_writer import save_writer
+from .summarizer import memory_summarizer
 from engine.world_loader import dump_world
 
 logger = logging.getLogger(__name__)
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Own the pooled Ollama backend clients, the save writer and summaries."""
+
+    app.state.llm_backends = BackendPool()
+    app.state.llm_backends.start()
+    save_writer.start()
+    await run_in_threadpool(load_world_files)
+    await run_in_threadpool(reserve_saved_ids)
+    memory_summarizer.start(
+        summary_candidates,
+        partial(summarize_memories, backends=app.state.llm_backends),
+    )
+    try:
+        yield
+    finally:
+        await memory_summarizer.stop()
+        await save_writer.stop()
+        close_storage()
+        await app.state.llm_backends.aclose()
+        app.state.llm_backends = None
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,15 +98,61 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request: Request, exc: QueueFull) -> JSONResponse:
+    """Ask clients to back off while the LLM queue is saturated."""
+
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after + 0.999))},
+    )
+
+
+@app.exception_handler(CacheMiss)
+async def cache_miss_handler(request: Request, exc: CacheMiss) -> JSONResponse:
+    """Report replay-mode requests that have no recorded response."""
+
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+def _llm_backends(request: Request) -> BackendPool | None:
+    """Return the shared Ollama backends, if the app lifespan has started."""
+
+    return getattr(request.app.state, "llm_backends", None)
+
+
 @app.get("/health/llm")
-async def llm_health() -> dict[str, list[str]]:
+async def llm_health(request: Request) -> dict[str, list[str]]:
+    backends = _llm_backends(request)
     try:
-        models = await list_models()
+        if backends is not None:
+            models = await backends.list_models()
+        else:
+            models = await list_models()
     except httpx.HTTPError as exc:
         raise HTTPException(status_code=503, detail="Ollama unavailable") from exc
     return {"models": models}
 
 
+@app.get("/metrics")
+def metrics(request: Request) -> Dict[str, Any]:
+    """Return runtime statistics useful for capacity planning."""
+
+    backends = _llm_backends(request)
+    return {
+        "llm_backends": backends.stats() if backends is not None else [],
+        "prompt_prefix": prompt_cache.summary(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm_cache": response_cache_stats(),
+        "turn_phases": timing.snapshot(),
+        "save_writer": save_writer.stats(),
+        "game_cache": game_cache_stats(),
+        "game_locks": game_locks.stats(),
+        "memory": memory_stats(),
+    }
+
+
 @app.get("/worlds")
 def worlds() -> list[dict[str, Any]]:
     """List all available worlds."""
@@ -128,13 +226,37 @@ class GameCreate(BaseModel):
 
 
 @app.get("/games")
-def list_games_endpoint() -> list[dict[str, int]]:
-    """List saved games found on disk."""
-    return list_saved_games()
+async def list_games_endpoint(
+    response: Response,
+    world_id: int | None = None,
+    limit: int | None = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    detail: bool = False,
+) -> list[Dict[str, Any]]:
+    """List saved games from the save manifest.
+
+    Results are ordered by game id and can be filtered by ``world_id`` and
+    paged with ``limit`` and ``offset``; ``X-Total-Count`` holds the number of
+    matching games.  With ``detail`` each entry also carries ``updated_at``,
+    ``turns`` and ``size``.
+    """
+    await save_writer.flush()
+    total, games = await run_in_threadpool(query_saved_games, world_id, limit, offset)
+    response.headers["X-Total-Count"] = str(total)
+    if not detail:
+        games = [{"id": g["id"], "world_id": g["world_id"]} for g in games]
+    return games
+
+
+@app.post("/games/manifest/rebuild")
+async def rebuild_manifest_endpoint() -> dict[str, int]:
+    """Recreate the save manifest from the saves themselves."""
+    await save_writer.flush()
+    return {"games": await run_in_threadpool(rebuild_save_manifest)}
 
 
 @app.post("/games")
-def create_game_endpoint(payload: GameCreate) -> dict[str, int]:
+async def create_game_endpoint(payload: GameCreate) -> dict[str, int]:
     try:
         new_id = create_game(payload.world_id)
     except KeyError as exc:
@@ -143,7 +265,8 @@ def create_game_endpoint(payload: GameCreate) -> dict[str, int]:
 
 
 @app.get("/games/{game_id}")
-def get_game_endpoint(game_id: int) -> Dict[str, Any]:
+async def get_game_endpoint(game_id: int) -> Dict[str, Any]:
+    await ensure_resident(game_id)
     try:
         return get_game_state(game_id)
     except KeyError as exc:
@@ -156,17 +279,73 @@ class TurnRequest(BaseModel):
 
 
 @app.post("/games/{game_id}/turn")
-async def game_turn(game_id: int, payload: TurnRequest) -> DMResponse:
+async def game_turn(game_id: int, payload: TurnRequest, request: Request) -> DMResponse:
+    try:
+        return await run_turn(
+            game_id,
+            payload.message,
+            model=payload.model,
+            backends=_llm_backends(request),
+        )
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event."""
+
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/games/{game_id}/turn/stream")
+async def game_turn_stream(
+    game_id: int, payload: TurnRequest, request: Request
+) -> StreamingResponse:
+    """Run a turn, relaying DM narration as server-sent events.
+
+    ``token`` events carry narration fragments as they are generated and a
+    final ``done`` event carries the same body as ``POST /games/{id}/turn``.
+    """
+
     try:
-        return await run_turn(game_id, payload.message, model=payload.model)
+        events = await start_turn_stream(
+            game_id,
+            payload.message,
+            model=payload.model,
+            backends=_llm_backends(request),
+        )
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
 
+    async def body() -> AsyncIterator[str]:
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    name = event.pop("event")
+                    yield _sse(name, event)
+        except httpx.HTTPError:
+            logger.exception("streamed turn failed")
+            yield _sse("error", {"detail": "Ollama unavailable"})
+        except (CacheMiss, QueueFull) as exc:
+            yield _sse("error", {"detail": str(exc)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.post("/games/{game_id}/player-roll")
-async def player_roll(game_id: int, roll: PlayerRoll) -> DMResponse:
+async def player_roll(game_id: int, roll: PlayerRoll, request: Request) -> DMResponse:
     try:
-        return await submit_player_roll(game_id, roll.request_id, roll.value, roll.mod)
+        return await submit_player_roll(
+            game_id,
+            roll.request_id,
+            roll.value,
+            roll.mod,
+            backends=_llm_backends(request),
+        )
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
@@ -180,9 +359,13 @@ class CompanionPayload(BaseModel):
 
 
 @app.post("/games/{game_id}/companions")
-def add_companion_endpoint(game_id: int, companion: CompanionPayload) -> dict[str, str]:
+async def add_companion_endpoint(
+    game_id: int, companion: CompanionPayload
+) -> dict[str, str]:
     try:
-        add_companion(game_id, companion.model_dump())
+        async with game_locks.hold(game_id):
+            await ensure_resident(game_id)
+            add_companion(game_id, companion.model_dump())
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
@@ -191,9 +374,11 @@ def add_companion_endpoint(game_id: int, companion: CompanionPayload) -> dict[st
 
 
 @app.delete("/games/{game_id}/companions/{companion_id}")
-def remove_companion_endpoint(game_id: int, companion_id: int) -> dict[str, str]:
+async def remove_companion_endpoint(game_id: int, companion_id: int) -> dict[str, str]:
     try:
-        remove_companion(game_id, companion_id)
+        async with game_locks.hold(game_id):
+            await ensure_resident(game_id)
+            remove_companion(game_id, companion_id)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     return {"status": "ok"}
@@ -207,11 +392,14 @@ class PartyMemberUpdate(BaseModel):
 
 
 @app.patch("/games/{game_id}/party/{member_id}")
-def update_party_member_endpoint(
+async def update_party_member_endpoint(
     game_id: int, member_id: int, payload: PartyMemberUpdate
 ) -> dict[str, str]:
+    updates = payload.model_dump(exclude_unset=True)
     try:
-        update_party_member(game_id, member_id, payload.model_dump(exclude_unset=True))
+        async with game_locks.hold(game_id):
+            await ensure_resident(game_id)
+            update_party_member(game_id, member_id, updates)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
@@ -227,9 +415,11 @@ class GameUpdate(BaseModel):
 
 
 @app.patch("/games/{game_id}")
-def update_game_endpoint(game_id: int, payload: GameUpdate) -> dict[str, str]:
+async def update_game_endpoint(game_id: int, payload: GameUpdate) -> dict[str, str]:
     try:
-        update_game_state(game_id, payload.model_dump(exclude_unset=True))
+        async with game_locks.hold(game_id):
+            await ensure_resident(game_id)
+            update_game_state(game_id, payload.model_dump(exclude_unset=True))
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
@@ -238,36 +428,67 @@ def update_game_endpoint(game_id: int, payload: GameUpdate) -> dict[str, str]:
 
 
 @app.post("/games/{game_id}/save")
-def save_game(game_id: int) -> dict[str, str]:
+async def save_game(game_id: int) -> dict[str, str]:
     try:
-        autosave_game_state(game_id)
+        async with game_locks.hold(game_id):
+            await ensure_resident(game_id)
+            autosave_game_state(game_id)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+    await save_writer.flush()
     return {"status": "ok"}
 
 
 @app.post("/games/{game_id}/load")
-def load_game(game_id: int) -> dict[str, str]:
+async def load_game(game_id: int) -> dict[str, str]:
+    await save_writer.flush()
     try:
-        load_autosave(game_id)
+        async with game_locks.hold(game_id):
+            load_autosave(game_id)
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     return {"status": "ok"}
 
 
 @app.get("/games/{game_id}/transcript")
-def get_transcript(game_id: int) -> list[Dict[str, str]]:
-    """Return the chat transcript for a game."""
-
-    return read_transcript(game_id)
+async def get_transcript(
+    game_id: int,
+    response: Response,
+    limit: int | None = Query(None, ge=1),
+    before: int | None = Query(None, ge=0),
+    after: int | None = Query(None, ge=0),
+) -> list[Dict[str, str]]:
+    """Return the chat transcript for a game.
+
+    With ``limit`` only the latest entries are returned, or those just before
+    the ``before`` entry number or just after the ``after`` one.  The number of
+    the first returned entry is sent in ``X-Transcript-Start`` (use it as the
+    next ``before`` to page backwards) and the entry count in
+    ``X-Total-Count``.
+    """
+
+    await save_writer.flush()
+    start, total, entries = await run_in_threadpool(
+        read_transcript_page, game_id, limit, before, after
+    )
+    response.headers["X-Transcript-Start"] = str(start)
+    response.headers["X-Total-Count"] = str(total)
+    return entries
 
 
 @app.get("/games/{game_id}/export")
-def export_game(game_id: int) -> Dict[str, Any]:
+async def export_game(game_id: int, transcript: bool = False) -> Dict[str, Any]:
+    """Export a game; with ``transcript`` its full transcript is included."""
+
+    await ensure_resident(game_id)
     try:
-        return export_game_state(game_id)
+        data = export_game_state(game_id)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+    if transcript:
+        await save_writer.flush()
+        data["transcript"] = await run_in_threadpool(read_transcript, game_id)
+    return data
 
 
 class GameImport(BaseModel):
@@ -275,7 +496,7 @@ class GameImport(BaseModel):
 
 
 @app.post("/games/import")
-def import_game(payload: GameImport) -> Dict[str, int]:
+async def import_game(payload: GameImport) -> Dict[str, int]:
     try:
         new_id = import_game_state(payload.state)
     except Exception as exc:  # pragma: no cover - logging path
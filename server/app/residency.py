@@ -0,0 +1,177 @@
+"""Bounded in-memory residency for game states.
+
+Only the most recently used games are kept in memory.  A game that is not
+resident is loaded from the save store the first time it is looked up, and
+when more than ``capacity`` games are resident the least recently used one is
+handed to an eviction callback, which persists it, and dropped.  Async
+callers use :meth:`GameCache.fetch`, which loads in a worker thread instead
+of blocking the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, MutableMapping
+from typing import Any, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class GameCache(MutableMapping[int, V], Generic[V]):
+    """Mapping of game ids to states with LRU eviction and lazy loading.
+
+    Lookups (``cache[id]``, ``get``, ``in``) load missing games with ``load``;
+    iteration, ``len`` and ``clear`` only concern resident games.
+
+    Parameters
+    ----------
+    capacity:
+        Maximum number of resident games; ``0`` keeps every game resident.
+    load:
+        Called with a game id that is not resident; returns its state, or
+        ``None`` when the game does not exist.
+    evict:
+        Called with the id and state of a game about to be dropped so it can
+        be written out.  If it raises, the game stays resident.
+    pinned:
+        Returns whether a game is in use and must not be evicted; pinned
+        games may keep the cache above ``capacity`` for a while.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        load: Callable[[int], V | None],
+        evict: Callable[[int, V], None],
+        pinned: Callable[[int], bool] | None = None,
+    ) -> None:
+        self.capacity = capacity
+        self._load = load
+        self._evict = evict
+        self._pinned = pinned
+        self._resident: OrderedDict[int, V] = OrderedDict()
+        self._loading: dict[int, asyncio.Future[V | None]] = {}
+        self.max_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __getitem__(self, game_id: int) -> V:
+        state = self._resident.get(game_id)
+        if state is not None:
+            self._resident.move_to_end(game_id)
+            self.hits += 1
+            return state
+        self.misses += 1
+        state = self._load(game_id)
+        if state is None:
+            raise KeyError(game_id)
+        self.loads += 1
+        self[game_id] = state
+        return state
+
+    async def fetch(self, game_id: int) -> V | None:
+        """Return the state of ``game_id``, or ``None`` if it does not exist.
+
+        Like :meth:`get`, but a game that is not resident is loaded in a
+        worker thread; concurrent fetches of the same game share one load.
+        """
+
+        state = self._resident.get(game_id)
+        if state is not None:
+            self._resident.move_to_end(game_id)
+            self.hits += 1
+            return state
+        loading = self._loading.get(game_id)
+        if loading is None:
+            self.misses += 1
+            loading = asyncio.ensure_future(self._load_in_thread(game_id))
+            self._loading[game_id] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(game_id, None))
+        # A cancelled caller must not abandon the load for the others.
+        return await asyncio.shield(loading)
+
+    async def _load_in_thread(self, game_id: int) -> V | None:
+        state = await asyncio.to_thread(self._load, game_id)
+        if state is None:
+            return None
+        if game_id in self._resident:
+            # Loaded meanwhile by a blocking lookup, which wins.
+            return self._resident[game_id]
+        self.loads += 1
+        self[game_id] = state
+        return state
+
+    def __setitem__(self, game_id: int, state: V) -> None:
+        self._resident[game_id] = state
+        self._resident.move_to_end(game_id)
+        self.max_id = max(self.max_id, game_id)
+        self._shrink(keep=game_id)
+
+    def __delitem__(self, game_id: int) -> None:
+        del self._resident[game_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._resident))
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def clear(self) -> None:
+        """Forget every resident game without evicting it."""
+
+        self._resident.clear()
+        self.max_id = 0
+
+    def resident(self, game_id: int) -> bool:
+        """Return whether ``game_id`` is in memory, without loading it."""
+
+        return game_id in self._resident
+
+    def peek(self, game_id: int) -> V | None:
+        """Return the state of ``game_id`` if resident, without using it.
+
+        Unlike a lookup it neither loads the game, marks it recently used
+        nor counts towards the hit rate, so background scans leave idle
+        games free to age out.
+        """
+
+        return self._resident.get(game_id)
+
+    def next_id(self) -> int:
+        """Return an id above every game resident or evicted so far."""
+
+        return self.max_id + 1
+
+    def _shrink(self, keep: int) -> None:
+        excess = len(self._resident) - self.capacity if self.capacity else 0
+        if excess <= 0:
+            return
+        victims = [
+            game_id
+            for game_id in self._resident
+            if game_id != keep and not (self._pinned and self._pinned(game_id))
+        ][:excess]
+        for game_id in victims:
+            try:
+                self._evict(game_id, self._resident[game_id])
+            except Exception:
+                logger.exception("failed to evict game %s", game_id)
+                return
+            del self._resident[game_id]
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "resident": len(self._resident),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
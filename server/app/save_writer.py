@@ -0,0 +1,220 @@
+"""Background writer for autosaves and transcript appends.
+
+While running, saves are queued instead of written on the event loop.  A
+background task wakes shortly after the first queued write, serialises each
+dirty game once no matter how many times it was queued, and hands the batch
+to a worker thread which appends transcript and journal lines and writes
+snapshots.  When the writer is not running, writes happen immediately, which
+keeps scripts and tests deterministic.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Callable, Hashable
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# How long queued writes are held so that several turns, or several games,
+# are written together.
+SAVE_COALESCE_SECONDS = float(os.environ.get("TOY_SAVE_COALESCE", "0.05"))
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace ``path`` with ``data`` so readers never see a partial file."""
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def append_lines(path: Path, lines: list[str]) -> None:
+    """Append ``lines`` to ``path`` with a single write."""
+
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write("".join(lines))
+
+
+def _write_batch(
+    appends: list[tuple[Callable[[list[str]], None], list[str]]],
+    snapshots: list[tuple[Callable[[Any], None], Any]],
+) -> None:
+    # Appends go first: a snapshot supersedes whatever was appended before it.
+    for write, lines in appends:
+        try:
+            write(lines)
+        except Exception:
+            logger.exception("failed to append %d lines", len(lines))
+    for write, payload in snapshots:
+        try:
+            write(payload)
+        except Exception:
+            logger.exception("failed to write snapshot")
+
+
+class SaveWriter:
+    """Coalescing writer that keeps file and database I/O off the event loop.
+
+    Writes are grouped by key: appends under a key are written in order with
+    one call, and of several snapshots queued under a key only the last is
+    serialised and written.
+
+    Parameters
+    ----------
+    coalesce_seconds:
+        Delay between the first queued write and writing the batch.
+    """
+
+    def __init__(self, coalesce_seconds: float = SAVE_COALESCE_SECONDS) -> None:
+        self.coalesce_seconds = coalesce_seconds
+        self._snapshots: dict[Hashable, tuple[Callable[[], Any], Callable]] = {}
+        self._appends: dict[Hashable, tuple[Callable, list[str]]] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.batches_total = 0
+        self.snapshots_total = 0
+        self.coalesced_total = 0
+        self.lines_total = 0
+        self.last_batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start writing in the background on the running event loop."""
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything still queued and stop the background task."""
+
+        if self._task is None:
+            return
+        # Cancel only between batches so no write is left running unawaited.
+        async with self._lock:
+            self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        await self._drain()
+        self._task = None
+
+    def save(
+        self,
+        key: Hashable,
+        serialize: Callable[[], Any],
+        write: Callable[[Any], None],
+    ) -> None:
+        """Write the result of ``serialize`` with ``write``.
+
+        While running only the most recently queued ``serialize`` per key is
+        called, on the event loop, right before ``write`` runs in a worker
+        thread.
+        """
+
+        if self._task is None:
+            write(serialize())
+            self.snapshots_total += 1
+            return
+        if key in self._snapshots:
+            self.coalesced_total += 1
+        self._snapshots[key] = (serialize, write)
+        self._wake()
+
+    def append(
+        self, key: Hashable, line: str, write: Callable[[list[str]], None]
+    ) -> None:
+        """Queue ``line`` after any lines queued under ``key``.
+
+        The lines of a key are written with the most recently passed ``write``.
+        """
+
+        self.lines_total += 1
+        if self._task is None:
+            write([line])
+            return
+        lines = self._appends[key][1] if key in self._appends else []
+        lines.append(line)
+        self._appends[key] = (write, lines)
+        self._wake()
+
+    def _wake(self) -> None:
+        # Writes may be queued from threadpool endpoints as well.
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far is on disk."""
+
+        if self._task is not None:
+            await self._drain()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.coalesce_seconds)
+            await self._drain()
+
+    async def _drain(self) -> None:
+        async with self._lock:
+            self._wakeup.clear()
+            if not (self._snapshots or self._appends):
+                return
+            appends = list(self._appends.values())
+            queued = self._snapshots
+            self._appends, self._snapshots = {}, {}
+            snapshots = []
+            for key, (serialize, write) in queued.items():
+                try:
+                    snapshots.append((write, serialize()))
+                except Exception:
+                    logger.exception("failed to serialise %s", key)
+            start = time.perf_counter()
+            await asyncio.to_thread(_write_batch, appends, snapshots)
+            elapsed = time.perf_counter() - start
+            self.batches_total += 1
+            self.snapshots_total += len(snapshots)
+            self.last_batch_seconds = elapsed
+            self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending_snapshots": len(self._snapshots),
+            "pending_lines": sum(len(lines) for _, lines in self._appends.values()),
+            "batches_total": self.batches_total,
+            "snapshots_total": self.snapshots_total,
+            "coalesced_total": self.coalesced_total,
+            "lines_total": self.lines_total,
+            "last_batch_seconds": self.last_batch_seconds,
+            "max_batch_seconds": self.max_batch_seconds,
+        }
+
+
+save_writer = SaveWriter()
@@ -0,0 +1,243 @@
+"""Multi-process deployment with games sharded across worker processes.
+
+Game state lives in the memory of the process serving it, so several
+uvicorn workers behind a plain load balancer would each see a different
+copy of a game.  Instead ``python -m server.app.sharding --workers 8`` starts
+that many copies of :mod:`server.app.main` on local ports and a router in
+front of them:
+
+* requests for ``/games/{id}/...`` go to worker ``id % workers``, which
+  alone loads and saves that game;
+* new and imported games go to the workers in turn, each allocating ids in
+  its own residue class above every saved id, so ids never collide and
+  always route back to the worker that created them;
+* world imports and edits, and world listings, which pick up new world
+  files, are applied by every worker in the same order, keeping world ids
+  identical while games only ever read worlds;
+* ``/metrics`` collects every worker's metrics, and all other requests go
+  to the first worker.
+
+The workers share the save directory, so they must use database storage
+(``TOY_STORAGE=sqlite``): the file storage's save manifest is only safe
+within one process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+_GAME_PATH = re.compile(r"^/games/(\d+)(?:/|$)")
+_WORLD_WRITES = re.compile(r"^/worlds/(?:import|\d+)$")
+# Listing worlds loads new world files, numbering them like imports.
+_WORLD_LISTING = ("GET", "/worlds")
+_ROUND_ROBIN = {("POST", "/games"), ("POST", "/games/import")}
+_HOP_HEADERS = {"connection", "content-length", "host", "transfer-encoding"}
+
+
+def shard_for(game_id: int, workers: int) -> int:
+    """Return the index of the worker serving ``game_id``."""
+
+    return game_id % workers
+
+
+def _headers(headers: httpx.Headers | Any) -> dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS}
+
+
+def create_app(
+    worker_urls: list[str],
+    client_factory: Callable[[str], httpx.AsyncClient] | None = None,
+) -> FastAPI:
+    """Return the router forwarding requests to ``worker_urls``.
+
+    Parameters
+    ----------
+    worker_urls:
+        Base URL of each worker; the position is the worker index.
+    client_factory:
+        Creates the HTTP client for a worker URL, mainly for tests.
+    """
+
+    factory = client_factory or (
+        lambda url: httpx.AsyncClient(base_url=url, timeout=None)
+    )
+    clients: list[httpx.AsyncClient] = []
+    turn = itertools.count()
+    forwarded = [0] * len(worker_urls)
+    # Broadcasts reach the workers one after another; serialising them
+    # keeps every worker applying them in the same order.
+    broadcasting = asyncio.Lock()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        clients.extend(factory(url) for url in worker_urls)
+        try:
+            yield
+        finally:
+            await asyncio.gather(*(c.aclose() for c in clients))
+            clients.clear()
+
+    app = FastAPI(lifespan=lifespan)
+
+    async def send(index: int, request: Request, body: bytes) -> httpx.Response:
+        forwarded[index] += 1
+        outgoing = clients[index].build_request(
+            request.method,
+            request.url.path,
+            params=request.query_params.multi_items(),
+            headers=_headers(request.headers),
+            content=body,
+        )
+        return await clients[index].send(outgoing, stream=True)
+
+    def unavailable(index: int) -> JSONResponse:
+        return JSONResponse({"detail": f"Worker {index} unavailable"}, status_code=502)
+
+    async def broadcast(request: Request, body: bytes) -> Response:
+        responses = []
+        async with broadcasting:
+            for index in range(len(clients)):
+                try:
+                    resp = await send(index, request, body)
+                except httpx.HTTPError:
+                    logger.exception("worker %d failed a world update", index)
+                    return unavailable(index)
+                await resp.aread()
+                if resp.is_error:
+                    return Response(
+                        resp.content, resp.status_code, _headers(resp.headers)
+                    )
+                responses.append(resp)
+        if len({r.content for r in responses}) > 1:
+            logger.warning("workers disagree on %s", request.url.path)
+        first = responses[0]
+        return Response(first.content, first.status_code, _headers(first.headers))
+
+    @app.get("/metrics")
+    async def metrics() -> dict[str, Any]:
+        async def fetch(client: httpx.AsyncClient) -> Any:
+            try:
+                return (await client.get("/metrics")).json()
+            except httpx.HTTPError:
+                return None
+
+        return {
+            "router": {"forwarded": list(forwarded)},
+            "workers": await asyncio.gather(*(fetch(c) for c in clients)),
+        }
+
+    @app.api_route(
+        "/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+    )
+    async def forward(request: Request) -> Response:
+        path = request.url.path
+        body = await request.body()
+        if (request.method, path) == _WORLD_LISTING or (
+            request.method in {"POST", "PATCH"} and _WORLD_WRITES.match(path)
+        ):
+            return await broadcast(request, body)
+        match = _GAME_PATH.match(path)
+        if match:
+            index = shard_for(int(match.group(1)), len(clients))
+        elif (request.method, path) in _ROUND_ROBIN:
+            index = next(turn) % len(clients)
+        else:
+            index = 0
+        try:
+            resp = await send(index, request, body)
+        except httpx.HTTPError:
+            logger.exception("forwarding to worker %d failed", index)
+            return unavailable(index)
+        return StreamingResponse(
+            resp.aiter_raw(),
+            status_code=resp.status_code,
+            headers=_headers(resp.headers),
+            background=resp.aclose,
+        )
+
+    return app
+
+
+def _spawn_workers(count: int, base_port: int) -> list[subprocess.Popen]:
+    workers = []
+    for index in range(count):
+        env = {**os.environ, "TOY_WORKERS": str(count), "TOY_WORKER_INDEX": str(index)}
+        workers.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "uvicorn",
+                    "server.app.main:app",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(base_port + index),
+                    "--log-level",
+                    "warning",
+                ],
+                env=env,
+            )
+        )
+    return workers
+
+
+def _wait_ready(urls: list[str], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if httpx.get(f"{url}/health").is_success:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"worker at {url} did not start")
+            time.sleep(0.2)
+
+
+def main(argv: list[str] | None = None) -> None:  # pragma: no cover - CLI
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--worker-port", type=int, default=8100, help="port of the first worker"
+    )
+    args = parser.parse_args(argv)
+    if args.workers > 1 and os.environ.get("TOY_STORAGE", "files") == "files":
+        parser.error("several workers need TOY_STORAGE=sqlite")
+
+    urls = [f"http://127.0.0.1:{args.worker_port + i}" for i in range(args.workers)]
+    workers = _spawn_workers(args.workers, args.worker_port)
+    try:
+        _wait_ready(urls)
+        uvicorn.run(create_app(urls), host=args.host, port=args.port)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,445 @@
+"""Persistence backends for game state.
+
+A repository stores one compacted snapshot per game plus a journal of the
+per-turn deltas written since.  Snapshots and journal entries are passed in
+already encoded as JSON so they can be written from a worker thread while the
+live state keeps changing on the event loop.  Each snapshot records the
+``journal_seq`` it covers; loading replays only newer journal entries.
+
+Every write also updates a manifest of saved games (world, last save time,
+size and turn count) so listing games never has to open the saves.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Iterable
+
+from sqlalchemy import create_engine, delete, event, func, select, update
+from sqlalchemy.orm import Session
+
+from engine import models
+
+from .save_writer import append_lines, write_atomic
+
+STORAGE_BACKENDS = ("files", "sqlite")
+
+TOY_STORAGE = os.environ.get("TOY_STORAGE", "files")
+TOY_DATABASE_URL = os.environ.get("TOY_DATABASE_URL")
+DB_POOL_SIZE = int(os.environ.get("TOY_DB_POOL_SIZE", "5"))
+
+# Snapshot keys stored in ``models.GameState`` columns.
+_STATE_COLUMNS = (
+    "world_id",
+    "current_location",
+    "party",
+    "flags",
+    "timeline",
+    "memory",
+    "pending_roll",
+    "elapsed_time",
+    "last_needs_update",
+    "last_options",
+    "turn_count",
+    "journal_seq",
+)
+
+# Fields of a manifest entry besides ``id`` and ``size``.  Writers pass the
+# first three as the ``info`` of a save.
+MANIFEST_FIELDS = ("world_id", "updated_at", "turns")
+
+
+def replay_journal(data: dict[str, Any], entries: Iterable[dict[str, Any]]) -> int:
+    """Apply journal ``entries`` newer than snapshot ``data`` in place.
+
+    Entries append memories and timeline entries and may replace memories
+    changed in place, keyed by position.
+
+    ``data["journal_seq"]`` is advanced to the last applied entry and the
+    number of applied entries is returned.
+    """
+
+    seq = int(data.get("journal_seq", 0))
+    applied = 0
+    for entry in entries:
+        if entry.get("seq", 0) <= seq:
+            continue
+        data.update(entry.get("state", {}))
+        memory = data.setdefault("memory", [])
+        memory.extend(entry.get("memory", []))
+        for position, row in entry.get("memory_updates", {}).items():
+            memory[int(position)] = row
+        data.setdefault("timeline", []).extend(entry.get("timeline", []))
+        seq = entry["seq"]
+        applied += 1
+    data["journal_seq"] = seq
+    return applied
+
+
+def _page(
+    entries: list[dict[str, Any]],
+    world_id: int | None,
+    limit: int | None,
+    offset: int,
+) -> tuple[int, list[dict[str, Any]]]:
+    if world_id is not None:
+        entries = [e for e in entries if e["world_id"] == world_id]
+    entries.sort(key=lambda e: e["id"])
+    end = None if limit is None else offset + limit
+    return len(entries), entries[offset:end]
+
+
+class GameRepository(ABC):
+    """Interface of game state storage.
+
+    ``info`` passed to the write methods holds the :data:`MANIFEST_FIELDS` of
+    the game at the time of the save.
+    """
+
+    @abstractmethod
+    def write_snapshot(self, game_id: int, document: str, info: dict[str, Any]) -> None:
+        """Store the JSON ``document`` and empty the journal of ``game_id``.
+
+        Journal entries are always written before a later snapshot, so every
+        entry present at this point is covered by ``document``.
+        """
+
+    @abstractmethod
+    def append_journal(
+        self, game_id: int, lines: list[str], info: dict[str, Any]
+    ) -> None:
+        """Append JSON-encoded delta entries to the journal of ``game_id``."""
+
+    @abstractmethod
+    def load(self, game_id: int) -> tuple[dict[str, Any], int] | None:
+        """Return the replayed state of ``game_id`` and the entries replayed."""
+
+    @abstractmethod
+    def list_games(
+        self,
+        world_id: int | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        """Return the number of matching games and a page of manifest entries.
+
+        Entries hold ``id``, ``size`` and the :data:`MANIFEST_FIELDS`, ordered
+        by game id.
+        """
+
+    @abstractmethod
+    def rebuild_manifest(self) -> int:
+        """Recreate the manifest from the stored games and return their count."""
+
+    def close(self) -> None:
+        """Release any resources held by the repository."""
+
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# Superseded manifest lines tolerated before the manifest is compacted.
+MANIFEST_SLACK = 64
+
+_MANIFEST_LOCK = threading.Lock()
+# Line count and compaction threshold of each manifest seen by this process,
+# so appends know when to compact without reading the manifest.
+_MANIFEST_LINES: dict[Path, list[int]] = {}
+
+
+class FileGameRepository(GameRepository):
+    """Snapshots in ``game_{id}.json`` with a ``game_{id}.journal.jsonl`` tail.
+
+    The manifest is ``manifest.jsonl``: one line per save, the last line of a
+    game winning.  It is compacted once superseded lines outnumber the games
+    by more than :data:`MANIFEST_SLACK`, and rebuilt from the saves if
+    missing.
+
+    Parameters
+    ----------
+    directory:
+        Folder holding the save files.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+
+    def snapshot_path(self, game_id: int) -> Path:
+        return self.directory / f"game_{game_id}.json"
+
+    def journal_path(self, game_id: int) -> Path:
+        return self.directory / f"game_{game_id}.journal.jsonl"
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_NAME
+
+    def _size(self, game_id: int) -> int:
+        paths = (self.snapshot_path(game_id), self.journal_path(game_id))
+        return sum(p.stat().st_size for p in paths if p.exists())
+
+    def _record(self, game_id: int, info: dict[str, Any]) -> None:
+        entry = {"id": game_id, **info, "size": self._size(game_id)}
+        with _MANIFEST_LOCK:
+            append_lines(self.manifest_path, [json.dumps(entry) + "\n"])
+            counts = _MANIFEST_LINES.get(self.manifest_path)
+            if counts is None or counts[0] >= counts[1]:
+                self._compact()
+            else:
+                counts[0] += 1
+
+    def write_snapshot(self, game_id: int, document: str, info: dict[str, Any]) -> None:
+        write_atomic(self.snapshot_path(game_id), document.encode("utf-8"))
+        self.journal_path(game_id).write_bytes(b"")
+        self._record(game_id, info)
+
+    def append_journal(
+        self, game_id: int, lines: list[str], info: dict[str, Any]
+    ) -> None:
+        append_lines(self.journal_path(game_id), lines)
+        self._record(game_id, info)
+
+    def _journal_entries(self, game_id: int) -> Iterable[dict[str, Any]]:
+        path = self.journal_path(game_id)
+        if not path.exists():
+            return
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write.
+                    return
+
+    def load(self, game_id: int) -> tuple[dict[str, Any], int] | None:
+        path = self.snapshot_path(game_id)
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data, replay_journal(data, self._journal_entries(game_id))
+
+    def _read_manifest(self) -> tuple[dict[int, dict[str, Any]], int] | None:
+        """Return the latest entry per game and the number of manifest lines."""
+
+        try:
+            fh = self.manifest_path.open("r", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        entries: dict[int, dict[str, Any]] = {}
+        lines = 0
+        with fh:
+            for line in fh:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    entries[int(entry["id"])] = entry
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return entries, lines
+
+    def _write_manifest(self, entries: list[dict[str, Any]]) -> None:
+        data = "".join(json.dumps(e) + "\n" for e in entries)
+        write_atomic(self.manifest_path, data.encode("utf-8"))
+        _MANIFEST_LINES[self.manifest_path] = [
+            len(entries),
+            2 * len(entries) + MANIFEST_SLACK,
+        ]
+
+    def _compact(self) -> dict[int, dict[str, Any]] | None:
+        """Return the manifest entries, dropping superseded lines if many.
+
+        Returns ``None`` when there is no manifest.  The caller holds
+        :data:`_MANIFEST_LOCK`.
+        """
+
+        manifest = self._read_manifest()
+        if manifest is None:
+            _MANIFEST_LINES.pop(self.manifest_path, None)
+            return None
+        entries, lines = manifest
+        limit = 2 * len(entries) + MANIFEST_SLACK
+        if lines > limit:
+            self._write_manifest(list(entries.values()))
+        else:
+            _MANIFEST_LINES[self.manifest_path] = [lines, limit]
+        return entries
+
+    def rebuild_manifest(self) -> int:
+        entries = []
+        for path in self.directory.glob("game_*.json"):
+            try:
+                game_id = int(path.stem.split("_")[1])
+                loaded = self.load(game_id)
+                if loaded is None:
+                    continue
+                data, _ = loaded
+                entries.append(
+                    {
+                        "id": game_id,
+                        "world_id": int(data["world_id"]),
+                        "updated_at": path.stat().st_mtime,
+                        "turns": int(data.get("turn_count", 0)),
+                        "size": self._size(game_id),
+                    }
+                )
+            except (IndexError, KeyError, ValueError, json.JSONDecodeError):
+                continue
+        with _MANIFEST_LOCK:
+            self._write_manifest(entries)
+        return len(entries)
+
+    def list_games(
+        self,
+        world_id: int | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        with _MANIFEST_LOCK:
+            entries = self._compact()
+        if entries is None:
+            self.rebuild_manifest()
+            return self.list_games(world_id, limit, offset)
+        return _page(list(entries.values()), world_id, limit, offset)
+
+
+def _configure_sqlite(dbapi_connection: Any, _record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class SQLiteGameRepository(GameRepository):
+    """Games stored in the ``game_states`` and ``game_journal`` tables.
+
+    ``game_states`` doubles as the manifest through its ``updated_at``,
+    ``turn_count`` and ``size`` columns.
+
+    Parameters
+    ----------
+    url:
+        SQLAlchemy database URL, e.g. ``sqlite:///saves/games.db``.
+    pool_size:
+        Number of pooled connections kept open.
+    """
+
+    def __init__(self, url: str, pool_size: int = DB_POOL_SIZE) -> None:
+        self.engine = create_engine(
+            url,
+            pool_size=pool_size,
+            pool_pre_ping=True,
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(self.engine, "connect", _configure_sqlite)
+        models.Base.metadata.create_all(self.engine)
+
+    def write_snapshot(self, game_id: int, document: str, info: dict[str, Any]) -> None:
+        data = json.loads(document)
+        values = {key: data.get(key) for key in _STATE_COLUMNS if key in data}
+        with Session(self.engine) as session, session.begin():
+            session.merge(
+                models.GameState(
+                    id=game_id,
+                    updated_at=info["updated_at"],
+                    size=len(document.encode("utf-8")),
+                    **values,
+                )
+            )
+            session.execute(
+                delete(models.GameJournalEntry).where(
+                    models.GameJournalEntry.game_id == game_id
+                )
+            )
+
+    def append_journal(
+        self, game_id: int, lines: list[str], info: dict[str, Any]
+    ) -> None:
+        entries = [json.loads(line) for line in lines]
+        with Session(self.engine) as session, session.begin():
+            session.add_all(
+                models.GameJournalEntry(game_id=game_id, seq=e["seq"], entry=e)
+                for e in entries
+            )
+            session.execute(
+                update(models.GameState)
+                .where(models.GameState.id == game_id)
+                .values(
+                    updated_at=info["updated_at"],
+                    turn_count=info["turns"],
+                    size=models.GameState.size
+                    + sum(len(line.encode("utf-8")) for line in lines),
+                )
+            )
+
+    def load(self, game_id: int) -> tuple[dict[str, Any], int] | None:
+        with Session(self.engine) as session:
+            row = session.get(models.GameState, game_id)
+            if row is None:
+                return None
+            data = {key: getattr(row, key) for key in _STATE_COLUMNS}
+            data["id"] = game_id
+            entries = session.scalars(
+                select(models.GameJournalEntry.entry)
+                .where(
+                    models.GameJournalEntry.game_id == game_id,
+                    models.GameJournalEntry.seq > row.journal_seq,
+                )
+                .order_by(models.GameJournalEntry.seq)
+            ).all()
+        return data, replay_journal(data, entries)
+
+    def list_games(
+        self,
+        world_id: int | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        table = models.GameState
+        query = select(
+            table.id, table.world_id, table.updated_at, table.turn_count, table.size
+        )
+        count = select(func.count()).select_from(table)
+        if world_id is not None:
+            query = query.where(table.world_id == world_id)
+            count = count.where(table.world_id == world_id)
+        query = query.order_by(table.id).offset(offset).limit(limit)
+        with Session(self.engine) as session:
+            total = session.scalar(count)
+            rows = session.execute(query).all()
+        return total, [
+            {
+                "id": gid,
+                "world_id": wid,
+                "updated_at": updated_at,
+                "turns": turns,
+                "size": size,
+            }
+            for gid, wid, updated_at, turns, size in rows
+        ]
+
+    def rebuild_manifest(self) -> int:
+        # The game_states table is the manifest and is updated transactionally
+        # with each save, so there is nothing to rebuild.
+        with Session(self.engine) as session:
+            return session.scalar(select(func.count()).select_from(models.GameState))
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+def repository_from_env(save_dir: Path) -> GameRepository | None:
+    """Return the database repository selected by ``TOY_STORAGE``.
+
+    ``None`` means the default file storage under ``save_dir``.
+    """
+
+    if TOY_STORAGE not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {TOY_STORAGE}")
+    if TOY_STORAGE == "files":
+        return None
+    url = TOY_DATABASE_URL or f"sqlite:///{save_dir / 'games.db'}"
+    return SQLiteGameRepository(url)
@@ -0,0 +1,110 @@
+"""Background task condensing old memories into chapter summaries.
+
+While running, the task wakes every :data:`SUMMARY_INTERVAL_SECONDS`, or
+sooner when woken after a turn left a game with too many memories, and
+summarises one batch of memories for each game that needs it until none
+does.  Summaries are generated at background priority, after any waiting
+turns.  When the task is not running nothing is summarised.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import suppress
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# How often games are checked for memories to summarise.
+SUMMARY_INTERVAL_SECONDS = float(os.environ.get("TOY_SUMMARY_INTERVAL", "30"))
+
+
+class MemorySummarizer:
+    """Runs summarisation for the games that need it, one batch at a time.
+
+    Parameters
+    ----------
+    interval:
+        Seconds between checks when not woken.
+    """
+
+    def __init__(self, interval: float = SUMMARY_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+        self.chapters_total = 0
+        self.failures_total = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(
+        self,
+        candidates: Callable[[], Iterable[int]],
+        summarize: Callable[[int], Awaitable[bool]],
+    ) -> None:
+        """Start summarising in the background on the running event loop.
+
+        ``candidates`` returns the ids of games that need summarising and
+        ``summarize`` condenses one batch of a game, returning whether it
+        did.
+        """
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(candidates, summarize))
+
+    async def stop(self) -> None:
+        """Stop the background task, abandoning any summary in progress."""
+
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def wake(self) -> None:
+        """Check for games to summarise without waiting for the interval."""
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(
+        self,
+        candidates: Callable[[], Iterable[int]],
+        summarize: Callable[[int], Awaitable[bool]],
+    ) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            self._wakeup.clear()
+            progress = True
+            while progress:
+                progress = False
+                for game_id in list(candidates()):
+                    try:
+                        done = await summarize(game_id)
+                    except Exception:
+                        self.failures_total += 1
+                        logger.exception("failed to summarise game %s", game_id)
+                        continue
+                    if done:
+                        self.chapters_total += 1
+                        progress = True
+
+    def stats(self) -> dict[str, Any]:
+        """Return whether the task runs and how many chapters it wrote."""
+
+        return {
+            "running": self.running,
+            "chapters_total": self.chapters_total,
+            "failures_total": self.failures_total,
+        }
+
+
+memory_summarizer = MemorySummarizer()
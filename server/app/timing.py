@@ -0,0 +1,83 @@
+"""Per-phase timing of turn processing.
+
+Each phase keeps a count, a running total and a bounded sample of recent
+durations so percentiles can be reported without unbounded memory use.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+SAMPLE_SIZE = 10_000
+
+
+class _Phase:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+
+_PHASES: dict[str, _Phase] = {}
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a duration of ``seconds`` to phase ``name``."""
+
+    phase_stats = _PHASES.get(name)
+    if phase_stats is None:
+        phase_stats = _PHASES[name] = _Phase()
+    phase_stats.count += 1
+    phase_stats.total += seconds
+    phase_stats.max = max(phase_stats.max, seconds)
+    phase_stats.samples.append(seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the enclosed block as phase ``name``."""
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Return the ``fraction`` percentile of sorted ``ordered``, or ``0.0``."""
+
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def snapshot() -> dict[str, dict[str, Any]]:
+    """Return count, mean, max and percentiles for every phase."""
+
+    result: dict[str, dict[str, Any]] = {}
+    for name, phase_stats in _PHASES.items():
+        ordered = sorted(phase_stats.samples)
+        result[name] = {
+            "count": phase_stats.count,
+            "total_seconds": phase_stats.total,
+            "mean_seconds": phase_stats.total / phase_stats.count,
+            "max_seconds": phase_stats.max,
+            "p50_seconds": percentile(ordered, 0.50),
+            "p95_seconds": percentile(ordered, 0.95),
+            "p99_seconds": percentile(ordered, 0.99),
+        }
+    return result
+
+
+def reset() -> None:
+    """Forget all recorded timings."""
+
+    _PHASES.clear()
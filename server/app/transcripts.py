@@ -0,0 +1,458 @@
+"""Segmented transcript files with a byte-offset index for paged reads.
+
+New entries go to the active segment ``game_{id}.jsonl``.  Next to it a
+``.idx`` sidecar stores the byte offset of every entry as little-endian 64-bit
+integers, so entry ``n`` starts at ``idx[n]`` and the latest page is read with
+two seeks regardless of the transcript length.  The sidecar is extended on
+every append and repaired from the transcript itself when it is missing or
+lags behind after an interrupted write.
+
+Once the active segment holds :data:`SEGMENT_MAX_ENTRIES` entries or
+:data:`SEGMENT_MAX_BYTES` bytes it is closed: renamed to
+``game_{id}.{first:08d}.jsonl`` (``first`` being the number of its first
+entry), recorded in ``game_{id}.jsonl.segments`` and gzip-compressed.  Reads
+number entries across all segments, so rotation is invisible to callers.
+
+A ``.terms`` sidecar holds the word counts of every entry in the active
+segment, one ``[number, counts]`` JSON array per line, and is closed and
+compressed along with it as ``game_{id}.{first:08d}.jsonl.terms.gz``.
+:class:`TranscriptHistory` restores its keyword index from these without
+re-reading or decompressing the transcript.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import sys
+import threading
+from array import array
+from collections.abc import Collection
+from pathlib import Path
+
+from engine.bm25 import BM25Index, term_counts
+
+from .save_writer import write_atomic
+
+SEGMENT_MAX_ENTRIES = int(os.environ.get("TOY_TRANSCRIPT_SEGMENT_ENTRIES", "2000"))
+SEGMENT_MAX_BYTES = int(os.environ.get("TOY_TRANSCRIPT_SEGMENT_BYTES", str(2**20)))
+
+_OFFSET_SIZE = 8
+
+# Per-transcript locks serialising appends, rotation and repairs between the
+# save writer thread and request threads.
+_LOCKS: dict[Path, threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _lock(path: Path) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(path, threading.Lock())
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def segments_path(path: Path) -> Path:
+    return path.with_name(path.name + ".segments")
+
+
+def terms_path(path: Path) -> Path:
+    return path.with_name(path.name + ".terms")
+
+
+def segment_path(path: Path, first: int) -> Path:
+    """Return the uncompressed name of the closed segment starting at ``first``."""
+
+    return path.with_name(f"{path.stem}.{first:08d}{path.suffix}")
+
+
+def _gz(path: Path) -> Path:
+    return path.with_name(path.name + ".gz")
+
+
+def _to_bytes(offsets: array) -> bytes:
+    if sys.byteorder != "little":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def _from_bytes(data: bytes) -> array:
+    offsets = array("Q")
+    offsets.frombytes(data)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets
+
+
+def _read_offsets(idx: Path, start: int, stop: int) -> array:
+    with idx.open("rb") as fh:
+        fh.seek(start * _OFFSET_SIZE)
+        return _from_bytes(fh.read((stop - start) * _OFFSET_SIZE))
+
+
+def _compress(closed: Path) -> None:
+    write_atomic(_gz(closed), gzip.compress(closed.read_bytes(), compresslevel=6))
+    closed.unlink()
+
+
+def _read_closed(closed: Path) -> bytes:
+    gz = _gz(closed)
+    return gzip.decompress(gz.read_bytes()) if gz.exists() else closed.read_bytes()
+
+
+def _segment_lines(path: Path, first: int) -> list[bytes]:
+    return _read_closed(segment_path(path, first)).splitlines()
+
+
+def _write_segments(path: Path, segments: list[list[int]]) -> None:
+    write_atomic(segments_path(path), json.dumps(segments).encode("utf-8"))
+
+
+def _segments(path: Path) -> list[list[int]]:
+    """Return ``[first, count]`` of each closed segment, oldest first.
+
+    A rotation interrupted before it was recorded or compressed is completed.
+    """
+
+    try:
+        segments = json.loads(segments_path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        segments = []
+    base = sum(count for _, count in segments)
+    closed = segment_path(path, base)
+    if closed.exists() or _gz(closed).exists():
+        segments.append([base, len(_segment_lines(path, base))])
+        _write_segments(path, segments)
+    if segments and segment_path(path, segments[-1][0]).exists():
+        _compress(segment_path(path, segments[-1][0]))
+    return segments
+
+
+def _rotate(path: Path, segments: list[list[int]], count: int) -> None:
+    first = sum(n for _, n in segments)
+    closed = segment_path(path, first)
+    os.replace(path, closed)
+    index_path(path).unlink(missing_ok=True)
+    segments.append([first, count])
+    _write_segments(path, segments)
+    _compress(closed)
+    terms = terms_path(path)
+    if terms.exists():
+        os.replace(terms, terms_path(closed))
+        _compress(terms_path(closed))
+
+
+def append_entries(path: Path, lines: list[str]) -> None:
+    """Append encoded transcript ``lines``, index them and rotate if needed."""
+
+    data = [line.encode("utf-8") for line in lines]
+    with _lock(path):
+        segments = _segments(path)
+        count = _checked_count(path)
+        with path.open("ab") as fh:
+            pos = fh.tell()
+            fh.write(b"".join(data))
+            size = fh.tell()
+        offsets = array("Q")
+        for line in data:
+            offsets.append(pos)
+            pos += len(line)
+        idx = index_path(path)
+        # Drop any torn trailing offset before extending the index.
+        with idx.open("r+b" if idx.exists() else "wb") as fh:
+            fh.truncate(count * _OFFSET_SIZE)
+            fh.seek(count * _OFFSET_SIZE)
+            fh.write(_to_bytes(offsets))
+        first = sum(n for _, n in segments) + count
+        count += len(offsets)
+        with terms_path(path).open("ab") as fh:
+            fh.write(b"".join(_terms_line(first + n, x) for n, x in enumerate(data)))
+        if count >= SEGMENT_MAX_ENTRIES or size >= SEGMENT_MAX_BYTES:
+            _rotate(path, segments, count)
+
+
+def _checked_count(path: Path) -> int:
+    """Return the number of entries in the active segment.
+
+    The index is repaired if it is stale; only the last indexed entry is
+    inspected when it is consistent.
+    """
+
+    if not path.exists():
+        index_path(path).unlink(missing_ok=True)
+        return 0
+    size = path.stat().st_size
+    idx = index_path(path)
+    idx_size = idx.stat().st_size if idx.exists() else 0
+    count = idx_size // _OFFSET_SIZE
+    if count and idx_size % _OFFSET_SIZE == 0:
+        (last,) = _read_offsets(idx, count - 1, count)
+        if last < size:
+            with path.open("rb") as fh:
+                fh.seek(last)
+                rest = fh.read()
+            if b"\n" not in rest[:-1]:
+                return count
+    elif not count and not size:
+        return 0
+    return _repair(path, idx, count, size)
+
+
+def _repair(path: Path, idx: Path, count: int, size: int) -> int:
+    offsets = _read_offsets(idx, 0, count) if count else array("Q")
+    while offsets and offsets[-1] >= size:
+        offsets.pop()
+    pos = offsets[-1] if offsets else 0
+    with path.open("rb") as fh:
+        fh.seek(pos)
+        for n, line in enumerate(fh):
+            # The first line is already indexed unless the index is empty.
+            if n or not offsets:
+                offsets.append(pos)
+            pos += len(line)
+    write_atomic(idx, _to_bytes(offsets))
+    return len(offsets)
+
+
+def _active_lines(path: Path, total: int, start: int, stop: int) -> list[bytes]:
+    bounds = _read_offsets(index_path(path), start, min(stop + 1, total))
+    with path.open("rb") as fh:
+        fh.seek(bounds[0])
+        if stop < total:
+            data = fh.read(bounds[-1] - bounds[0])
+        else:
+            data = fh.read()
+    return data.splitlines()
+
+
+def read_page(
+    path: Path,
+    limit: int | None = None,
+    before: int | None = None,
+    after: int | None = None,
+) -> tuple[int, int, list[dict[str, str]]]:
+    """Return a page of transcript entries.
+
+    Entries are numbered from zero in append order across all segments.
+    With ``after`` the page holds the first ``limit`` entries numbered above
+    it; otherwise it holds the last ``limit`` entries numbered below
+    ``before``, or the latest ones when ``before`` is omitted.  Returns the
+    number of the first entry in the page, the total number of entries and
+    the entries themselves; lines that are not valid entries are skipped.
+    """
+
+    with _lock(path):
+        segments = _segments(path)
+        base = sum(count for _, count in segments)
+        active = _checked_count(path)
+        total = base + active
+        if after is not None:
+            start = min(max(after + 1, 0), total)
+            stop = total if limit is None else min(total, start + limit)
+        else:
+            stop = total if before is None else min(max(before, 0), total)
+            start = 0 if limit is None else max(0, stop - limit)
+        if start >= stop:
+            return start, total, []
+        lines = _lines(path, segments, active, start, stop)
+    return start, total, _parse(lines)
+
+
+def _lines(
+    path: Path, segments: list[list[int]], active: int, start: int, stop: int
+) -> list[bytes]:
+    """Return the raw lines of entries ``start`` to ``stop``."""
+
+    base = sum(count for _, count in segments)
+    lines: list[bytes] = []
+    for first, count in segments:
+        if first < stop and start < first + count:
+            segment = _segment_lines(path, first)
+            lines.extend(segment[max(start - first, 0) : stop - first])
+    if stop > base:
+        lines.extend(_active_lines(path, active, max(start - base, 0), stop - base))
+    return lines
+
+
+def read_entries(path: Path, numbers: list[int]) -> dict[int, dict[str, str]]:
+    """Return the entries numbered ``numbers`` that exist and are valid.
+
+    Each closed segment holding one of them is decompressed once.
+    """
+
+    wanted = sorted(set(numbers))
+    found: dict[int, dict[str, str]] = {}
+    with _lock(path):
+        segments = _segments(path)
+        base = sum(count for _, count in segments)
+        active = _checked_count(path)
+        for first, count in segments:
+            inside = [n for n in wanted if first <= n < first + count]
+            if inside:
+                segment = _segment_lines(path, first)
+                for n in inside:
+                    found.update(_numbered(n, segment[n - first : n - first + 1]))
+        for n in wanted:
+            if base <= n < base + active:
+                found.update(
+                    _numbered(n, _active_lines(path, active, n - base, n - base + 1))
+                )
+    return found
+
+
+def _numbered(number: int, lines: list[bytes]) -> dict[int, dict[str, str]]:
+    entries = _parse(lines)
+    return {number: entries[0]} if entries else {}
+
+
+def _terms_line(number: int, line: bytes) -> bytes:
+    entries = _parse([line])
+    counts = term_counts(entries[0]["text"]) if entries else {}
+    return json.dumps([number, counts]).encode("utf-8") + b"\n"
+
+
+def _valid_terms(
+    data: bytes, first: int, count: int
+) -> tuple[list[dict[str, int]], list[bytes]]:
+    """Return the counts of the leading well-formed lines and all the lines.
+
+    Reading stops at the first line that does not hold the next entry from
+    ``first`` on, or after ``count`` entries.
+    """
+
+    lines = data.splitlines(keepends=True)
+    terms: list[dict[str, int]] = []
+    for line in lines[:count]:
+        try:
+            number, counts = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError, TypeError, ValueError):
+            break
+        if number != first + len(terms) or not line.endswith(b"\n"):
+            break
+        terms.append(counts)
+    return terms, lines
+
+
+def _closed_terms(path: Path, first: int, count: int) -> list[dict[str, int]]:
+    """Return the word counts of the closed segment starting at ``first``.
+
+    A missing or damaged sidecar is rebuilt from the whole segment.
+    """
+
+    sidecar = terms_path(segment_path(path, first))
+    try:
+        data = _read_closed(sidecar)
+    except FileNotFoundError:
+        data = b""
+    terms, lines = _valid_terms(data, first, count)
+    if len(terms) == count == len(lines):
+        return terms
+    repaired = [
+        _terms_line(first + n, x) for n, x in enumerate(_segment_lines(path, first))
+    ]
+    write_atomic(_gz(sidecar), gzip.compress(b"".join(repaired), compresslevel=6))
+    sidecar.unlink(missing_ok=True)
+    return [json.loads(line)[1] for line in repaired]
+
+
+def read_terms(path: Path) -> list[dict[str, int]]:
+    """Return the word counts of every transcript entry, in entry order.
+
+    The active segment's ``.terms`` sidecar is repaired from the first line
+    that does not hold the next entry, as left by an interrupted write or by
+    a transcript written before the sidecar existed; only the entries from
+    there on are read again.  Closed segments without a valid sidecar are
+    read again as a whole.
+    """
+
+    with _lock(path):
+        segments = _segments(path)
+        active = _checked_count(path)
+        terms: list[dict[str, int]] = []
+        for first, count in segments:
+            terms.extend(_closed_terms(path, first, count))
+        base = len(terms)
+        sidecar = terms_path(path)
+        data = sidecar.read_bytes() if sidecar.exists() else b""
+        valid, lines = _valid_terms(data, base, active)
+        terms.extend(valid)
+        if len(valid) < active or len(lines) > active:
+            kept = b"".join(lines[: len(valid)])
+            missing = (
+                _lines(path, segments, active, len(terms), base + active)
+                if len(valid) < active
+                else []
+            )
+            repaired = [_terms_line(len(terms) + n, x) for n, x in enumerate(missing)]
+            terms.extend(json.loads(line)[1] for line in repaired)
+            write_atomic(sidecar, kept + b"".join(repaired))
+    return terms
+
+
+class TranscriptHistory:
+    """BM25 keyword index over a game's transcript.
+
+    The index is restored from the ``.terms`` sidecar by :meth:`load`, or
+    the first time it is used, and then grown with :meth:`add` as entries
+    are appended, so it must be loaded before the first entry is appended
+    in this process.  Loading reads every sidecar, so async callers should
+    call :meth:`load` in a worker thread.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._index: BM25Index | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    def load(self) -> None:
+        """Restore the index from the sidecars unless it is loaded."""
+
+        self._loaded()
+
+    def _loaded(self) -> BM25Index:
+        if self._index is None:
+            index = BM25Index()
+            index.extend(read_terms(self.path))
+            self._index = index
+        return self._index
+
+    def add(self, text: str) -> None:
+        """Index the entry appended with ``text``."""
+
+        self._loaded().add(term_counts(text))
+
+    def recall(
+        self, query: str, k: int = 3, exclude: Collection[str] = ()
+    ) -> list[dict[str, str]]:
+        """Return up to ``k`` past entries best matching ``query``, oldest first.
+
+        Entries whose text is in ``exclude``, such as those already quoted
+        elsewhere in a prompt, are passed over, as are entries indexed but
+        not written yet.
+        """
+
+        hits = self._loaded().search(query, k + len(exclude))
+        entries = read_entries(self.path, [number for number, _ in hits])
+        best = [
+            n for n, _ in hits if n in entries and entries[n]["text"] not in exclude
+        ][:k]
+        return [entries[n] for n in sorted(best)]
+
+
+def _parse(lines: list[bytes]) -> list[dict[str, str]]:
+    entries: list[dict[str, str]] = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(entry, dict) and {"actor", "text"} <= entry.keys():
+            entries.append({"actor": str(entry["actor"]), "text": str(entry["text"])})
+    return entries
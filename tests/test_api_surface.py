@@ -19,6 +19,7 @@ def test_openapi_has_public_routes():
         "/games",
         "/games/{game_id}",
         "/games/{game_id}/turn",
+        "/games/{game_id}/turn/stream",
         "/games/{game_id}/player-roll",
         "/games/{game_id}/companions",
         "/games/{game_id}/companions/{companion_id}",
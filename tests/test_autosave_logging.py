@@ -31,7 +31,7 @@ def _setup_world_and_game(tmp_path: Path) -> int:
 def test_transcript_and_autosave(tmp_path, monkeypatch):
     game_id = _setup_world_and_game(tmp_path)
 
-    async def fake_generate(*, model, prompt):
+    async def fake_generate(*, model, prompt, **kwargs):
         return "DM reply"
 
     monkeypatch.setattr(engine_service, "generate", fake_generate)
@@ -0,0 +1,26 @@
+"""Smoke test for the end-to-end turn benchmark."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bench import bench_turns
+from server.app import engine_service
+from server.app.llm.scheduler import llm_scheduler
+
+
+def test_bench_reports_latency_and_phases(monkeypatch, tmp_path):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(llm_scheduler, "max_concurrency", llm_scheduler.max_concurrency)
+    args = bench_turns.parse_args(
+        ["--games", "3", "--turns", "3", "--tps", "10000", "--ttft", "0"]
+    )
+
+    report = asyncio.run(bench_turns.run(args))
+
+    assert report["turns"] == 9
+    assert report["rolls"] >= 1
+    assert report["turn_latency"]["p99"] >= report["turn_latency"]["p50"] > 0
+    assert {"prepare", "llm_queue", "llm_generate", "commit"} <= set(report["phases"])
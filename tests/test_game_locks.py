@@ -0,0 +1,84 @@
+"""Tests for per-game serialisation of turns."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service, timing
+from server.app.game_locks import game_locks
+from engine.world_loader import World, SectionEntry
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._GAME_STATES.clear()
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    active = {"now": 0, "max": 0}
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return prompt.rsplit("Player: ", 1)[1].split("\n")[0]
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    return active
+
+
+def test_turns_of_one_game_are_serialised(tmp_path, monkeypatch):
+    active = _setup(tmp_path, monkeypatch)
+    game_id = engine_service.create_game(1)
+    timing.reset()
+
+    async def play():
+        await asyncio.gather(
+            *(engine_service.run_turn(game_id, f"move {n}") for n in range(3))
+        )
+
+    asyncio.run(play())
+    assert active["max"] == 1
+    memory = [m.content for m in engine_service._GAME_STATES[game_id].memory]
+    assert memory == ["move 0", "move 1", "move 2"]
+    assert timing.snapshot()["lock_wait"]["count"] == 3
+    assert game_locks.stats()["held"] == 0
+    assert not game_locks._locks
+
+
+def test_different_games_run_in_parallel(tmp_path, monkeypatch):
+    active = _setup(tmp_path, monkeypatch)
+    games = [engine_service.create_game(1) for _ in range(2)]
+
+    async def play():
+        await asyncio.gather(*(engine_service.run_turn(g, "look") for g in games))
+
+    asyncio.run(play())
+    assert active["max"] == 2
+
+
+def test_games_in_use_are_not_evicted(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(engine_service._GAME_STATES, "capacity", 1)
+    game_id = engine_service.create_game(1)
+
+    async def hold_and_create():
+        async with game_locks.hold(game_id):
+            other = engine_service.create_game(1)
+            assert engine_service._GAME_STATES.resident(game_id)
+            assert engine_service._GAME_STATES.resident(other)
+        engine_service.create_game(1)
+        return other
+
+    other = asyncio.run(hold_and_create())
+    assert not engine_service._GAME_STATES.resident(game_id)
+    assert not engine_service._GAME_STATES.resident(other)
@@ -0,0 +1,114 @@
+"""Tests for LRU residency and lazy loading of game states."""
+
+import asyncio
+import json
+import threading
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.residency import GameCache
+from server.app.save_writer import SaveWriter
+from engine.world_loader import World, SectionEntry
+
+
+def _setup(tmp_path, monkeypatch, capacity=2):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._GAME_STATES.clear()
+    monkeypatch.setattr(engine_service._GAME_STATES, "capacity", capacity)
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        return "The wind howls."
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+
+
+def test_least_recently_used_game_is_saved_and_reloaded(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    before = engine_service.game_cache_stats()
+    first = engine_service.create_game(1)
+    asyncio.run(engine_service.run_turn(first, "hello"))
+    second = engine_service.create_game(1)
+    engine_service.get_game_state(first)
+    third = engine_service.create_game(1)
+
+    assert sorted(engine_service._GAME_STATES) == [first, third]
+    saved = json.loads((tmp_path / f"game_{second}.json").read_text())
+    assert saved["memory"] == []
+
+    state = engine_service.get_game_state(second)
+    assert state["world_id"] == 1
+    assert not engine_service._GAME_STATES.resident(first)
+    assert engine_service.get_game_state(first)["memory"][0]["content"] == (
+        "The wind howls."
+    )
+    stats = engine_service.game_cache_stats()
+    assert stats["evictions"] - before["evictions"] == 3
+    assert stats["loads"] - before["loads"] == 2
+
+
+def test_unknown_game_is_not_loaded(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    assert engine_service._GAME_STATES.get(42) is None
+    assert len(engine_service._GAME_STATES) == 0
+
+
+def test_evicted_game_is_readable_before_its_snapshot_is_written(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, capacity=1)
+    writer = SaveWriter(coalesce_seconds=10)
+    monkeypatch.setattr(engine_service, "save_writer", writer)
+
+    async def scenario():
+        writer.start()
+        first = engine_service.create_game(1)
+        await engine_service.run_turn(first, "hello")
+        engine_service.create_game(1)
+        assert not (tmp_path / f"game_{first}.json").exists()
+        memory = engine_service.get_game_state(first)["memory"]
+        await writer.stop()
+        return first, memory
+
+    first, memory = asyncio.run(scenario())
+    assert [m["content"] for m in memory] == ["The wind howls."]
+    saved = json.loads((tmp_path / f"game_{first}.json").read_text())
+    assert len(saved["memory"]) == 1
+    assert engine_service.game_cache_stats()["pending_evictions"] == 0
+
+
+def test_new_games_do_not_reuse_evicted_ids(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, capacity=1)
+    first = engine_service.create_game(1)
+    second = engine_service.create_game(1)
+    engine_service.get_game_state(first)
+    assert engine_service.create_game(1) == second + 1
+
+
+def test_async_lookups_load_in_a_worker_thread():
+    threads = []
+
+    def load(game_id):
+        threads.append(threading.get_ident())
+        return {"id": game_id} if game_id < 10 else None
+
+    cache = GameCache(2, load, lambda game_id, state: None)
+
+    async def scenario():
+        return await asyncio.gather(cache.fetch(1), cache.fetch(1), cache.fetch(10))
+
+    first, again, unknown = asyncio.run(scenario())
+    assert first is again and first == {"id": 1}
+    assert unknown is None
+    assert threading.get_ident() not in threads
+    assert len(threads) == 2 and cache.loads == 1
+    assert asyncio.run(cache.fetch(1)) is first
@@ -0,0 +1,70 @@
+"""Tests for the on-disk LLM response cache."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.llm.cache import CacheMiss, ResponseCache
+from engine.world_loader import World, SectionEntry
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=80)
+    keys = [ResponseCache.key("m", f"prompt {i}") for i in range(3)]
+    cache.put(keys[0], "a" * 20)
+    cache.put(keys[1], "b" * 20)
+    assert cache.get(keys[0]) == "a" * 20
+    cache.put(keys[2], "c" * 20)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a" * 20
+    assert cache.stats()["evictions"] == 1
+
+    reopened = ResponseCache(tmp_path, max_bytes=80)
+    assert reopened.stats()["entries"] == 2
+    assert reopened.get(keys[2]) == "c" * 20
+
+
+def test_replay_mode_fails_on_miss(tmp_path):
+    key = ResponseCache.key("m", "p", system=None)
+    ResponseCache(tmp_path).put(key, "stored")
+    replay = ResponseCache(tmp_path, mode="replay")
+    assert replay.get(key) == "stored"
+    with pytest.raises(CacheMiss):
+        replay.get(ResponseCache.key("m", "other"))
+
+
+def test_identical_first_turns_skip_inference(tmp_path, monkeypatch):
+    engine_service.SAVE_DIR = tmp_path
+    monkeypatch.setattr(
+        engine_service, "_RESPONSE_CACHE", ResponseCache(tmp_path / "cache")
+    )
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    calls = []
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        calls.append(prompt)
+        return "The gates open."
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+
+    first = engine_service.create_game(1)
+    resp1 = asyncio.run(engine_service.run_turn(first, "enter"))
+    second = engine_service.create_game(1)
+    resp2 = asyncio.run(engine_service.run_turn(second, "enter"))
+
+    assert resp1.message == resp2.message == "The gates open."
+    assert len(calls) == 1
@@ -9,7 +9,7 @@ from engine import memory
 
 
 def test_recall_top_k():
-    memories: list[memory.MemoryItem] = []
+    memories: list[memory.MemoryRecord] = []
     memory.remember(memories, "a", importance=0.1)
     memory.remember(memories, "b", importance=0.5)
     memory.remember(memories, "c", importance=0.9)
@@ -19,7 +19,7 @@ def test_recall_top_k():
 
 
 def test_decay_reduces_importance():
-    memories: list[memory.MemoryItem] = []
+    memories: list[memory.MemoryRecord] = []
     memory.remember(memories, "event", importance=1.0)
     memory.decay(memories, rate=0.5)
     top = memory.recall(memories, k=1)
@@ -27,10 +27,150 @@ def test_decay_reduces_importance():
 
 
 def test_recall_with_tags() -> None:
-    memories: list[memory.MemoryItem] = []
+    memories: list[memory.MemoryRecord] = []
     memory.remember(memories, "saved the hero", importance=1.0, tags=["deeds"])
     memory.remember(memories, "took an arrow", importance=0.8, tags=["injuries"])
     memory.remember(memories, "stood by the player", importance=0.9, tags=["loyalty"])
 
     top = memory.recall(memories, tags=["loyalty"])
     assert [m.content for m in top] == ["stood by the player"]
+
+
+def test_capacity_forgets_least_important_then_oldest() -> None:
+    memories: list[memory.MemoryRecord] = []
+    for content, importance in [("a", 1.0), ("b", 0.2), ("c", 1.0), ("d", 0.5)]:
+        memory.remember(memories, content, importance=importance, capacity=3)
+    assert [m.content for m in memories] == ["a", "c", "d"]
+
+    memory.remember(memories, "e", capacity=2, slack=2)
+    assert len(memories) == 4
+    memory.remember(memories, "f", capacity=2, slack=2)
+    assert [m.content for m in memories] == ["e", "f"]
+
+
+def test_recall_keeps_order_of_equal_importance() -> None:
+    memories: list[memory.MemoryRecord] = []
+    for content in "abcdef":
+        memory.remember(memories, content)
+    memory.remember(memories, "g", importance=2.0)
+    assert [m.content for m in memory.recall(memories, k=3)] == ["g", "a", "b"]
+
+
+def test_decay_is_computed_at_recall_time() -> None:
+    memories: list[memory.MemoryRecord] = []
+    memory.remember(memories, "old", importance=1.0, timestamp=0, decay_rate=0.5)
+    memory.remember(memories, "new", importance=0.4, timestamp=2, decay_rate=0.5)
+
+    assert [m.content for m in memory.recall(memories, k=1)] == ["old"]
+    assert [m.content for m in memory.recall(memories, k=1, now=2)] == ["new"]
+    assert memories[0].importance == 1.0
+    assert memories[0].importance_at(3) == 0.125
+
+
+def test_decay_survives_export_and_import(monkeypatch) -> None:
+    from server.app import engine_service
+
+    monkeypatch.setattr(engine_service, "MEMORY_DECAY_RATE", 0.9)
+    state = engine_service.GameState(world_id=1, current_location=0, turn_count=4)
+    engine_service._remember(state, "a clue")
+    engine_service._GAME_STATES[7] = state
+
+    data = engine_service.export_game_state(7)
+    restored = engine_service._deserialize_game_state(data).memory[0]
+    assert (restored.timestamp, restored.decay_rate) == (4, 0.9)
+    assert restored.importance_at(6) == state.memory[0].importance_at(6)
+
+
+def test_tag_index_follows_appends_and_trims() -> None:
+    memories: list[memory.MemoryRecord] = []
+    index = memory.TagIndex()
+    memory.remember(memories, "met Mira", tags=["npc:Mira"], index=index)
+    memory.remember(memories, "rain", importance=0.1, index=index)
+    memory.remember(memories, "Mira lied", importance=2.0, tags=["npc:Mira"])
+
+    top = memory.recall(memories, tags=["npc:Mira"], index=index)
+    assert [m.content for m in top] == ["Mira lied", "met Mira"]
+
+    memory.forget(memories, 1)
+    top = memory.recall(memories, tags=["npc:Mira"], index=index)
+    assert [m.content for m in top] == ["Mira lied"]
+
+
+def test_prompt_includes_location_and_npc_memories() -> None:
+    from types import SimpleNamespace
+
+    from engine.context import build_prompt, scope_tags
+    from engine.world_loader import SectionEntry, World
+
+    world = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[
+            SectionEntry(name="Docks", description=""),
+            SectionEntry(name="Keep", description=""),
+        ],
+        npcs=[SectionEntry(name="Mira", description="")],
+    )
+    memories: list[memory.MemoryRecord] = []
+    index = memory.TagIndex()
+    for text, location in [
+        ("The keep gate is barred.", 1),
+        ("A gull steals bread.", 0),
+        ("Filler one.", 0),
+        ("Filler two.", 0),
+        ("Mira waves from a boat.", 0),
+    ]:
+        memory.remember(
+            memories, text, tags=scope_tags(world, location, text), index=index
+        )
+    state = SimpleNamespace(
+        current_location=1, party=[], memory=memories, memory_index=index
+    )
+
+    prompt = build_prompt(world, state, k=2)
+    lines = prompt.splitlines()
+    assert "Memories: The keep gate is barred.; A gull steals bread." in lines
+    assert "Memories of Mira: Mira waves from a boat." in lines
+    assert not any(line.startswith("Memories here") for line in lines)
+    assert "location:" not in prompt
+
+
+def test_records_dump_as_rows_and_share_tags() -> None:
+    memories: list[memory.MemoryRecord] = []
+    memory.remember(memories, "a", tags=["location:Inn"], timestamp=1)
+    memory.remember(memories, "b", importance=0.5, tags=["location:Inn"])
+
+    assert memories[0].tags is memories[1].tags
+    rows = memory.dump_memories(memories)
+    assert rows[1] == ["b", 0.5, ["location:Inn"], 0.0, 1.0, 0]
+    assert memory.load_memories(rows) == memories
+
+    legacy = [{"content": "a", "tags": ["location:Inn"], "timestamp": 1}]
+    assert memory.load_memories(legacy) == memories[:1]
+    assert memories[0].to_item() == memory.MemoryItem(**legacy[0])
+
+
+def test_near_duplicates_reinforce_instead_of_appending() -> None:
+    from engine import consolidation
+
+    memories: list[memory.MemoryRecord] = []
+    index = consolidation.NearDuplicateIndex()
+    texts = [
+        "The old bridge creaks as the party crosses the misty river at dawn.",
+        "A merchant offers you a map of the northern hills.",
+        "The old bridge creaks as the party crosses the misty river at dusk.",
+    ]
+    merged = []
+    for turn, text in enumerate(texts):
+        position = consolidation.consolidate(memories, text, index, timestamp=turn)
+        merged.append(position)
+        if position is None:
+            memory.remember(memories, text, timestamp=turn, decay_rate=0.5)
+
+    assert merged == [None, None, 0]
+    assert [m.merges for m in memories] == [1, 0]
+    assert memories[0].importance == 0.25 + 0.5
+    assert memories[0].timestamp == 2
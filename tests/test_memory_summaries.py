@@ -0,0 +1,114 @@
+"""Tests for condensing old memories into chapter summaries."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.summarizer import MemorySummarizer
+from engine.world_loader import World, SectionEntry
+
+
+def _setup(tmp_path, monkeypatch, memories):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "MEMORY_MERGE_THRESHOLD", 0)
+    monkeypatch.setattr(engine_service, "SUMMARY_THRESHOLD", 4)
+    monkeypatch.setattr(engine_service, "SUMMARY_BATCH", 3)
+    monkeypatch.setattr(engine_service, "SUMMARY_KEEP", 1)
+    engine_service._GAME_STATES.clear()
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(1)
+    state = engine_service._GAME_STATES[game_id]
+    for text in memories:
+        engine_service._remember(state, text)
+    engine_service.autosave_game_state(game_id)
+    return game_id, state
+
+
+def test_oldest_memories_become_a_chapter(tmp_path, monkeypatch):
+    events = ["Met Ada.", "Found a map.", "Crossed the river.", "Camped."]
+    game_id, state = _setup(tmp_path, monkeypatch, events)
+    prompts = []
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        prompts.append(prompt)
+        return " Ada gave the party a map and they crossed the river. "
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    assert asyncio.run(engine_service.summarize_memories(game_id))
+
+    assert "- Met Ada.\n- Found a map.\n- Crossed the river.\n" in prompts[0]
+    assert state.timeline == [
+        "Chapter 1: Ada gave the party a map and they crossed the river."
+    ]
+    assert [m.content for m in state.memory] == ["Camped."]
+    assert not asyncio.run(engine_service.summarize_memories(game_id))
+
+    expected = engine_service.export_game_state(game_id)
+    engine_service._GAME_STATES.clear()
+    engine_service.load_autosave(game_id)
+    assert engine_service.export_game_state(game_id) == expected
+
+    asyncio.run(engine_service.run_turn(game_id, "look"))
+    assert "Story so far: Chapter 1: Ada gave" in prompts[-1]
+
+
+def test_summary_is_dropped_if_memories_change_meanwhile(tmp_path, monkeypatch):
+    game_id, state = _setup(tmp_path, monkeypatch, ["A.", "B.", "C.", "D."])
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        state.memory[:] = state.memory[1:]
+        return "Summary."
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    assert not asyncio.run(engine_service.summarize_memories(game_id))
+    assert state.timeline == []
+
+
+def test_candidates_exceed_the_threshold_or_sit_idle(tmp_path, monkeypatch):
+    busy, _ = _setup(tmp_path, monkeypatch, ["A.", "B.", "C.", "D.", "E."])
+    idle = engine_service.create_game(1)
+    small = engine_service.create_game(1)
+    for text in ["F.", "G.", "H.", "I."]:
+        engine_service._remember(engine_service._GAME_STATES[idle], text)
+    engine_service._remember(engine_service._GAME_STATES[small], "J.")
+
+    order = list(engine_service._GAME_STATES)
+    hits = engine_service.game_cache_stats()["hits"]
+    assert engine_service.summary_candidates() == [busy]
+    # Scanning leaves the residency order and hit count alone.
+    assert list(engine_service._GAME_STATES) == order
+    assert engine_service.game_cache_stats()["hits"] == hits
+    later = engine_service._GAME_STATES[idle].last_active + 600
+    assert engine_service.summary_candidates(now=later) == [busy, idle]
+
+
+def test_summarizer_runs_until_nothing_is_due():
+    pending = {1: 2, 2: 1}
+
+    async def summarize(game_id):
+        pending[game_id] -= 1
+        return True
+
+    async def scenario():
+        summarizer = MemorySummarizer(interval=60)
+        summarizer.start(lambda: [g for g, n in pending.items() if n], summarize)
+        summarizer.wake()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await summarizer.stop()
+        return summarizer.stats()
+
+    stats = asyncio.run(scenario())
+    assert pending == {1: 0, 2: 0}
+    assert stats == {"running": False, "chapters_total": 3, "failures_total": 0}
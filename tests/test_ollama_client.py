@@ -0,0 +1,144 @@
+"""Tests for the shared, pooled Ollama client."""
+
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+import httpx
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.llm import ollama_client
+from server.app.main import app
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/api/tags":
+        return httpx.Response(200, json={"models": [{"name": "llama3"}]})
+    body = json.loads(request.content)
+    return httpx.Response(200, json={"response": f"echo {body['prompt']}"})
+
+
+def test_shared_client_reused_and_tracked():
+    async def scenario() -> dict:
+        client = ollama_client.create_client(transport=httpx.MockTransport(_handler))
+        try:
+            first = await ollama_client.generate("llama3", "a", client=client)
+            second = await ollama_client.generate("llama3", "b", client=client)
+            models = await ollama_client.list_models(client)
+            assert not client.is_closed
+        finally:
+            await client.aclose()
+        assert (first, second, models) == ("echo a", "echo b", ["llama3"])
+        return ollama_client.pool_stats(client)
+
+    stats = asyncio.run(scenario())
+    assert stats["requests_total"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["errors_total"] == 0
+
+
+def test_lifespan_owns_client(tmp_path, monkeypatch):
+    # Startup reserves the ids of saved games; keep it out of the repo saves.
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "_DB_REPOSITORY", None)
+    with TestClient(app) as client:
+        shared = app.state.llm_backends.backends[0].client
+        assert isinstance(shared, httpx.AsyncClient)
+        metrics = client.get("/metrics").json()
+        assert "requests_total" in metrics["llm_backends"][0]["pool"]
+    assert shared.is_closed
+
+
+class _ChunkStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield (json.dumps({"response": chunk}) + "\n").encode()
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def test_generate_stops_early_and_forwards_stop_sequences():
+    chunks = [
+        "Roll a d20 ",
+        "for Stealth (DC 12).",
+        '\nSTATE_UPDATE: {"current_location": 1}',
+        "\nYou",
+        " sneak past.\n",
+        "The guard",
+        " turns.",
+    ]
+    body_stream = _ChunkStream(chunks)
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["body"] = json.loads(request.content)
+        return httpx.Response(200, stream=body_stream)
+
+    async def scenario() -> str:
+        client = ollama_client.create_client(transport=httpx.MockTransport(handler))
+        async with client:
+            return await ollama_client.generate(
+                "llama3",
+                "prompt",
+                client=client,
+                stop=["\nPlayer:"],
+                stop_when=engine_service._roll_requested,
+            )
+
+    text = asyncio.run(scenario())
+    assert text == "".join(chunks[:5])
+    assert body_stream.sent == 5
+    assert body_stream.closed
+    assert seen["body"]["stream"] is True
+    assert seen["body"]["options"] == {"stop": ["\nPlayer:"]}
+
+
+def test_turn_applies_state_updates_written_after_a_roll_request(tmp_path, monkeypatch):
+    from engine.world_loader import World, SectionEntry
+
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[
+            SectionEntry(name="Start", description=""),
+            SectionEntry(name="Hall", description=""),
+        ],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(1)
+    body_stream = _ChunkStream(
+        [
+            "You creep forward. Roll a d20 for Stealth (DC 12).",
+            '\nSTATE_UPDATE: {"current_location": 1}',
+            "\nYou slip past.\n",
+        ]
+    )
+
+    async def scenario():
+        client = ollama_client.create_client(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, stream=body_stream)
+            )
+        )
+        async with client:
+            return await engine_service.run_turn(game_id, "sneak", client=client)
+
+    resp = asyncio.run(scenario())
+    assert resp.awaiting_player_roll
+    assert resp.message == "You creep forward. Roll a d20 for Stealth (DC 12)."
+    assert engine_service._GAME_STATES[game_id].current_location == 1
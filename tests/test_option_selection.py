@@ -25,7 +25,7 @@ def _setup_world_and_game() -> int:
 def test_numeric_option_selection(monkeypatch):
     game_id = _setup_world_and_game()
 
-    async def first_turn(*, model, prompt):
+    async def first_turn(*, model, prompt, **kwargs):
         return "A fork appears.\n1. Go left\n2. Go right"
 
     monkeypatch.setattr(engine_service, "generate", first_turn)
@@ -33,7 +33,7 @@ def test_numeric_option_selection(monkeypatch):
 
     captured = {}
 
-    async def second_turn(*, model, prompt):
+    async def second_turn(*, model, prompt, **kwargs):
         captured["prompt"] = prompt
         return "You go right."
 
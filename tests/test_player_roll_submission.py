@@ -19,7 +19,7 @@ def test_player_roll_submission(monkeypatch):
         "You spot a hidden door.",
     ]
 
-    async def fake_generate(*, model, prompt):
+    async def fake_generate(*, model, prompt, **kwargs):
         return responses.pop(0)
 
     monkeypatch.setattr(engine_service, "generate", fake_generate)
@@ -54,3 +54,41 @@ def test_player_roll_submission(monkeypatch):
     assert data["awaiting_player_roll"] is False
     assert data["message"] == "You spot a hidden door."
     assert engine_service._GAME_STATES[1].pending_roll is None
+
+
+def test_roll_can_be_retried_when_queue_is_full(monkeypatch):
+    from server.app.llm.scheduler import QueueFull
+
+    full = {"value": True}
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        if full["value"]:
+            raise QueueFull(1.0)
+        return "The lock clicks open."
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    engine_service._WORLDS[1] = World(
+        id="w1",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    state = engine_service.GameState(world_id=1, current_location=0)
+    state.pending_roll = {"id": "r1", "dc": 10}
+    engine_service._GAME_STATES[2] = state
+
+    client = TestClient(app)
+    payload = {"request_id": "r1", "value": 15, "mod": 0}
+    resp = client.post("/games/2/player-roll", json=payload)
+    assert resp.status_code == 503
+    assert state.pending_roll == {"id": "r1", "dc": 10}
+    assert state.memory == []
+
+    full["value"] = False
+    resp = client.post("/games/2/player-roll", json=payload)
+    assert resp.status_code == 200
+    assert resp.json()["message"] == "The lock clicks open."
+    assert len(state.memory) == 2
@@ -0,0 +1,69 @@
+"""Tests for the stable per-game prompt prefix mode."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.llm import prompt_cache
+from engine.world_loader import World, SectionEntry
+
+
+def test_stable_prefix_reused_across_turns(tmp_path, monkeypatch):
+    engine_service.SAVE_DIR = tmp_path
+    monkeypatch.setattr(engine_service, "STABLE_PROMPT_PREFIX", True)
+    world = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="Ancient lore.",
+        locations=[SectionEntry(name="Start", description="A gate")],
+        npcs=[SectionEntry(name="Guard", description="")],
+        rules_notes="No magic.",
+    )
+    engine_service._WORLDS[1] = world
+    game_id = engine_service.create_game(1)
+    calls = []
+    prefill = [1000, 120]
+
+    async def fake_generate(*, model, prompt, system=None, stats=None, **kwargs):
+        calls.append({"system": system, "prompt": prompt, **kwargs})
+        stats["prompt_eval_count"] = prefill.pop(0)
+        return "You wait."
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+
+    asyncio.run(engine_service.run_turn(game_id, "look"))
+    asyncio.run(engine_service.run_turn(game_id, "wait"))
+
+    first, second = calls
+    assert first["system"] == second["system"]
+    assert "Ancient lore." in first["system"]
+    assert "No magic." in first["system"]
+    assert "No magic." not in second["prompt"]
+    assert second["prompt"].endswith("Player: wait\nDM:")
+    assert second["keep_alive"] == engine_service.KEEP_ALIVE
+
+    stats = prompt_cache.game_stats(game_id)
+    assert stats["turns"] == 2
+    assert stats["stable_turns"] == 1
+    assert stats["last_prefill_tokens"] == 120
+    assert stats["tokens_saved"] > 0
+
+
+def test_totals_survive_forgetting_old_games(monkeypatch):
+    monkeypatch.setattr(prompt_cache, "TRACKED_GAMES", 2)
+    monkeypatch.setattr(prompt_cache, "_PREFIX_STATS", prompt_cache.OrderedDict())
+    monkeypatch.setattr(
+        prompt_cache, "_RETIRED", dict.fromkeys(prompt_cache._RETIRED, 0)
+    )
+    for game_id in (1, 1, 2, 3, 3):
+        prompt_cache.record_turn(game_id, "system", "prompt", {})
+
+    assert prompt_cache.game_stats(1) == {}
+    assert prompt_cache.game_stats(3)["stable_turns"] == 1
+    summary = prompt_cache.summary()
+    assert (summary["games"], summary["turns"], summary["stable_turns"]) == (3, 5, 2)
@@ -0,0 +1,85 @@
+"""Tests for relevance-based memory retrieval."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from engine import memory, retrieval
+from server.app import engine_service
+from engine.world_loader import World, SectionEntry
+
+
+def _memories(texts):
+    memories: list[memory.MemoryRecord] = []
+    for turn, text in enumerate(texts):
+        memory.remember(memories, text, timestamp=turn)
+    return memories
+
+
+def test_relevant_memories_are_preferred():
+    memories = _memories(
+        [
+            "The blacksmith forged a silver sword for you.",
+            "You crossed the river at dawn.",
+            "A storm rolled over the hills.",
+            "The innkeeper served stew.",
+        ]
+    )
+    top = retrieval.recall_relevant(memories, "Where is my silver sword?", k=2, now=4)
+    assert top[0].content.startswith("The blacksmith")
+    assert len(top) == 2
+
+
+def test_index_grows_incrementally_and_follows_trims():
+    memories = _memories(["A dragon sleeps in the cave."])
+    index = retrieval.SemanticIndex()
+    assert list(index.similarities(memories, "dragon")) == [0]
+
+    memory.remember(memories, "Another dragon circles the tower.", timestamp=1)
+    assert sorted(index.similarities(memories, "dragon")) == [0, 1]
+
+    memory.forget(memories, 1)
+    assert index.similarities(memories, "cave") == {}
+    assert list(index.similarities(memories, "tower")) == [0]
+
+
+def test_unrelated_query_falls_back_to_importance():
+    memories = _memories(["one", "two", "three"])
+    memories[2].importance = 2.0
+    top = retrieval.recall_relevant(memories, "zebra", k=2)
+    assert [m.content for m in top] == ["three", "one"]
+
+
+def test_turn_prompt_uses_relevant_memories(monkeypatch, tmp_path):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "MEMORY_RETRIEVAL", "relevance")
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(1)
+    state = engine_service._GAME_STATES[game_id]
+    for text in [f"Uneventful hour {n}." for n in range(8)] + [
+        "The old map shows a hidden harbour."
+    ]:
+        engine_service._remember(state, text)
+    prompts = []
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        prompts.append(prompt)
+        return "The sea is calm."
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    asyncio.run(engine_service.run_turn(game_id, "I unfold the map"))
+
+    memories_line = next(
+        line for line in prompts[0].splitlines() if line.startswith("Memories:")
+    )
+    assert memories_line.startswith("Memories: The old map shows a hidden harbour.")
@@ -0,0 +1,94 @@
+"""Tests for routing LLM requests across Ollama backends."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app.llm import ollama_client
+from server.app.llm.router import BackendPool
+
+
+def _factory(state: dict[str, dict]):
+    def handler(request: httpx.Request) -> httpx.Response:
+        backend = state[str(request.url.host)]
+        if not backend.get("up", True):
+            raise httpx.ConnectError("down", request=request)
+        if request.url.path == "/api/tags":
+            names = [{"name": f"{m}:latest"} for m in backend["models"]]
+            return httpx.Response(200, json={"models": names})
+        if request.url.path == "/api/ps":
+            names = [{"name": f"{m}:latest"} for m in backend.get("loaded", [])]
+            return httpx.Response(200, json={"models": names})
+        return httpx.Response(200, json={"response": str(request.url.host)})
+
+    def create(url: str) -> httpx.AsyncClient:
+        return ollama_client.create_client(url, transport=httpx.MockTransport(handler))
+
+    return create
+
+
+def test_routes_by_affinity_load_and_health():
+    state = {
+        "a": {"models": ["llama3"]},
+        "b": {"models": ["llama3", "mistral"], "loaded": ["mistral"]},
+        "c": {"models": ["llama3"], "up": False},
+    }
+    pool = BackendPool(["http://a", "http://b", "http://c"], _factory(state))
+
+    async def scenario():
+        await pool.refresh()
+        assert [b.healthy for b in pool.backends] == [True, True, False]
+        # Only b has mistral loaded.
+        assert pool.pick("mistral").url == "http://b"
+        # Least outstanding among the backends with llama3.
+        pool.backends[0].outstanding = 2
+        assert pool.pick("llama3").url == "http://b"
+        pool.backends[0].outstanding = 0
+        async with pool.route("llama3", game_id=1) as client:
+            host = await ollama_client.generate("llama3", "hi", client=client)
+        # Game 1 sticks to its backend even when another is less loaded.
+        pool.backends[0 if host == "a" else 1].outstanding = 5
+        assert pool.pick("llama3", game_id=1).url == f"http://{host}"
+        await pool.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_failed_backend_is_skipped_until_healthy():
+    state = {"a": {"models": ["llama3"]}, "b": {"models": ["llama3"]}}
+    pool = BackendPool(["http://a", "http://b"], _factory(state))
+
+    async def scenario():
+        await pool.refresh()
+        state["a"]["up"] = False
+        try:
+            async with pool.route("llama3") as client:
+                await ollama_client.generate("llama3", "hi", client=client)
+        except httpx.ConnectError:
+            pass
+        assert not pool.backends[0].healthy
+        assert pool.pick("llama3").url == "http://b"
+        state["a"]["up"] = True
+        await pool.refresh()
+        assert pool.backends[0].healthy
+        await pool.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_only_recent_games_keep_their_backend():
+    state = {"a": {"models": ["llama3"]}, "b": {"models": ["llama3"]}}
+    pool = BackendPool(["http://a", "http://b"], _factory(state), sticky_games=2)
+
+    async def scenario():
+        for game_id in (1, 2, 1, 3):
+            async with pool.route("llama3", game_id=game_id):
+                pass
+        await pool.aclose()
+
+    asyncio.run(scenario())
+    assert list(pool._sticky) == [1, 3]
@@ -32,7 +32,7 @@ def test_submit_roll_uses_world_rules(monkeypatch):
     engine_service._GAME_STATES[game_d6].pending_roll = {"id": "b", "dc": 4}
     engine_service._GAME_STATES[game_d20].pending_roll = {"id": "c", "dc": 10}
 
-    async def fake_generate(*, model, prompt):
+    async def fake_generate(*, model, prompt, **kwargs):
         return "narration"
 
     monkeypatch.setattr(engine_service, "generate", fake_generate)
@@ -0,0 +1,151 @@
+"""Tests for journaled autosaves and snapshot compaction."""
+
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from engine.world_loader import World, SectionEntry
+
+
+def _setup(tmp_path, monkeypatch, replies):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(1)
+    replies = iter(replies)
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        return next(replies)
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    return game_id
+
+
+def test_turns_append_to_journal_and_replay(tmp_path, monkeypatch):
+    game_id = _setup(
+        tmp_path,
+        monkeypatch,
+        [
+            "You arrive.",
+            'A door.\nSTATE_UPDATE: {"flags": {"door": true}}\n1. Open\n2. Leave',
+            "Roll a d20 for Strength (DC 12).",
+        ],
+    )
+    for message in ("hello", "look", "open"):
+        asyncio.run(engine_service.run_turn(game_id, message))
+
+    snapshot = json.loads((tmp_path / f"game_{game_id}.json").read_text())
+    assert len(snapshot["memory"]) == 1
+    journal = (tmp_path / f"game_{game_id}.journal.jsonl").read_text().splitlines()
+    entries = [json.loads(line) for line in journal]
+    assert [e["seq"] for e in entries] == [1, 2]
+    assert entries[0]["state"]["flags"] == {"door": True}
+    assert "party" not in entries[0]["state"]
+    assert len(entries[1]["memory"]) == 1
+
+    expected = engine_service.export_game_state(game_id)
+    engine_service._GAME_STATES.clear()
+    engine_service.load_autosave(game_id)
+    assert engine_service.export_game_state(game_id) == expected
+
+
+def test_snapshot_compacts_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SNAPSHOT_INTERVAL", 2)
+    game_id = _setup(tmp_path, monkeypatch, [f"Scene {n}." for n in range(4)])
+    journal = tmp_path / f"game_{game_id}.journal.jsonl"
+
+    for n in range(4):
+        asyncio.run(engine_service.run_turn(game_id, f"turn {n}"))
+
+    # Turn 1 snapshots, turns 2-3 are journaled, turn 4 compacts.
+    assert journal.read_text() == ""
+    snapshot = json.loads((tmp_path / f"game_{game_id}.json").read_text())
+    assert len(snapshot["memory"]) == 4
+    assert snapshot["journal_seq"] == 2
+
+
+def test_replay_ignores_torn_and_stale_entries(tmp_path, monkeypatch):
+    game_id = _setup(tmp_path, monkeypatch, ["One.", "Two."])
+    asyncio.run(engine_service.run_turn(game_id, "a"))
+    asyncio.run(engine_service.run_turn(game_id, "b"))
+    journal = tmp_path / f"game_{game_id}.journal.jsonl"
+    stale = json.dumps({"seq": 0, "state": {"current_location": 9}})
+    journal.write_text(stale + "\n" + journal.read_text() + '{"seq": 2, "sta')
+
+    engine_service._GAME_STATES.clear()
+    engine_service.load_autosave(game_id)
+    state = engine_service._GAME_STATES[game_id]
+    assert state.current_location == 0
+    assert [m.content for m in state.memory] == ["One.", "Two."]
+
+
+def test_memory_trim_snapshots_and_reloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "MEMORY_CAPACITY", 2)
+    monkeypatch.setattr(engine_service, "MEMORY_SLACK", 1)
+    game_id = _setup(tmp_path, monkeypatch, [f"Scene {n}." for n in range(4)])
+    for n in range(4):
+        asyncio.run(engine_service.run_turn(game_id, f"turn {n}"))
+
+    state = engine_service._GAME_STATES[game_id]
+    assert [m.content for m in state.memory] == ["Scene 2.", "Scene 3."]
+    expected = engine_service.export_game_state(game_id)
+    engine_service._GAME_STATES.clear()
+    engine_service.load_autosave(game_id)
+    assert engine_service.export_game_state(game_id) == expected
+
+
+def test_merged_memories_are_journaled(tmp_path, monkeypatch):
+    scene = "The tavern is warm and loud and the bard plays a slow song by the fire."
+    game_id = _setup(
+        tmp_path,
+        monkeypatch,
+        [scene, "A stranger enters.", scene.replace("slow", "soft")],
+    )
+    before = engine_service.memory_stats()["merges"]
+    for n in range(3):
+        asyncio.run(engine_service.run_turn(game_id, f"turn {n}"))
+
+    state = engine_service._GAME_STATES[game_id]
+    assert [m.merges for m in state.memory] == [1, 0]
+    assert state.memory[0].timestamp == 3
+    assert state.memory[0].importance == 1.5
+    assert engine_service.memory_stats()["merges"] == before + 1
+    entries = [
+        json.loads(line)
+        for line in (tmp_path / f"game_{game_id}.journal.jsonl")
+        .read_text()
+        .splitlines()
+    ]
+    assert "memory" not in entries[-1]
+    assert list(entries[-1]["memory_updates"]) == ["0"]
+
+    expected = engine_service.export_game_state(game_id)
+    engine_service._GAME_STATES.clear()
+    engine_service.load_autosave(game_id)
+    assert engine_service.export_game_state(game_id) == expected
+
+
+def test_memories_forgotten_without_shrinking_are_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "MEMORY_CAPACITY", 3)
+    monkeypatch.setattr(engine_service, "MEMORY_SLACK", 0)
+    monkeypatch.setattr(engine_service, "MEMORY_MERGE_THRESHOLD", 0)
+    game_id = _setup(tmp_path, monkeypatch, [f"Narration {n}." for n in range(6)])
+    for n in range(6):
+        asyncio.run(engine_service.run_turn(game_id, f"turn {n}"))
+
+    live = [m.content for m in engine_service._GAME_STATES[game_id].memory]
+    assert "Narration 5." in live and "Narration 0." not in live
+    engine_service._GAME_STATES.clear()
+    reloaded = engine_service._hydrate_game(game_id)
+    assert [m.content for m in reloaded.memory] == live
@@ -66,7 +66,7 @@ def test_save_export_import_flow(tmp_path, monkeypatch):
     assert engine_service._GAME_STATES[1].pending_roll == saved["pending_roll"]
 
     # Resume play from loaded state
-    async def fake_generate(*, model, prompt):
+    async def fake_generate(*, model, prompt, **kwargs):
         return "Resumed."
 
     monkeypatch.setattr(engine_service, "generate", fake_generate)
@@ -0,0 +1,78 @@
+"""Tests for the saved game manifest and paginated listing."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service, storage
+from server.app.main import app
+from engine.world_loader import World, SectionEntry
+
+
+def _world() -> World:
+    return World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+
+
+def _play(tmp_path, monkeypatch, turns_per_world):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._GAME_STATES.clear()
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        return "DM reply"
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    games = []
+    for world_id, turns in turns_per_world:
+        engine_service._WORLDS[world_id] = _world()
+        game_id = engine_service.create_game(world_id)
+        for _ in range(turns):
+            asyncio.run(engine_service.run_turn(game_id, "hi"))
+        games.append(game_id)
+    return games
+
+
+def test_listing_filters_and_pages_from_manifest(tmp_path, monkeypatch):
+    games = _play(tmp_path, monkeypatch, [(1, 1), (2, 3), (2, 2)])
+    # Listing must not need the saves themselves.
+    (tmp_path / f"game_{games[1]}.json").write_text("not json")
+    client = TestClient(app)
+
+    resp = client.get("/games", params={"world_id": 2, "limit": 1, "detail": True})
+    assert resp.status_code == 200
+    assert resp.headers["x-total-count"] == "2"
+    [entry] = resp.json()
+    assert entry["id"] == games[1] and entry["world_id"] == 2
+    assert entry["turns"] == 3 and entry["size"] > 0 and entry["updated_at"] > 0
+
+    resp = client.get("/games", params={"world_id": 2, "limit": 1, "offset": 1})
+    assert resp.json() == [{"id": games[2], "world_id": 2}]
+
+
+def test_manifest_is_compacted_and_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "MANIFEST_SLACK", 0)
+    games = _play(tmp_path, monkeypatch, [(1, 20)])
+    # Saves compact the manifest without anyone listing the games.
+    manifest = tmp_path / storage.MANIFEST_NAME
+    assert len(manifest.read_text().splitlines()) <= 2
+
+    total, [entry] = engine_service.query_saved_games()
+    assert total == 1 and entry["turns"] == 20
+
+    manifest.unlink()
+    client = TestClient(app)
+    assert client.post("/games/manifest/rebuild").json() == {"games": 1}
+    assert engine_service.query_saved_games()[1][0]["id"] == games[0]
+    manifest.unlink()
+    assert engine_service.list_saved_games() == [{"id": games[0], "world_id": 1}]
@@ -0,0 +1,85 @@
+"""Tests for the background autosave writer."""
+
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.main import app
+from server.app.save_writer import SaveWriter, append_lines, write_atomic
+from engine.world_loader import World, SectionEntry
+
+
+def test_writes_are_coalesced_and_flushed(tmp_path):
+    writer = SaveWriter(coalesce_seconds=10)
+    snapshot = tmp_path / "state.json"
+    transcript = tmp_path / "log.jsonl"
+    calls = []
+
+    def serialize(n):
+        def inner():
+            calls.append(n)
+            return json.dumps({"n": n}).encode()
+
+        return inner
+
+    def write(data):
+        write_atomic(snapshot, data)
+
+    def append(lines):
+        append_lines(transcript, lines)
+
+    async def scenario():
+        writer.start()
+        for n in range(3):
+            writer.save("state", serialize(n), write)
+            writer.append("log", f"{n}\n", append)
+        assert not snapshot.exists() and not transcript.exists()
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert calls == [2]
+    assert json.loads(snapshot.read_text()) == {"n": 2}
+    assert transcript.read_text() == "0\n1\n2\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["log.jsonl", "state.json"]
+    assert writer.stats()["coalesced_total"] == 2
+
+
+def test_writes_immediately_when_not_started(tmp_path):
+    writer = SaveWriter()
+    writer.save("s", lambda: b"{}", (tmp_path / "s.json").write_bytes)
+    writer.append("t", "x\n", lambda lines: append_lines(tmp_path / "t.jsonl", lines))
+    assert (tmp_path / "s.json").read_bytes() == b"{}"
+    assert (tmp_path / "t.jsonl").read_text() == "x\n"
+
+
+def test_turn_saves_are_flushed_for_reads(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(1)
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        return "DM reply"
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    monkeypatch.setattr(engine_service.save_writer, "coalesce_seconds", 10)
+
+    with TestClient(app) as client:
+        assert client.post(f"/games/{game_id}/turn", json={"message": "hi"}).is_success
+        assert not (tmp_path / f"game_{game_id}.json").exists()
+        transcript = client.get(f"/games/{game_id}/transcript").json()
+        assert [e["actor"] for e in transcript] == ["player", "dm"]
+        assert (tmp_path / f"game_{game_id}.json").exists()
@@ -0,0 +1,102 @@
+"""Tests for LLM admission control and scheduling."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.llm import scheduler as llm
+from server.app.main import app
+from engine.world_loader import World, SectionEntry
+
+
+def test_priority_and_per_game_fairness():
+    sched = llm.LLMScheduler(max_concurrency=1, max_queue=10)
+    order: list[str] = []
+
+    async def job(name, game_id, priority, hold=0.0):
+        async with sched.slot("m", game_id=game_id, priority=priority):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        first = asyncio.create_task(job("first", 1, llm.PRIORITY_TURN, hold=0.01))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(job("turn", 2, llm.PRIORITY_TURN)),
+            asyncio.create_task(job("roll", 3, llm.PRIORITY_ROLL)),
+        ]
+        await asyncio.sleep(0)
+        assert sched.stats()["queue_depth"] == 2
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(scenario())
+    assert order == ["first", "roll", "turn"]
+    assert sched.stats()["in_flight"] == {}
+
+
+def test_same_game_is_serialized_across_models():
+    sched = llm.LLMScheduler(max_concurrency=4, max_queue=10)
+    running: list[int] = []
+    peak = []
+
+    async def job(model):
+        async with sched.slot(model, game_id=7):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.001)
+            running.pop()
+
+    async def scenario():
+        await asyncio.gather(job("a"), job("b"), job("a"))
+
+    asyncio.run(scenario())
+    assert max(peak) == 1
+
+
+def test_queue_full_rejected():
+    sched = llm.LLMScheduler(max_concurrency=1, max_queue=1)
+
+    async def hold(game_id):
+        async with sched.slot("m", game_id=game_id):
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        tasks = [asyncio.create_task(hold(1)), asyncio.create_task(hold(2))]
+        await asyncio.sleep(0)
+        with pytest.raises(llm.QueueFull) as info:
+            async with sched.slot("m", game_id=3):
+                pass
+        await asyncio.gather(*tasks)
+        return info.value
+
+    exc = asyncio.run(scenario())
+    assert exc.retry_after >= 1
+    assert sched.stats()["rejected_total"] == 1
+
+
+def test_turn_endpoint_returns_503_with_retry_after(monkeypatch):
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(1)
+
+    def reject():
+        raise llm.QueueFull(retry_after=2.5)
+
+    monkeypatch.setattr(engine_service.llm_scheduler, "check_admission", reject)
+    client = TestClient(app)
+    resp = client.post(f"/games/{game_id}/turn/stream", json={"message": "hi"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "3"
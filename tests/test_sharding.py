@@ -0,0 +1,109 @@
+"""Tests for the sharding router and per-worker game ids."""
+
+from pathlib import Path
+import sys
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service, sharding
+from engine.world_loader import World, SectionEntry
+
+
+def _worker(index, calls):
+    app = FastAPI()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PATCH"])
+    async def echo(path: str, request: Request):
+        calls.append((index, request.method, request.url.path))
+        if path == "metrics":
+            return {"index": index}
+        if path == "games" and request.method == "POST":
+            return {"id": 10 + index}
+        if path == "worlds/import":
+            return {"id": 1}
+        return {"worker": index, "query": dict(request.query_params)}
+
+    return app
+
+
+def _router(count=3):
+    calls = []
+    workers = {f"http://worker-{i}": _worker(i, calls) for i in range(count)}
+
+    def factory(url):
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=workers[url]), base_url=url
+        )
+
+    return sharding.create_app(list(workers), client_factory=factory), calls
+
+
+def test_game_requests_are_routed_by_id():
+    app, calls = _router()
+    with TestClient(app) as client:
+        for game_id in (1, 2, 3, 7):
+            resp = client.get(f"/games/{game_id}/transcript", params={"limit": 5})
+            assert resp.json() == {"worker": game_id % 3, "query": {"limit": "5"}}
+        assert client.get("/games").json()["worker"] == 0
+        assert client.get("/worlds").json()["worker"] == 0
+    # Listing worlds loads new world files, so every worker does it.
+    assert [call[0] for call in calls if call[2] == "/worlds"] == [0, 1, 2]
+
+
+def test_new_games_are_spread_and_world_writes_broadcast():
+    app, calls = _router()
+    with TestClient(app) as client:
+        ids = [client.post("/games", json={"world_id": 1}).json()["id"] for _ in "abc"]
+        assert ids == [10, 11, 12]
+        assert client.post("/worlds/import", json={"content": "# W"}).json() == {
+            "id": 1
+        }
+        workers = client.get("/metrics").json()["workers"]
+    assert [call[0] for call in calls if call[2] == "/worlds/import"] == [0, 1, 2]
+    assert workers == [{"index": 0}, {"index": 1}, {"index": 2}]
+
+
+def test_workers_allocate_and_load_only_their_own_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "WORKER_COUNT", 4)
+    monkeypatch.setattr(engine_service, "WORKER_INDEX", 2)
+    engine_service._GAME_STATES.clear()
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    (tmp_path / "game_5.json").write_text('{"world_id": 1}')
+    engine_service.reserve_saved_ids()
+
+    ids = [engine_service.create_game(1) for _ in range(3)]
+    assert ids == [6, 10, 14]
+    assert all(engine_service.owns_game(i) for i in ids)
+    assert engine_service._GAME_STATES.get(5) is None
+
+
+def test_workers_load_world_files_at_startup(tmp_path, monkeypatch):
+    from server.app.main import app
+
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "_DB_REPOSITORY", None)
+    monkeypatch.setattr(engine_service, "WORLD_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "_WORLDS", {})
+    monkeypatch.setattr(engine_service, "_WORLD_FILES", {})
+    for name in ("b", "a"):
+        (tmp_path / f"{name}.md").write_text(
+            f"---\nid: {name}\ntitle: {name.upper()}\nruleset: dnd5e\n"
+            "end_goal: fun\n---\n\n## Lore\nTest world\n"
+        )
+
+    with TestClient(app) as client:
+        assert client.get("/worlds/1").json()["title"] == "A"
+        assert client.get("/worlds/2").json()["title"] == "B"
@@ -27,7 +27,7 @@ def test_state_update_line(monkeypatch):
     state = engine_service._GAME_STATES[game_id]
     state.party.append({"id": 1, "name": "Hero", "stats": {"hp": 10}, "inventory": []})
 
-    async def fake_generate(*, model, prompt):
+    async def fake_generate(*, model, prompt, **kwargs):
         return (
             "You find a potion and feel healthier.\n"
             "STATE_UPDATE: {\"party\": [{\"id\": 1, \"stats\": {\"hp\": 15},"
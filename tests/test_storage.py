@@ -0,0 +1,78 @@
+"""Tests for the SQLite game repository."""
+
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+from sqlalchemy import inspect, text
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.storage import FileGameRepository, SQLiteGameRepository
+from engine.world_loader import World, SectionEntry
+
+
+def test_sqlite_repository_survives_restart(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'games.db'}"
+    repo = SQLiteGameRepository(url)
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(engine_service, "_DB_REPOSITORY", repo)
+    engine_service._WORLDS[3] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    game_id = engine_service.create_game(3)
+    replies = iter(["You arrive.", "1. Go north\n2. Go south", "Roll a d20 (DC 10)."])
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        return next(replies)
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    for message in ("a", "b", "c"):
+        asyncio.run(engine_service.run_turn(game_id, message))
+    expected = engine_service.export_game_state(game_id)
+
+    with repo.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        journal = conn.execute(text("SELECT seq FROM game_journal")).scalars().all()
+    assert len(journal) == 2 and journal[1] == journal[0] + 1
+    assert not list(tmp_path.glob("game_*.json"))
+    indexes = inspect(repo.engine).get_indexes("game_states")
+    assert any(ix["column_names"] == ["world_id"] for ix in indexes)
+    repo.close()
+
+    restarted = SQLiteGameRepository(url)
+    monkeypatch.setattr(engine_service, "_DB_REPOSITORY", restarted)
+    engine_service._GAME_STATES.clear()
+    assert {"id": game_id, "world_id": 3} in engine_service.list_saved_games()
+    total, [entry] = engine_service.query_saved_games(world_id=3, limit=1)
+    assert total == 1 and entry["turns"] == 3 and entry["size"] > 0
+    engine_service.load_autosave(game_id)
+    assert engine_service.export_game_state(game_id) == expected
+
+    engine_service.autosave_game_state(game_id)
+    with restarted.engine.connect() as conn:
+        assert not conn.execute(text("SELECT * FROM game_journal")).all()
+    restarted.close()
+
+
+def test_backends_report_sizes_in_bytes(tmp_path):
+    document = json.dumps(
+        {"world_id": 1, "current_location": 0, "timeline": ["Café — naïve"]},
+        ensure_ascii=False,
+    )
+    info = {"world_id": 1, "updated_at": 1.0, "turns": 0}
+    files = FileGameRepository(tmp_path)
+    database = SQLiteGameRepository(f"sqlite:///{tmp_path / 'games.db'}")
+    for repo in (files, database):
+        repo.write_snapshot(1, document, info)
+    sizes = [repo.list_games()[1][0]["size"] for repo in (files, database)]
+    database.close()
+    assert sizes == [len(document.encode("utf-8"))] * 2
@@ -0,0 +1,60 @@
+"""Tests for paged transcript reads through the offset index."""
+
+from pathlib import Path
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service, transcripts
+from server.app.main import app
+
+
+def _write(game_id, count):
+    for n in range(count):
+        engine_service.append_transcript(game_id, "dm", f"line {n}")
+
+
+def test_pages_by_cursor(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    _write(5, 10)
+    client = TestClient(app)
+
+    resp = client.get("/games/5/transcript", params={"limit": 3})
+    assert [e["text"] for e in resp.json()] == ["line 7", "line 8", "line 9"]
+    assert resp.headers["x-transcript-start"] == "7"
+    assert resp.headers["x-total-count"] == "10"
+
+    resp = client.get("/games/5/transcript", params={"limit": 3, "before": 7})
+    assert [e["text"] for e in resp.json()] == ["line 4", "line 5", "line 6"]
+
+    resp = client.get("/games/5/transcript", params={"limit": 2, "after": 7})
+    assert [e["text"] for e in resp.json()] == ["line 8", "line 9"]
+
+    assert len(client.get("/games/5/transcript").json()) == 10
+    assert client.get("/games/6/transcript").json() == []
+
+
+def test_index_is_repaired_from_transcript(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    _write(1, 4)
+    path = tmp_path / "game_1.jsonl"
+    index = transcripts.index_path(path)
+
+    # A legacy transcript without an index.
+    index.unlink()
+    assert [e["text"] for e in engine_service.read_transcript(1, limit=1)] == ["line 3"]
+    assert index.stat().st_size == 4 * 8
+
+    # An index left behind by an interrupted append.
+    index.write_bytes(index.read_bytes()[:12])
+    with path.open("a") as fh:
+        fh.write('{"actor": "dm", "text": "line 4"}\n')
+    start, total, entries = engine_service.read_transcript_page(1, limit=2)
+    assert (start, total) == (3, 5)
+    assert [e["text"] for e in entries] == ["line 3", "line 4"]
+    _write(1, 1)
+    assert engine_service.read_transcript(1, after=4) == [
+        {"actor": "dm", "text": "line 0"}
+    ]
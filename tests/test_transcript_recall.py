@@ -0,0 +1,140 @@
+"""Tests for recalling past transcript entries through the keyword index."""
+
+import asyncio
+import threading
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from engine.bm25 import BM25Index, term_counts
+from server.app import engine_service, transcripts
+from engine.world_loader import World, SectionEntry
+
+
+def test_bm25_prefers_rare_matching_terms():
+    index = BM25Index()
+    for text in [
+        "The innkeeper pours ale",
+        "A dragon circles the tower",
+        "The innkeeper mentions the dragon hoard",
+        "Rain falls on the road",
+    ]:
+        index.add(term_counts(text))
+    hits = index.search("Where is the dragon hoard?", 2)
+    assert [n for n, _ in hits] == [2, 1]
+    assert index.search("nothing relevant", 2) == []
+
+
+def test_terms_sidecar_survives_rotation_and_is_repaired(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcripts, "SEGMENT_MAX_ENTRIES", 3)
+    path = tmp_path / "game_1.jsonl"
+    for n in range(7):
+        transcripts.append_entries(path, [f'{{"actor": "dm", "text": "word{n}"}}\n'])
+    expected = [{f"word{n}": 1} for n in range(7)]
+    assert transcripts.read_terms(path) == expected
+    # Closed segments take their word counts along, compressed.
+    assert sorted(p.name for p in tmp_path.glob("*.terms*")) == [
+        "game_1.00000000.jsonl.terms.gz",
+        "game_1.00000003.jsonl.terms.gz",
+        "game_1.jsonl.terms",
+    ]
+    assert transcripts.terms_path(path).read_bytes().count(b"\n") == 1
+    assert transcripts.read_entries(path, [5, 1, 9]) == {
+        1: {"actor": "dm", "text": "word1"},
+        5: {"actor": "dm", "text": "word5"},
+    }
+
+    # A sidecar cut short by an interrupted write, then a legacy transcript.
+    sidecar = transcripts.terms_path(path)
+    sidecar.write_bytes(sidecar.read_bytes()[:-4])
+    assert transcripts.read_terms(path) == expected
+    sidecar.unlink()
+    transcripts.append_entries(path, ['{"actor": "dm", "text": "word7"}\n'])
+    assert transcripts.read_terms(path) == expected + [{"word7": 1}]
+    (tmp_path / "game_1.00000003.jsonl.terms.gz").unlink()
+    assert transcripts.read_terms(path) == expected + [{"word7": 1}]
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    engine_service._GAME_STATES.clear()
+    engine_service._WORLDS[1] = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+
+
+def test_turn_prompt_quotes_matching_exchanges(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(engine_service, "MEMORY_CAPACITY", 1)
+    monkeypatch.setattr(engine_service, "MEMORY_SLACK", 0)
+    prompts = []
+    replies = iter(
+        [
+            "The smith hides a silver key.",
+            "Rain falls.",
+            "Crows gather.",
+            "You find the key.",
+        ]
+    )
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        prompts.append(prompt)
+        return next(replies)
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    game_id = engine_service.create_game(1)
+
+    async def play(messages):
+        for message in messages:
+            await engine_service.run_turn(game_id, message)
+
+    asyncio.run(play(["Talk to the smith", "Wait", "Wait again"]))
+    engine_service.autosave_game_state(game_id)
+
+    # A restart restores the index from its sidecar without re-reading the
+    # transcript.
+    engine_service._GAME_STATES.clear()
+    monkeypatch.setattr(transcripts, "_lines", None)
+    asyncio.run(play(["Ask about the silver key"]))
+    assert "Earlier: DM: The smith hides a silver key." in prompts[-1].splitlines()
+    assert "Earlier" not in prompts[1]
+
+
+def test_index_is_loaded_off_the_event_loop_or_not_at_all(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    replies = iter(["Roll a d20 for Strength (DC 12).", "The door opens.", "Dust."])
+
+    async def fake_generate(*, model, prompt, **kwargs):
+        return next(replies)
+
+    monkeypatch.setattr(engine_service, "generate", fake_generate)
+    game_id = engine_service.create_game(1)
+    asyncio.run(engine_service.run_turn(game_id, "Push the door"))
+    engine_service.autosave_game_state(game_id)
+    pending = engine_service._GAME_STATES[game_id].pending_roll
+
+    threads = []
+    read_terms = transcripts.read_terms
+
+    def recording(path):
+        threads.append(threading.current_thread())
+        return read_terms(path)
+
+    monkeypatch.setattr(transcripts, "read_terms", recording)
+    # A roll prompt recalls nothing, yet appending needs the index loaded.
+    engine_service._GAME_STATES.clear()
+    asyncio.run(engine_service.submit_player_roll(game_id, pending["id"], 15))
+    assert threads and threading.main_thread() not in threads
+
+    threads.clear()
+    monkeypatch.setattr(engine_service, "TRANSCRIPT_RECALL", 0)
+    engine_service._GAME_STATES.clear()
+    asyncio.run(engine_service.run_turn(game_id, "Wait"))
+    assert threads == []
@@ -0,0 +1,72 @@
+"""Tests for segmented, compressed transcript storage."""
+
+import os
+from pathlib import Path
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service, transcripts
+from server.app.main import app
+
+
+def _texts(entries):
+    return [e["text"] for e in entries]
+
+
+def test_segments_rotate_and_read_transparently(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(transcripts, "SEGMENT_MAX_ENTRIES", 3)
+    narration = "The wind howls across the moor. " * 20
+    for n in range(10):
+        engine_service.append_transcript(2, "dm", f"{n} {narration}")
+
+    assert sorted(p.name for p in tmp_path.glob("game_2.*.jsonl.gz")) == [
+        "game_2.00000000.jsonl.gz",
+        "game_2.00000003.jsonl.gz",
+        "game_2.00000006.jsonl.gz",
+    ]
+    gz = tmp_path / "game_2.00000000.jsonl.gz"
+    assert gz.stat().st_size * 5 < len(narration) * 3
+
+    texts = _texts(engine_service.read_transcript(2))
+    assert [t.split()[0] for t in texts] == [str(n) for n in range(10)]
+    start, total, page = engine_service.read_transcript_page(2, limit=4, before=8)
+    assert (start, total) == (4, 10)
+    assert [t.split()[0] for t in _texts(page)] == ["4", "5", "6", "7"]
+
+
+def test_interrupted_rotation_is_completed(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(transcripts, "SEGMENT_MAX_ENTRIES", 2)
+    for n in range(3):
+        engine_service.append_transcript(4, "dm", str(n))
+    path = tmp_path / "game_4.jsonl"
+    # Closed but neither recorded nor compressed.
+    os.replace(path, transcripts.segment_path(path, 2))
+
+    assert _texts(engine_service.read_transcript(4)) == ["0", "1", "2"]
+    assert (tmp_path / "game_4.00000002.jsonl.gz").exists()
+    engine_service.append_transcript(4, "dm", "3")
+    assert _texts(engine_service.read_transcript(4, after=2)) == ["3"]
+
+
+def test_export_can_include_transcript(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_service, "SAVE_DIR", tmp_path)
+    monkeypatch.setattr(transcripts, "SEGMENT_MAX_ENTRIES", 2)
+    engine_service._GAME_STATES.clear()
+    engine_service._GAME_STATES[1] = engine_service.GameState(
+        world_id=1, current_location=0
+    )
+    for n in range(3):
+        engine_service.append_transcript(1, "player", str(n))
+    client = TestClient(app)
+
+    assert "transcript" not in client.get("/games/1/export").json()
+    exported = client.get("/games/1/export", params={"transcript": True}).json()
+    assert _texts(exported["transcript"]) == ["0", "1", "2"]
+
+    new_id = engine_service.import_game_state(exported)
+    assert engine_service.read_transcript(new_id) == exported["transcript"]
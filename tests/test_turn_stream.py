@@ -0,0 +1,129 @@
+"""Tests for the streaming turn endpoint."""
+
+import json
+from pathlib import Path
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from server.app import engine_service
+from server.app.main import app
+from engine.world_loader import World, SectionEntry
+
+
+def _setup_world_and_game(tmp_path: Path) -> int:
+    engine_service.SAVE_DIR = tmp_path
+    world = World(
+        id="w",
+        title="World",
+        ruleset="dnd5e",
+        end_goal="",
+        lore="",
+        locations=[SectionEntry(name="Start", description="")],
+        npcs=[],
+    )
+    engine_service._WORLDS[1] = world
+    return engine_service.create_game(1)
+
+
+def _parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data[6:])))
+    return events
+
+
+def test_stream_relays_tokens_and_commits_at_end(tmp_path, monkeypatch):
+    game_id = _setup_world_and_game(tmp_path)
+    state = engine_service._GAME_STATES[game_id]
+    state.party.append({"id": 1, "name": "Hero", "stats": {"hp": 10}})
+    tokens = [
+        "You enter",
+        " the hall.\nSTATE_",
+        'UPDATE: {"party": [{"id": 1, "stats": {"hp": 12}}]}\n',
+        "1. Go left\n2. Go ",
+        "right",
+    ]
+
+    async def fake_stream(*, model, prompt, **kwargs):
+        for token in tokens:
+            yield token
+
+    monkeypatch.setattr(engine_service, "stream", fake_stream)
+
+    client = TestClient(app)
+    resp = client.post(f"/games/{game_id}/turn/stream", json={"message": "enter"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_events(resp.text)
+    relayed = "".join(data["text"] for name, data in events if name == "token")
+    assert "STATE_UPDATE" not in relayed
+    assert relayed.strip() == "You enter the hall.\n1. Go left\n2. Go right"
+
+    name, done = events[-1]
+    assert name == "done"
+    assert done["message"] == relayed.strip()
+    assert done["awaiting_player_roll"] is False
+    assert state.party[0]["stats"]["hp"] == 12
+    assert state.last_options == ["Go left", "Go right"]
+    assert engine_service.read_transcript(game_id)[-1]["actor"] == "dm"
+
+
+def test_stream_stops_relaying_after_roll_request(tmp_path, monkeypatch):
+    game_id = _setup_world_and_game(tmp_path)
+
+    async def fake_stream(*, model, prompt, **kwargs):
+        for token in ["Roll a d20 for ", "Stealth (DC 12)", ". You sneak past."]:
+            yield token
+
+    monkeypatch.setattr(engine_service, "stream", fake_stream)
+
+    client = TestClient(app)
+    resp = client.post(f"/games/{game_id}/turn/stream", json={"message": "sneak"})
+    events = _parse_events(resp.text)
+    relayed = "".join(data["text"] for name, data in events if name == "token")
+    assert relayed == "Roll a d20 for Stealth (DC 12)"
+
+    done = events[-1][1]
+    assert done["message"] == "Roll a d20 for Stealth (DC 12)."
+    assert done["roll_request"]["skill"] == "Stealth"
+    assert engine_service._GAME_STATES[game_id].pending_roll == done["roll_request"]
+
+
+def test_stream_unknown_game_is_404():
+    client = TestClient(app)
+    resp = client.post("/games/9999/turn/stream", json={"message": "hi"})
+    assert resp.status_code == 404
+
+
+def test_stream_reports_replay_misses_and_full_queue(tmp_path, monkeypatch):
+    from server.app.llm.cache import ResponseCache
+    from server.app.llm.scheduler import QueueFull
+
+    game_id = _setup_world_and_game(tmp_path)
+    client = TestClient(app)
+
+    monkeypatch.setattr(
+        engine_service, "_RESPONSE_CACHE", ResponseCache(tmp_path, mode="replay")
+    )
+    resp = client.post(f"/games/{game_id}/turn/stream", json={"message": "look"})
+    assert resp.status_code == 503
+    assert "text/event-stream" not in resp.headers["content-type"]
+
+    monkeypatch.setattr(engine_service, "_RESPONSE_CACHE", None)
+
+    async def failing_stream(*, model, prompt, **kwargs):
+        yield "You look"
+        raise QueueFull(1.0)
+
+    monkeypatch.setattr(engine_service, "stream", failing_stream)
+    resp = client.post(f"/games/{game_id}/turn/stream", json={"message": "look"})
+    assert resp.status_code == 200
+    events = _parse_events(resp.text)
+    assert events[0] == ("token", {"text": "You look"})
+    assert events[-1][0] == "error"
+    assert not engine_service.game_locks.locked(game_id)
@@ -10,6 +10,8 @@ import CreateCharacterForm, {
 } from '../components/CreateCharacterForm'
 
 const API_BASE = import.meta.env.VITE_API_URL ?? 'http://localhost:8000'
+// Only the latest part of long transcripts is shown when a game is opened.
+const TRANSCRIPT_PAGE_SIZE = 200
 
 export default function PlayPage() {
   const { gameId } = useParams()
@@ -55,7 +57,7 @@ export default function PlayPage() {
     setRulesInfo(map[world.ruleset])
     setWorldTitle(world.title)
     const transcriptResp = await fetch(
-      `${API_BASE}/games/${gameId}/transcript`,
+      `${API_BASE}/games/${gameId}/transcript?limit=${TRANSCRIPT_PAGE_SIZE}`,
     )
     if (transcriptResp.ok) {
       const data = (await transcriptResp.json()) as {